@@ -1,14 +1,148 @@
 import chipwhisperer as cw
-import os, subprocess, time, re
+import os, subprocess, time, re, struct, socket, tempfile
 from chipwhisperer.hardware.firmware.open_fw import getsome_generator
-import json, datetime, shutil
+import json, datetime, shutil, hashlib, pickle
 import pexpect, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from IPython.display import clear_output
 import numpy as np
 import math
 import anthropic
 from typing import Optional, List, Dict, Any, Union, Set, Callable
 
+def _make_software(software_dir, platform, clean=False):
+    """Run make for a software directory without changing the global working directory
+    
+    Builds both the regular and the Spike (SPIKE=1) binaries. Defined at module level
+    so it can be dispatched to worker processes.
+    
+    Args:
+        software_dir (str): Directory containing the generated Makefile
+        platform (str): Target platform for compilation
+        clean (bool): Whether to clean before building
+        
+    Returns:
+        tuple: (status, stderr) where status is 'success' or an error string
+    """
+    try:
+        if clean:
+            subprocess.run(['make', 'clean'], cwd=software_dir, capture_output=True, text=True, check=True)
+        cmd = ['make', f'PLATFORM={platform}', 'CRYPTO_TARGET=NONE', 'CRYPTO_OPTIONS=NONE']
+        subprocess.run(cmd, cwd=software_dir, capture_output=True, text=True, check=True)
+        # Build for spike tracing
+        cmd.append('SPIKE=1')
+        subprocess.run(cmd, cwd=software_dir, capture_output=True, text=True, check=True)
+        return 'success', None
+    except subprocess.CalledProcessError as e:
+        return f'error: {e.returncode}', e.stderr
+    except FileNotFoundError:
+        return 'error_make_not_found', None
+    except Exception as e:
+        return f'error: {str(e)}', None
+
+SPIKE_PATTERN = re.compile(r'core\s+\d+:\s+0x[0-9a-f]+\s+\(0x[0-9a-f]+\)\s+(.*)')
+
+def _elf_symbols(elf_path, names):
+    """Resolve symbol addresses from the symbol table of a 32-bit little-endian ELF file
+    
+    Replaces a call to riscv32-unknown-elf-nm by a single pass over the .symtab section.
+    
+    Args:
+        elf_path (str): Path to the ELF file
+        names (iterable): Symbol names to resolve
+        
+    Returns:
+        dict: Mapping of the found symbol names to their addresses
+    """
+    names = set(names)
+    with open(elf_path, 'rb') as f:
+        elf = f.read()
+    if elf[:4] != b'\x7fELF' or elf[4] != 1:
+        raise ValueError(f"{elf_path} is not a 32-bit ELF file")
+    
+    e_shoff, = struct.unpack_from('<I', elf, 0x20)
+    e_shentsize, e_shnum = struct.unpack_from('<HH', elf, 0x2E)
+    sections = [struct.unpack_from('<IIIIIIIIII', elf, e_shoff + i * e_shentsize) for i in range(e_shnum)]
+    
+    SHT_SYMTAB = 2
+    symbols = {}
+    for sh_name, sh_type, _, _, sh_offset, sh_size, sh_link, _, _, sh_entsize in sections:
+        if sh_type != SHT_SYMTAB:
+            continue
+        str_offset = sections[sh_link][4]
+        for entry in range(sh_offset, sh_offset + sh_size, sh_entsize):
+            st_name, st_value = struct.unpack_from('<II', elf, entry)
+            end = elf.index(b'\0', str_offset + st_name)
+            name = elf[str_offset + st_name:end].decode()
+            if name in names:
+                symbols[name] = st_value
+    return symbols
+
+def _run_spike_labels(elf_path, software_dir):
+    """Trace a program with Spike and write its instruction labels
+    
+    Spike's stderr is parsed line by line while the process runs, so the full
+    trace is never held in memory. Defined at module level so it can be
+    dispatched to worker processes.
+    
+    Args:
+        elf_path (str): Path to the Spike build of the program
+        software_dir (str): Directory to write spike_commands.txt and the label files to
+        
+    Returns:
+        tuple: (success, message)
+    """
+    spike_cmd_path = f'{software_dir}/spike_commands.txt'
+    
+    # Get start and end address
+    try:
+        symbols = _elf_symbols(elf_path, ("execute_cw", "trigger_low"))
+        start_addr, end_addr = hex(symbols["execute_cw"]), hex(symbols["trigger_low"])
+        with open(spike_cmd_path, 'w') as f:
+            f.write(
+f"""until pc 0 {start_addr}
+untiln pc 0 {end_addr}
+quit
+""")
+    except Exception as e:
+        return False, f"Failed to find start and end addresses: {e}"
+
+    # Run Spike and parse the instruction dump as it is produced
+    try:
+        process = subprocess.Popen([
+            'spike', '-d', 
+            f'--debug-cmd={spike_cmd_path}',
+            '--isa=rv32imc',
+            '-m0x100000:0x100000,0x20000:0x10000,0x80000000:0x100000',
+            elf_path
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True
+        )
+    except Exception as e:
+        return False, f"Failed at Spike debugging stage: {e}"
+
+    try:
+        with open(os.path.join(software_dir, "label_instr_reg.txt"), "w") as f_reg, \
+             open(os.path.join(software_dir, "label_instr.txt"), "w") as f_instr:
+            next(process.stderr, None) # First line is not part of the trace
+            separator = ""
+            for line in process.stderr:
+                match = SPIKE_PATTERN.search(line)
+                if not match:
+                    continue
+                asm = match.group(1)
+                f_reg.write(separator + asm)
+                f_instr.write(separator + asm.split()[0])
+                separator = "\n"
+        process.wait()
+    except Exception as e:
+        process.kill()
+        return False, f"Failed parsing and saving results: {e}"
+    
+    return True, None
+
 class ProjectBaseClass:
     """
     Base class for Ibex-related operations.
@@ -65,22 +199,158 @@ class ProjectBaseClass:
         ext_path = os.path.join(software_dir, f"{software_name}-{platform}.{ext}")
         return ext_path
 
+class OpenOCDSession:
+    """
+    Long-running OpenOCD instance, controlled through its TCL RPC port.
+    
+    load_demo_system.sh starts a new OpenOCD for every program, which sets up JTAG
+    and examines the core again each time. Keeping one instance alive makes loading a
+    program just halt, load_image and reset, and leaves its GDB server (port 3333) up.
+    """
+    TERMINATOR = b"\x1a"
+    
+    def __init__(self, config_file, cwd=None, tcl_port=6666, startup_timeout=10):
+        """
+        Args:
+            config_file (str): OpenOCD configuration script for the board
+            cwd (str): Working directory of the OpenOCD process
+            tcl_port (int): Port of the OpenOCD TCL RPC server
+            startup_timeout (float): Seconds to wait for OpenOCD to accept connections
+        """
+        self.config_file = config_file
+        self.cwd = cwd
+        self.tcl_port = tcl_port
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.sock = None
+        self.log_path = None
+        
+    def is_alive(self):
+        """True if OpenOCD is running and connected"""
+        return self.sock is not None and self.process is not None and self.process.poll() is None
+    
+    def _log_tail(self, lines=20):
+        try:
+            with open(self.log_path, 'r') as f:
+                return "".join(f.readlines()[-lines:])
+        except (OSError, TypeError):
+            return ""
+    
+    def start(self):
+        """Start OpenOCD and connect to its TCL port, unless it's already running"""
+        if self.is_alive():
+            return
+        self.close()
+        
+        with tempfile.NamedTemporaryFile(prefix="openocd_", suffix=".log", delete=False) as log:
+            self.log_path = log.name
+            self.process = subprocess.Popen(
+                ["openocd", "-c", f"tcl_port {self.tcl_port}", "-f", self.config_file],
+                cwd=self.cwd, stdout=log, stderr=subprocess.STDOUT)
+        
+        start_time = time.time()
+        while self.sock is None:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"OpenOCD exited with code {self.process.returncode}:\n{self._log_tail()}")
+            try:
+                self.sock = socket.create_connection(("localhost", self.tcl_port), timeout=1)
+            except OSError:
+                if time.time() - start_time > self.startup_timeout:
+                    self.close()
+                    raise TimeoutError(f"OpenOCD did not open TCL port {self.tcl_port}:\n{self._log_tail()}")
+                time.sleep(0.1)
+    
+    def command(self, cmd, timeout=30):
+        """Run an OpenOCD command, starting OpenOCD if needed
+        
+        Args:
+            cmd (str): OpenOCD (Tcl) command
+            timeout (float): Seconds to wait for the command to finish
+            
+        Returns:
+            str: Output of the command
+            
+        Raises:
+            RuntimeError: If the command failed
+        """
+        self.start()
+        # capture collects what the command prints, catch turns errors into a return code
+        wrapped = f"set _rc [catch {{capture {{{cmd}}}}} _out]; concat $_rc $_out"
+        
+        self.sock.settimeout(timeout)
+        self.sock.sendall(wrapped.encode() + self.TERMINATOR)
+        response = b""
+        while not response.endswith(self.TERMINATOR):
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                self.close()
+                raise ConnectionError(f"OpenOCD closed the connection:\n{self._log_tail()}")
+            response += chunk
+        
+        rc, _, output = response[:-1].decode(errors="replace").partition(" ")
+        if rc != "0":
+            raise RuntimeError(f"OpenOCD command '{cmd}' failed: {output}")
+        return output.strip()
+    
+    def load(self, program_path, run=True, verify=False, offset=0x0):
+        """Load a program into target memory and reset the core
+        
+        Args:
+            program_path (str): Image to load (ELF, Intel hex, ...)
+            run (bool): If True run the program, otherwise stay halted at reset (await debugger)
+            verify (bool): If True read the image back to check it
+            offset (int): Offset added to the image addresses
+            
+        Returns:
+            str: OpenOCD output
+        """
+        path = os.path.abspath(program_path)
+        output = [self.command("halt")]
+        output.append(self.command(f"load_image {{{path}}} {offset:#x}"))
+        if verify:
+            output.append(self.command(f"verify_image {{{path}}} {offset:#x}"))
+        output.append(self.command("reset run" if run else "reset halt"))
+        return "\n".join(line for line in output if line)
+    
+    def close(self):
+        """Shut OpenOCD down"""
+        if self.sock is not None:
+            try:
+                self.sock.sendall(b"shutdown" + self.TERMINATOR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
 class IbexChipWhisperer(ProjectBaseClass):
     """
     Class to manage ChipWhisperer operations with Ibex RISC-V core.
     Handles FPGA programming, firmware loading, and debugging operations with CW305 Artix-7 FPGA.
     """
     
-    def __init__(self, project_root_path="../../../", oversampling_factor = 4):
+    def __init__(self, project_root_path="../../../", oversampling_factor = 4, persistent_openocd=True, openocd_cfg=None):
         """
         Initialize the IbexChipWhisperer controller.
         
         Args:
             ibex_base_path (str): Path to the Ibex demo system repository
             oversampling_rate (int): Oversampling rate = sampling frequency / softcore clock frequency
+            persistent_openocd (bool): Load programs through one long-running OpenOCD instead of
+                                       running load_demo_system.sh for each of them
+            openocd_cfg (str): OpenOCD configuration script, defaults to the one load_demo_system.sh uses
         """
         super().__init__(project_root_path)
         self.script_path = f"{self.ibex_path}/util/load_demo_system.sh"
+        if openocd_cfg is None:
+            openocd_cfg = os.path.join(self.ibex_path, "util", "arty-a7-openocd-cfg.tcl")
+        self.openocd = OpenOCDSession(openocd_cfg, cwd=self.ibex_path) if persistent_openocd else None
         self.fpga_target = cw.target(None, cw.targets.CW305, bsfile=None, force=False)
         self.oversampling_factor = oversampling_factor
         self.target = None # Softcore target
@@ -155,7 +425,7 @@ class IbexChipWhisperer(ProjectBaseClass):
             print("❌ FPGA Done pin failed to go high")
             return False
     
-    def reload(self, program_path, debug=False, verbose=True):
+    def reload(self, program_path, debug=False, verbose=True, verify=True):
         """
         Reset the device and load a program.
         
@@ -163,9 +433,11 @@ class IbexChipWhisperer(ProjectBaseClass):
             program_path (str): Path to the program to load
             debug (bool): If True, halt after loading (await debugger)
             verbose (bool): If True, print verbose output
+            verify (bool): If True, read the program back after loading (persistent OpenOCD only,
+                           load_demo_system.sh always verifies)
             
         Returns:
-            subprocess.CompletedProcess: Result of the load operation
+            str or subprocess.CompletedProcess: OpenOCD output, or the result of load_demo_system.sh
         """
         if not os.path.exists(program_path):
             raise FileNotFoundError(f"File not found: {program_path}")
@@ -173,6 +445,22 @@ class IbexChipWhisperer(ProjectBaseClass):
             # Ensure clip errors are cleared when new software loaded
             self.scope.adc.clear_clip_errors()
         
+        if self.openocd is not None:
+            try:
+                start_time = time.time()
+                output = self.openocd.load(program_path, run=not debug, verify=verify)
+                if verbose:
+                    print(f"Loaded {program_path} in {time.time() - start_time:.3f}s")
+                    if output:
+                        print(output)
+                return output
+            
+            except Exception as e:
+                print(f"Loading through OpenOCD failed: {str(e)}")
+                # Start from a fresh OpenOCD next time
+                self.openocd.close()
+                return e
+        
         instruction = "halt" if debug else "run"
         cmd = f"{self.script_path} {instruction} {program_path}"
         
@@ -206,6 +494,8 @@ class IbexChipWhisperer(ProjectBaseClass):
         """
         Disconnect from the ChipWhisperer device.
         """
+        if self.openocd is not None:
+            self.openocd.close()
         if self.scope:
             self.scope.dis()
             print("Disconnected from ChipWhisperer")
@@ -255,7 +545,8 @@ class DataGenerator(ProjectBaseClass):
                     'debugged': False,
                     'debugged_timestamp': None,
                     'final_status': None,
-                    'dir_path': None
+                    'dir_path': None,
+                    'trig_count': None
                 }
         
         # Save state to ensure new software entries are recorded
@@ -362,6 +653,91 @@ include $(FIRMWAREPATH)/Makefile.inc
                 return os.path.join(directory, filename)
         return None
 
+    def _toolchain_version(self):
+        """Return the version string of the RISC-V compiler, cached per instance"""
+        if not hasattr(self, '_toolchain_version_str'):
+            try:
+                result = subprocess.run(['riscv32-unknown-elf-gcc', '--version'], capture_output=True, text=True)
+                self._toolchain_version_str = result.stdout.splitlines()[0] if result.stdout else ''
+            except FileNotFoundError:
+                self._toolchain_version_str = ''
+        return self._toolchain_version_str
+
+    def _build_hash(self, software_name):
+        """Hash the inputs of a build: the .c sources, the generated Makefile and the toolchain version
+        
+        Args:
+            software_name (str): Name of the software
+            
+        Returns:
+            str: Hex digest identifying the build inputs
+        """
+        software_dir = self.get_dir(software_name)
+        digest = hashlib.sha256()
+        for path in (os.path.join(software_dir, f"{software_name}.c"), self.main_path, os.path.join(software_dir, "Makefile")):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        digest.update(self._toolchain_version().encode())
+        return digest.hexdigest()
+
+    def _build_cached(self, software_name, build_hash):
+        """Check whether the binaries on disk were built from identical inputs
+        
+        The hash is stored next to the binaries, so the cache survives a reset of the state file.
+        
+        Args:
+            software_name (str): Name of the software
+            build_hash (str): Hash of the current build inputs
+            
+        Returns:
+            bool: True if the build can be skipped
+        """
+        hash_path = os.path.join(self.get_dir(software_name), "build_hash.txt")
+        elf_path = self.get_ext(software_name, ext="elf", platform=self.platform)
+        if not (os.path.exists(hash_path) and os.path.exists(elf_path)):
+            return False
+        with open(hash_path, 'r') as f:
+            return f.read().strip() == build_hash
+
+    def _record_build(self, software_name, status, build_hash=None):
+        """Update the state (and build cache on success) after a build of software_name"""
+        software_dir = self.get_dir(software_name)
+        self.state[software_name]['compile_status'] = status
+        if status == 'success':
+            self.state[software_name]['compiled'] = True
+            self.state[software_name]['compiled_timestamp'] = datetime.datetime.now().isoformat()
+            self.state[software_name]['dir_path'] = software_dir
+            # A new binary invalidates the measured capture length
+            self.state[software_name]['trig_count'] = None
+            if build_hash:
+                with open(os.path.join(software_dir, "build_hash.txt"), 'w') as f:
+                    f.write(build_hash)
+        else:
+            self.state[software_name]['compiled'] = False
+
+    def _prepare_build(self, software_name, force=False):
+        """Generate the Makefile for software_name and check the build cache
+        
+        Args:
+            software_name (str): Name of the software
+            force (bool): Whether to ignore the build cache
+            
+        Returns:
+            tuple: (action, build_hash) where action is 'build', 'cached' or 'error_no_source'
+        """
+        software_dir = self.get_dir(software_name)
+        source_path = self.find_source_file(software_dir)
+        if not source_path:
+            return 'error_no_source', None
+        
+        # Create modified Makefile
+        self.gen_makefile(source_path)
+        
+        build_hash = self._build_hash(software_name)
+        if not force and self._build_cached(software_name, build_hash):
+            return 'cached', build_hash
+        return 'build', build_hash
+
     def build_software(self, software_name, clean=False, force=False):
         """Build the software with a new Makefile
         
@@ -381,69 +757,46 @@ include $(FIRMWAREPATH)/Makefile.inc
         
         print(f"\n=== Building software: {software_name} ===")
         
-        # Find the source file
         software_dir = self.get_dir(software_name)
-        source_path = self.find_source_file(software_dir)
-        if not source_path:
+        action, build_hash = self._prepare_build(software_name, force=force)
+        if action == 'error_no_source':
             print(f"Error: No .c file found in {software_dir}")
             self.state[software_name]['compile_status'] = 'error_no_source'
             self._save_state()
             return False
-        
-        print(f"Building file: {source_path}")
-        
-        # Create modified Makefile
-        self.gen_makefile(source_path)
-        
-        original_cwd = os.getcwd()
-        os.chdir(software_dir)  # Change to the software directory before running make
-
-        try:
-            # Clean if requested
-            if clean:
-                subprocess.run(['make', 'clean'], check=True)
-
-            # Build with specified platform
-            cmd = ['make', f'PLATFORM={self.platform}', 'CRYPTO_TARGET=NONE', 'CRYPTO_OPTIONS=NONE']
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            # Build for spike tracing
-            cmd.append('SPIKE=1')
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-
-            # Update state
+        if action == 'cached':
+            print(f"Software {software_name} unchanged since last build, skipping.")
             self.state[software_name]['compiled'] = True
-            self.state[software_name]['compiled_timestamp'] = datetime.datetime.now().isoformat()
             self.state[software_name]['compile_status'] = 'success'
             self.state[software_name]['dir_path'] = software_dir
-            
-            print(f"Successfully built {software_name}")
+            self._save_state()
             return True
-
-        except subprocess.CalledProcessError as e:
-            print(f"Error building {software_name}:")
-            print(e.stderr)
-            # Update state with error information
-            self.state[software_name]['compiled'] = False
-            self.state[software_name]['compile_status'] = f'error: {e.returncode}'
-            return False
-        except FileNotFoundError:
-            print(f"Error: 'make' command not found. Ensure it's in your system's PATH.")
-            self.state[software_name]['compile_status'] = 'error_make_not_found'
-            return False
-        except Exception as e:
-            print(f"Exception during build: {e}")
-            self.state[software_name]['compile_status'] = f'error: {str(e)}'
+        
+        print(f"Building file: {self.find_source_file(software_dir)}")
+        
+        try:
+            status, stderr = _make_software(software_dir, self.platform, clean)
+            self._record_build(software_name, status, build_hash)
+            if status == 'success':
+                print(f"Successfully built {software_name}")
+                return True
+            elif status == 'error_make_not_found':
+                print(f"Error: 'make' command not found. Ensure it's in your system's PATH.")
+            else:
+                print(f"Error building {software_name}:")
+                print(stderr if stderr else status)
             return False
         finally:
-            os.chdir(original_cwd)
             self._save_state()
 
-    def build_all(self, clean=False, force=False):
+    def build_all(self, clean=False, force=False, parallel=False, max_workers=None):
         """Build all software
         
         Args:
             clean (bool): Whether to clean before building
             force (bool): Whether to force rebuild even if already compiled
+            parallel (bool): Whether to build in a pool of worker processes
+            max_workers (int, optional): Number of worker processes, defaults to the CPU count
             
         Returns:
             tuple: Lists of successful and failed software names
@@ -451,12 +804,53 @@ include $(FIRMWAREPATH)/Makefile.inc
         successful = []
         failed = []
         
-        for software_dir in self.software_dirs:
-            software_name = os.path.basename(software_dir)
-            if self.build_software(software_name, clean, force):
-                successful.append(software_name)
-            else:
-                failed.append(software_name)
+        if not parallel:
+            for software_dir in self.software_dirs:
+                software_name = os.path.basename(software_dir)
+                if self.build_software(software_name, clean, force):
+                    successful.append(software_name)
+                else:
+                    failed.append(software_name)
+        else:
+            jobs = {}
+            for software_dir in self.software_dirs:
+                software_name = os.path.basename(software_dir)
+                if not force and self.state[software_name]['compiled']:
+                    successful.append(software_name)
+                    continue
+                
+                action, build_hash = self._prepare_build(software_name, force=force)
+                if action == 'error_no_source':
+                    self.state[software_name]['compile_status'] = 'error_no_source'
+                    failed.append(software_name)
+                elif action == 'cached':
+                    self.state[software_name]['compiled'] = True
+                    self.state[software_name]['compile_status'] = 'success'
+                    self.state[software_name]['dir_path'] = software_dir
+                    successful.append(software_name)
+                else:
+                    jobs[software_name] = build_hash
+            
+            print(f"Building {len(jobs)} software ({len(successful)} up to date)")
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(_make_software, self.get_dir(software_name), self.platform, clean): software_name
+                    for software_name in jobs
+                }
+                for future in as_completed(futures):
+                    software_name = futures[future]
+                    status, stderr = future.result()
+                    self._record_build(software_name, status, jobs[software_name])
+                    if status == 'success':
+                        successful.append(software_name)
+                    else:
+                        print(f"Error building {software_name}: {status}")
+                        if stderr:
+                            print(stderr)
+                        failed.append(software_name)
+            
+            # Write the state once instead of after every build
+            self._save_state()
         
         # Print summary
         print("\n=== Build Summary ===")
@@ -499,43 +893,213 @@ include $(FIRMWAREPATH)/Makefile.inc
             
         return capture_interval
 
-    def _capture_trace(self, software_name, softcore):
+    def _get_trig_count(self, software_name, softcore, force=False):
+        """Return the number of samples between trigger_high and trigger_low
+        
+        The value is measured once per program and cached in the generator state,
+        so later repetitions skip the extra measuring run.
+        
+        Args:
+            software_name (str): Name of the software
+            softcore (IbexChipWhisperer): Softcore on which to run and debug the software
+            force (bool): Whether to re-measure even if a cached value exists
+            
+        Returns:
+            int: n samples to capture between trigger_high and trigger_low for software_name
+        """
+        trig_count = self.state[software_name].get('trig_count')
+        if force or not trig_count:
+            trig_count = int(self._set_sample_range(software_name, softcore))
+            self.state[software_name]['trig_count'] = trig_count
+            self._save_state()
+        return trig_count
+
+    def _stream_fits(self, trig_count, softcore, max_stream_rate=10e6):
+        """Check whether a trace of trig_count samples can be streamed without overflowing
+        
+        While streaming, the scope FIFO absorbs the difference between the ADC sample
+        rate and the rate at which samples can be read back over USB.
+        
+        Args:
+            trig_count (int): Number of samples between trigger_high and trigger_low
+            softcore (IbexChipWhisperer): Softcore on which to run and debug the software
+            max_stream_rate (float): Sustained stream readback rate in samples per second
+            
+        Returns:
+            bool: True if the whole window is expected to fit in stream mode
+        """
+        if not softcore.scope._is_husky:
+            return False
+        adc_freq = softcore.scope.clock.adc_freq
+        fifo_size = softcore.scope.adc.oa.hwMaxSamples
+        backlog = trig_count * max(0.0, 1 - max_stream_rate / adc_freq)
+        return backlog < fifo_size
+
+    def _capture_trace_stream(self, software_name, softcore, trig_count, as_int=True):
+        """Captures the whole trigger_high to trigger_low window in a single stream mode run
+        
+        Args:
+            software_name (str): Name of the software
+            softcore (IbexChipWhisperer): Softcore on which to run and debug the software
+            trig_count (int): Number of samples between trigger_high and trigger_low
+            as_int (bool): If True, return raw ADC integers instead of scaled floats
+            
+        Returns:
+            numpy.ndarray or None: Trace of length trig_count, or None if the stream overflowed
+        """
+        EXECUTE_PROGRAM = '1'
+        
+        softcore.scope.adc.stream_mode = True
+        try:
+            softcore.scope.adc.offset = 0
+            softcore.scope.adc.samples = trig_count
+            
+            softcore.scope.arm()
+            softcore.target.simpleserial_write(EXECUTE_PROGRAM, "A".encode())
+            ret = softcore.scope.capture()
+            if ret:
+                print(f"Stream capture of {software_name} overflowed, falling back to windowed capture")
+                return None
+            
+            trace = softcore.scope.get_last_trace(as_int=as_int)[:trig_count]
+            return trace.astype(np.int16) if as_int else trace
+        finally:
+            softcore.scope.adc.stream_mode = False
+
+    def _capture_trace(self, software_name, softcore, as_int=True, stream=False):
         """Captures trace between trigger_high and trigger_low
         
+        With stream=True the window is recorded in one run when it fits within the
+        stream limits. Otherwise the output buffer is preallocated from the cached
+        trig_count and every window of at most SAMPLE_BUFFER_SIZE samples is written
+        into it in place.
+        
         Args:
             software_name (str): Name of the software
             softcore (IbexChipWhisperer): Softcore on which to run and debug the software
+            as_int (bool): If True, store raw ADC integers instead of scaled floats
+            stream (bool): If True, try a single stream mode capture first
+            
+        Returns:
+            numpy.ndarray: Trace of length trig_count
         """
         
         # Adapted to Husky specifically
-        trig_count = self._set_sample_range(software_name, softcore) # Upper offset limit for capture
+        trig_count = self._get_trig_count(software_name, softcore) # Upper offset limit for capture
         SAMPLE_BUFFER_SIZE = 131124
-        softcore.scope.adc.samples = SAMPLE_BUFFER_SIZE # Capture as many samples per iteration as possible
-        softcore.scope.adc.offset = 0 # Initialize offset to start at trigger_high
-        
         EXECUTE_PROGRAM = '1'
-        composite_trace = np.array([])
-
-        while softcore.scope.adc.offset < trig_count:
-            # If last capture iteration, set samples to end at trigger_low
-            if trig_count - softcore.scope.adc.offset < softcore.scope.adc.samples:
-                softcore.scope.adc.samples = trig_count % softcore.scope.adc.samples
+        
+        if stream and trig_count > SAMPLE_BUFFER_SIZE and self._stream_fits(trig_count, softcore):
+            composite_trace = self._capture_trace_stream(software_name, softcore, trig_count, as_int=as_int)
+            if composite_trace is not None:
+                return composite_trace
+        
+        composite_trace = np.empty(trig_count, dtype=np.int16 if as_int else np.float64)
+        offset = 0
+        
+        while offset < trig_count:
+            # Capture as many samples per iteration as possible, ending at trigger_low
+            samples = min(SAMPLE_BUFFER_SIZE, trig_count - offset)
+            softcore.scope.adc.samples = samples
+            softcore.scope.adc.offset = offset
             
             softcore.scope.arm()
             softcore.target.simpleserial_write(EXECUTE_PROGRAM, "A".encode())
-            # Find number of relevant samples
             ret = softcore.scope.capture()
             if ret:
                 raise Exception("Capture error!")
 
-            composite_trace = np.append(composite_trace, softcore.scope.get_last_trace())
-            softcore.scope.adc.offset += softcore.scope.adc.samples
+            chunk = softcore.scope.get_last_trace(as_int=as_int)
+            composite_trace[offset:offset + samples] = chunk[:samples]
+            offset += samples
+
+        # Refresh the cache if the program ran for a different number of samples
+        observed = softcore.scope.adc.trig_count
+        if observed != trig_count:
+            print(f"trig_count for {software_name} changed from {trig_count} to {observed}")
+            self.state[software_name]['trig_count'] = int(observed)
+            self._save_state()
 
         return composite_trace
         
         
 
-    def generate_data(self, software_name, softcore, repetitions = 1, platform="CW305_IBEX", force=False, save=True):
+    def _wait_for_program(self, softcore, timeout=5):
+        """Block until the target acknowledges a finished program execution
+        
+        Args:
+            softcore (IbexChipWhisperer): Softcore on which to run and debug the software
+            timeout (float): Maximum time to wait in seconds
+            
+        Returns:
+            bool: True if the acknowledgement was received, False on timeout
+        """
+        response = ""
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            response += softcore.target.read(timeout=10)
+            if "z00" in response:
+                return True
+        return False
+
+    def _capture_traces_segmented(self, software_name, softcore, repetitions, as_int=True):
+        """Captures repeated traces as back-to-back segments of a single arm and readback
+        
+        Each program execution fires one trigger, and the Husky records trig_count samples
+        per trigger into its own segment. Repetitions that do not fit in the segment buffer
+        are split across several arms.
+        
+        Args:
+            software_name (str): Name of the software
+            softcore (IbexChipWhisperer): Softcore on which to run and debug the software
+            repetitions (int): Amount of repeated traces to capture
+            as_int (bool): If True, store raw ADC integers instead of scaled floats
+            
+        Returns:
+            numpy.ndarray or None: (repetitions, trig_count) matrix, or None if the program
+                                   is too long for segmented capture
+        """
+        trig_count = self._get_trig_count(software_name, softcore)
+        EXECUTE_PROGRAM = '1'
+        
+        max_segments = min(softcore.scope.adc.oa.hwMaxSegmentSamples // trig_count, 2**16 - 1)
+        if not softcore.scope._is_husky or max_segments < 2:
+            return None
+        
+        traces_matrix = np.empty((repetitions, trig_count), dtype=np.int16 if as_int else np.float64)
+        
+        softcore.scope.adc.offset = 0
+        softcore.scope.adc.samples = trig_count
+        cycle_counter_en = softcore.scope.adc.segment_cycle_counter_en
+        softcore.scope.adc.segment_cycle_counter_en = False
+        try:
+            for start in range(0, repetitions, max_segments):
+                segments = min(max_segments, repetitions - start)
+                softcore.scope.adc.segments = segments
+                
+                softcore.target.flush()
+                softcore.scope.arm()
+                for _ in range(segments):
+                    softcore.target.simpleserial_write(EXECUTE_PROGRAM, "A".encode())
+                    if not self._wait_for_program(softcore):
+                        raise Exception("Target did not finish program execution")
+                ret = softcore.scope.capture()
+                if ret:
+                    raise Exception("Capture error!")
+                
+                data = softcore.scope.get_last_trace(as_int=as_int)[:segments * trig_count]
+                traces_matrix[start:start + segments] = data.reshape(segments, trig_count)
+        finally:
+            softcore.scope.adc.segments = 1
+            softcore.scope.adc.segment_cycle_counter_en = cycle_counter_en
+        
+        return traces_matrix
+
+    def _to_float(self, trace, bits):
+        """Scales raw ADC integers to the floats get_last_trace() returns, between -0.5 and 0.5"""
+        return trace * 2.0**-bits - 0.5
+
+    def generate_data(self, software_name, softcore, repetitions = 1, platform="CW305_IBEX", force=False, save=True, as_int=False, stream=False, segmented=False):
         """Generate data for a specific software
         
         Args:
@@ -545,6 +1109,13 @@ include $(FIRMWAREPATH)/Makefile.inc
             platform (str): Name of the compile target platform
             force (bool): Whether to force data generation even if already done
             save (bool): Whether to save the data to disk
+            as_int (bool): If True, store raw ADC integers (int16) instead of scaled floats
+                           (float64). Traces are captured as integers either way and
+                           converted once; the saved dtype and ADC bits are recorded in the state
+            stream (bool): If True, capture traces longer than the sample buffer in a single
+                           stream mode run, falling back to windowed capture when needed
+            segmented (bool): If True, capture all repetitions of short programs as segments
+                              of a single arm and readback
             
         Returns:
             bool: True if data generation was successful, False otherwise
@@ -562,35 +1133,45 @@ include $(FIRMWAREPATH)/Makefile.inc
 
         try:
             softcore.reload(self.get_ext(software_name))
-
-            all_traces = []
-
-            for i in range(repetitions):
-                trace = self._capture_trace(software_name, softcore)
-                all_traces.append(trace)
+            bits = softcore.scope.adc.bits_per_sample
+
+            traces_matrix = None
+            if segmented and repetitions > 1:
+                # Segmented capture yields an equal length (repetitions, trig_count) matrix
+                traces_matrix = self._capture_traces_segmented(software_name, softcore, repetitions, as_int=True)
+                if traces_matrix is not None and not as_int:
+                    traces_matrix = self._to_float(traces_matrix, bits)
+
+            if traces_matrix is None:
+                all_traces = []
+                for i in range(repetitions):
+                    trace = self._capture_trace(software_name, softcore, as_int=True, stream=stream)
+                    # Scale before padding so padded samples stay 0.0
+                    all_traces.append(trace if as_int else self._to_float(trace, bits))
+
+                # Handle variable length traces by padding to longest
+                trace_lengths = [len(trace) for trace in all_traces]
+                max_length = max(trace_lengths)
+                if len(set(trace_lengths)) > 1:
+                    print(f"Variable trace lengths detected. Padding to max length: {max_length}")
+                    print(f"Length range: {min(trace_lengths)} - {max_length}")
+                    
+                    # Pad shorter traces with zeros
+                    padded_traces = []
+                    for i, trace in enumerate(all_traces):
+                        if len(trace) < max_length:
+                            padded_trace = np.pad(trace, (0, max_length - len(trace)), mode='constant', constant_values=0)
+                            padded_traces.append(padded_trace)
+                        else:
+                            padded_traces.append(trace)
+                    
+                    traces_matrix = np.array(padded_traces)
+                else:
+                    # All traces same length
+                    traces_matrix = np.array(all_traces)
+            trace = traces_matrix[-1]
             self.last_trace = trace
 
-            # Handle variable length traces by padding to longest
-            trace_lengths = [len(trace) for trace in all_traces]
-            max_length = max(trace_lengths)
-            if len(set(trace_lengths)) > 1:
-                print(f"Variable trace lengths detected. Padding to max length: {max_length}")
-                print(f"Length range: {min(trace_lengths)} - {max_length}")
-                
-                # Pad shorter traces with zeros
-                padded_traces = []
-                for i, trace in enumerate(all_traces):
-                    if len(trace) < max_length:
-                        padded_trace = np.pad(trace, (0, max_length - len(trace)), mode='constant', constant_values=0)
-                        padded_traces.append(padded_trace)
-                    else:
-                        padded_traces.append(trace)
-                
-                traces_matrix = np.array(padded_traces)
-            else:
-                # All traces same length
-                traces_matrix = np.array(all_traces)
-
             if save:
                 # Save the trace data
                 data_path = os.path.join(self.src_dir,software_name,"trace.npy")
@@ -599,6 +1180,8 @@ include $(FIRMWAREPATH)/Makefile.inc
                 # Update state
                 self.state[software_name]['data_generated'] = True
                 self.state[software_name]['data_timestamp'] = datetime.datetime.now().isoformat()
+                self.state[software_name]['trace_dtype'] = str(traces_matrix.dtype)
+                self.state[software_name]['adc_bits'] = int(bits)
                 self._save_state()
             
             print(f"Successfully captured trace of length {len(trace)} for {software_name}")
@@ -610,13 +1193,15 @@ include $(FIRMWAREPATH)/Makefile.inc
             print(f"Error generating data for {software_name}: {error_message}")        
             return False
 
-    def generate_all_data(self, softcore, repetitions=1, force=False):
+    def generate_all_data(self, softcore, repetitions=1, force=False, stream=False, segmented=False):
         """Generate data for all successfully compiled software
         
         Args:
             softcore (IbexChipWhisperer): Softcore on which to run and debug the software
             repetitions (int): How many repeated measurements should be captured per software
             force (bool): Whether to force data generation even if already done
+            stream (bool): Whether to use stream mode capture for long traces
+            segmented (bool): Whether to use segmented capture for repetitions of short programs
             
         Returns:
             tuple: Lists of successful and failed software names
@@ -633,7 +1218,7 @@ include $(FIRMWAREPATH)/Makefile.inc
                 failed.append(software_name)
                 continue
                 
-            if self.generate_data(software_name, softcore, repetitions=repetitions, force=force):
+            if self.generate_data(software_name, softcore, repetitions=repetitions, force=force, stream=stream, segmented=segmented):
                 successful.append(software_name)
             else:
                 failed.append(software_name)
@@ -731,6 +1316,50 @@ include $(FIRMWAREPATH)/Makefile.inc
         total_time = time.time() - start_time
         print(f"\n--- End of instructions: {instruction_count} instructions in {total_time:.2f}s ---\n")
 
+    def _run_gdb_trace_batched(self, gdb, software_name, output_path, max_timeout=24*3600):
+        """Step through the program inside GDB and only read back the final log
+        
+        The stepping loop runs as a GDB script, logging $pc and its disassembly to
+        gdb_log.txt until trigger_low is reached. Python waits for a single prompt
+        instead of two round-trips per instruction.
+        
+        Args:
+            gdb (pexpect.spawn): Primed GDB session
+            software_name (str): Name of the software
+            output_path (str): Directory containing gdb_log.txt
+            max_timeout (float): Maximum time in seconds to wait for the loop to finish
+        """
+        print("\n--- Instructions between trigger_high and trigger_low ---\n")
+        script_path = os.path.join(output_path, "gdb_trace.gdb")
+        with open(script_path, 'w') as f:
+            f.write(
+"""set pagination off
+set confirm off
+set logging enabled off
+set logging redirect on
+set logging enabled on
+while $pc != (unsigned int) &trigger_low
+  x/i $pc
+  stepi
+end
+set logging enabled off
+set logging redirect off
+""")
+        
+        start_time = time.time()
+        self._run_gdb_command_efficient(gdb, f"source {script_path}", max_timeout=max_timeout)
+        total_time = time.time() - start_time
+        
+        with open(os.path.join(output_path, "gdb_log.txt"), 'r') as f:
+            instruction_count = sum(1 for line in f if line.startswith("=>"))
+        print(f"\n--- File: {software_name} | End of instructions: {instruction_count} instructions in {total_time:.2f}s ---\n")
+
+    def _spike_elf_path(self, software_name):
+        """Get full path of the Spike build of software_name"""
+        tmp = self.get_ext(software_name, ext="elf").split("/")
+        tmp[-1] = "spike_" + tmp[-1]
+        return "/".join(tmp)
+
     def generate_labels(self, software_name, platform="CW305_IBEX", force=False):
         """Generate labels for a specific software via Spike simulation.
         
@@ -753,66 +1382,11 @@ include $(FIRMWAREPATH)/Makefile.inc
             
         software_dir = os.path.join(self.src_dir, software_name)
         
-        tmp = self.get_ext(software_name, ext="elf").split("/")
-        tmp[-1] = "spike_" + tmp[-1]
-        elf_path = "/".join(tmp)
-
-        spike_cmd_path = f'{software_dir}/spike_commands.txt'
-        
-        # Get start and end address
-        getSymbol = lambda dump, symbol: f"0x{[line for line in dump.stdout.splitlines() if symbol in line][0].split()[0]}"
-        
-        try:
-            print("Generating symbols")
-            result = subprocess.run(
-                ['riscv32-unknown-elf-nm', elf_path],
-                capture_output=True,
-                text=True
-            )
-            print("Generating Spike command file")
-            start_addr, end_addr = getSymbol(result, "execute_cw"), getSymbol(result, "trigger_low")
-            with open(spike_cmd_path, 'w') as f:
-                f.write(
-f"""until pc 0 {start_addr}
-untiln pc 0 {end_addr}
-quit
-""")
-        except Exception as e:
-            print(f"Failed to find start and end addresses: {e}")
+        print("Running Spike script")
+        success, message = _run_spike_labels(self._spike_elf_path(software_name), software_dir)
+        if not success:
+            print(message)
             return False
-
-        # Run Spike to generate instruction dump
-        try:
-            print("Running Spike script")
-            
-            result = subprocess.run([
-                'spike', '-d', 
-                f'--debug-cmd={spike_cmd_path}',
-                '--isa=rv32imc',
-                '-m0x100000:0x100000,0x20000:0x10000,0x80000000:0x100000',
-                elf_path
-            ],
-            capture_output=True,
-            text=True
-            )
-        except Exception as e:
-            print(f"Failed at Spike debugging stage: {e}")
-            return False
-
-        # Parse and save the labels
-        try:
-            raw_output = result.stderr.splitlines()[1:]
-            spike_pattern = r'core\s+\d+:\s+0x[0-9a-f]+\s+\(0x[0-9a-f]+\)\s+(.*)'
-            asm = [re.search(spike_pattern, line).group(1) for line in raw_output]
-    
-            with open(os.path.join(software_dir, "label_instr_reg.txt"), "w") as f:
-                f.write("\n".join(asm))
-            
-            instr = [line.split()[0] for line in asm]
-            with open(os.path.join(software_dir, "label_instr.txt"), "w") as f:
-                f.write("\n".join(instr))
-        except Exception as e:
-            print(f"Failed parsing and saving results: {e}")
         
         # Update state after successful implementation
         self.state[software_name]['labeled'] = True
@@ -820,17 +1394,20 @@ quit
         self._save_state()  # Save state after each successful run
         return True
 
-    def generate_all_labels(self, force=False):
+    def generate_all_labels(self, force=False, parallel=False, max_workers=None):
         """Generate labels for all software using spike
         
         Args:
             force (bool): Whether to force label generation even if already done
+            parallel (bool): Whether to run Spike in a pool of worker processes
+            max_workers (int, optional): Number of worker processes, defaults to the CPU count
             
         Returns:
             tuple: Lists of successful and failed software names
         """
         successful = []
         failed = []
+        pending = []
         
         for software_dir in self.software_dirs:
             software_name = os.path.basename(software_dir)
@@ -844,11 +1421,33 @@ quit
                 print(f"Skipping {software_name} - has already been labeled.")
                 successful.append(software_name)
                 continue
-                
-            if self.generate_labels(software_name, force=force):
-                successful.append(software_name)
+            
+            if not parallel:
+                if self.generate_labels(software_name, force=force):
+                    successful.append(software_name)
+                else:
+                    failed.append(software_name)
             else:
-                failed.append(software_name)
+                pending.append(software_name)
+        
+        if pending:
+            print(f"Labeling {len(pending)} software in parallel")
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(_run_spike_labels, self._spike_elf_path(software_name), self.get_dir(software_name)): software_name
+                    for software_name in pending
+                }
+                for future in as_completed(futures):
+                    software_name = futures[future]
+                    success, message = future.result()
+                    if success:
+                        self.state[software_name]['labeled'] = True
+                        self.state[software_name]['labeled_timestamp'] = datetime.datetime.now().isoformat()
+                        successful.append(software_name)
+                    else:
+                        print(f"{software_name}: {message}")
+                        failed.append(software_name)
+            self._save_state()
                 
         print(f"\n=== Label Generation Summary ===")
         print(f"Successful: {len(successful)}/{len(successful) + len(failed)}")
@@ -860,7 +1459,7 @@ quit
         
         
             
-    def debug_labels(self, software_name, softcore, platform="CW305_IBEX", force=False):
+    def debug_labels(self, software_name, softcore, platform="CW305_IBEX", force=False, batched=False):
         """Generate labels for a specific software
         
         Args:
@@ -868,6 +1467,7 @@ quit
             softcore (IbexChipWhisperer): Softcore on which to run and debug the software
             platform (str): Name of the compile target platform
             force (bool): Whether to force label generation even if already done
+            batched (bool): Whether to run the stepping loop inside GDB instead of per instruction from Python
             
         Returns:
             bool: True if label generation was successful, False otherwise
@@ -886,33 +1486,40 @@ quit
         hex_path = self.get_ext(software_name)
         elf_path = self.get_ext(software_name, ext="elf")
 
-        # Start program awaiting debugger
-        try: 
-            # Cleanup - kill openocd processes before running
-            subprocess.run(["killall", "openocd"], check=False)
-            if reset_process:
-                reset_process.terminate()
-                reset_process.join(timeout=2)
-        except Exception as e:
-            print(f"Warning during cleanup: {str(e)}")
-            pass
+        reset_process = None
+        gdb = None
+        if softcore.openocd is None:
+            try: 
+                # Cleanup - kill openocd processes before running
+                subprocess.run(["killall", "openocd"], check=False)
+            except Exception as e:
+                print(f"Warning during cleanup: {str(e)}")
+                pass
 
         try:
             print(f"Starting debugger for {software_name}...")
-            # Use multiprocessing to avoid blocking
-            reset_process = multiprocessing.Process(
-                target=softcore.reload,
-                args=(hex_path,),
-                kwargs={"debug": True}
-            )
-            reset_process.start()
+            if softcore.openocd is not None:
+                # The persistent OpenOCD serves GDB, which loads the program itself
+                softcore.openocd.start()
+            else:
+                # Start program awaiting debugger
+                # Use multiprocessing to avoid blocking
+                reset_process = multiprocessing.Process(
+                    target=softcore.reload,
+                    args=(hex_path,),
+                    kwargs={"debug": True}
+                )
+                reset_process.start()
 
             print(f"Launching GDB for {software_name}...")
             gdb = pexpect.spawn(f"riscv32-unknown-elf-gdb {elf_path}")
     
             self._prime_debugger(gdb, software_dir)
     
-            self._run_gdb_trace(gdb, software_name)
+            if batched:
+                self._run_gdb_trace_batched(gdb, software_name, software_dir)
+            else:
+                self._run_gdb_trace(gdb, software_name)
     
             print("Disconnecting gdb session\n")
             gdb.terminate()
@@ -941,12 +1548,13 @@ quit
                 reset_process.join(timeout=2)
             return False
 
-    def debug_all_labels(self, softcore, force=False):
+    def debug_all_labels(self, softcore, force=False, batched=False):
         """Generate labels for all software with data
         
         Args:
             softcore (IbexChipWhisperer): Softcore on which to run and debug the software
             force (bool): Whether to force label generation even if already done
+            batched (bool): Whether to run the stepping loop inside GDB
             
         Returns:
             tuple: Lists of successful and failed software names
@@ -967,7 +1575,7 @@ quit
                 successful.append(software_name)
                 continue
                 
-            if self.debug_labels(software_name, softcore, force=force):
+            if self.debug_labels(software_name, softcore, force=force, batched=batched):
                 successful.append(software_name)
             else:
                 failed.append(software_name)
@@ -1018,6 +1626,95 @@ quit
             
         return [os.path.basename(d) for d in self.software_dirs]
 
+class DatasetStore:
+    """
+    Memory-mapped, columnar view of a consolidated trace dataset.
+    
+    The dataset directory holds one contiguous sample file, an index with the
+    offset and length of every (program, repetition) trace, and the label token
+    arrays of every program. Nothing is read into RAM until it is sliced.
+    """
+    def __init__(self, dataset_path):
+        """Open a dataset written by DataWrangler.build_dataset_store
+        
+        Args:
+            dataset_path (str): Directory of the dataset
+        """
+        self.dataset_path = dataset_path
+        with open(os.path.join(dataset_path, "programs.json"), 'r') as f:
+            meta = json.load(f)
+        self.programs = meta["programs"]
+        self.vocab = meta["vocab"]
+        self.program_ids = {name: i for i, name in enumerate(self.programs)}
+        
+        load = lambda x: np.load(os.path.join(dataset_path, x), mmap_mode='r')
+        self.samples = load("samples.npy")
+        self.trace_index = load("trace_index.npy")  # (program_id, repetition, offset, length)
+        self.labels = load("labels.npy")
+        self.label_index = load("label_index.npy")  # (offset, length) per program_id
+        
+        # Rows of trace_index belonging to each program are stored contiguously
+        program_ids = np.asarray(self.trace_index[:, 0])
+        self._rows = np.searchsorted(program_ids, np.arange(len(self.programs) + 1))
+        
+    def __len__(self):
+        return len(self.programs)
+    
+    def get_trace(self, software_name, repetition=0):
+        """Return a single trace as a read-only memory-mapped view
+        
+        Args:
+            software_name (str): Name of the software
+            repetition (int): Index of the repetition
+            
+        Returns:
+            numpy.ndarray: 1-D trace
+        """
+        pid = self.program_ids[software_name]
+        if not 0 <= repetition < self._rows[pid + 1] - self._rows[pid]:
+            raise IndexError(f"{software_name} has no repetition {repetition}")
+        _, _, offset, length = self.trace_index[self._rows[pid] + repetition]
+        return self.samples[offset:offset + length]
+    
+    def get_traces(self, software_name):
+        """Return all repetitions of a program as a (repetitions, length) memory-mapped view
+        
+        Args:
+            software_name (str): Name of the software
+            
+        Returns:
+            numpy.ndarray: 2-D array of traces
+        """
+        pid = self.program_ids[software_name]
+        rows = self.trace_index[self._rows[pid]:self._rows[pid + 1]]
+        if not len(rows):
+            return self.samples[:0].reshape(0, 0)
+        offset, length = rows[0, 2], rows[0, 3]
+        return self.samples[offset:offset + len(rows) * length].reshape(len(rows), length)
+    
+    def get_label_tokens(self, software_name):
+        """Return the instruction label of a program as an array of token IDs
+        
+        Args:
+            software_name (str): Name of the software
+            
+        Returns:
+            numpy.ndarray: Token IDs indexing into self.vocab
+        """
+        offset, length = self.label_index[self.program_ids[software_name]]
+        return self.labels[offset:offset + length]
+    
+    def get_labels(self, software_name):
+        """Return the instruction label of a program as a list of instruction names
+        
+        Args:
+            software_name (str): Name of the software
+            
+        Returns:
+            list: Instruction names
+        """
+        return [self.vocab[token] for token in self.get_label_tokens(software_name)]
+
 class DataWrangler(ProjectBaseClass):
     """
     DataWrangler to handle data parsing and analysis.
@@ -1152,43 +1849,143 @@ class DataWrangler(ProjectBaseClass):
                     agr_dct[key] += val
         return agr_dct
     
-    def parse_labels(self, software_name=None, source='gdb'):
+    def _label_cache_path(self, source):
+        return os.path.join(self.software_path, f"label_cache_{source}.pkl")
+
+    def _update_label_cache(self, source='gdb', software_names=None):
+        """
+        Parse only the label files that changed since they were last cached.
+        
+        The cache is keyed on each file's mtime and size and only stores token IDs:
+        every program's instructions index into an append-only vocabulary, and its
+        operand strings (as written by gen_labels) into an append-only operand vocabulary.
+        
+        Args:
+            source (str): Data source - 'gdb' or 'spike'
+            software_names (list, optional): Software to refresh. Defaults to all software.
+            
+        Returns:
+            dict: Cache with 'vocab' and 'operand_vocab' (lists) and 'programs' (dict of
+                  per-software entries with 'tokens' and 'operands' arrays)
+        """
+        cache_path = self._label_cache_path(source)
+        empty_cache = {'version': 2, 'vocab': [], 'operand_vocab': [], 'programs': {}}
+        cache = empty_cache
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'rb') as f:
+                    cache = pickle.load(f)
+            except (pickle.UnpicklingError, EOFError, IOError) as e:
+                print(f"Error loading label cache: {e}")
+            if cache.get('version') != empty_cache['version']:
+                cache = empty_cache
+        
+        vocab = cache['vocab']
+        operand_vocab = cache['operand_vocab']
+        token_ids = {token: i for i, token in enumerate(vocab)}
+        operand_ids = {operand: i for i, operand in enumerate(operand_vocab)}
+        filename = "gdb_log.txt" if source == 'gdb' else "label_instr.txt"
+        changed = False
+        
+        for sw in (software_names if software_names is not None else self.software_names):
+            path = os.path.join(self.software_dict[sw], filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                if cache['programs'].pop(sw, None) is not None:
+                    changed = True
+                continue
+            
+            entry = cache['programs'].get(sw)
+            if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                continue
+            
+            with open(path, 'r') as f:
+                lines = self.parse_raw_data(f.read(), source)
+            tokens = np.empty(len(lines), dtype=np.int32)
+            operands = np.empty(len(lines), dtype=np.int32)
+            for i, entry in enumerate(lines):
+                operand = " ".join(entry[1:])
+                if entry[0] not in token_ids:
+                    token_ids[entry[0]] = len(vocab)
+                    vocab.append(entry[0])
+                if operand not in operand_ids:
+                    operand_ids[operand] = len(operand_vocab)
+                    operand_vocab.append(operand)
+                tokens[i] = token_ids[entry[0]]
+                operands[i] = operand_ids[operand]
+            cache['programs'][sw] = {
+                'mtime': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'tokens': tokens,
+                'operands': operands
+            }
+            changed = True
+        
+        if changed:
+            try:
+                with open(cache_path, 'wb') as f:
+                    pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            except IOError as e:
+                print(f"Error saving label cache: {e}")
+        return cache
+
+    def count_tokens(self, tokens, vocab_size):
+        """
+        Count occurrences of each token ID.
+        
+        Args:
+            tokens (numpy.ndarray): Token IDs
+            vocab_size (int): Size of the vocabulary
+            
+        Returns:
+            numpy.ndarray: Count per token ID
+        """
+        return np.bincount(tokens, minlength=vocab_size)
+
+    def parse_labels(self, software_name=None, source='gdb', instruction_lines=False, instructions=False):
         """
         Parse instruction logs into structured instruction data.
         
+        Only label files that changed since the last call are re-read; see _update_label_cache.
+        Labels are returned as token ID arrays into 'vocab'; the string lists are only built
+        when asked for.
+        
         Args:
             software_name (str, optional): Name of the software to parse labels for.
                                           If None, parses labels for all software.
             source (str): Data source - 'gdb' or 'spike'
+            instruction_lines (bool): Also return the parsed lines of every program
+                                      ('instruction_lines'), read from the label files
+            instructions (bool): Also return the instruction names of every program ('instructions')
         
         Returns:
-            dict or list: Parsed instruction data
+            dict or list: Parsed instruction data, or the parsed lines of software_name
         """
-        raw_data_dict = self.get_raw_labels(software_name, source=source)
-        
         if software_name:
-            return self.parse_raw_data(raw_data_dict, source)
+            return self.parse_raw_data(self.get_raw_labels(software_name, source=source), source)
         
         # Process for all software
-        instruction_line_dict = {
-            key: self.parse_raw_data(val, source) 
-            for key, val in raw_data_dict.items() if val
-        }
-        instruction_dict = {
-            key: self.extract_instructions(val) 
-            for key, val in instruction_line_dict.items()
-        }
-        count_dict = {
-            key: self.count_instructions(val) 
-            for key, val in instruction_dict.items()
-        }
-        
-        return {
-            'instruction_lines': instruction_line_dict,
-            'instructions': instruction_dict,
-            'counts': count_dict,
-            'aggregate_counts': self.aggregate_counts(count_dict)
+        cache = self._update_label_cache(source)
+        vocab = cache['vocab']
+        programs = {key: val for key, val in cache['programs'].items() if len(val['tokens']) and key in self.software_dict}
+        
+        count_arrays = {key: self.count_tokens(val['tokens'], len(vocab)) for key, val in programs.items()}
+        aggregate = np.sum(list(count_arrays.values()), axis=0) if count_arrays else np.zeros(len(vocab), dtype=np.int64)
+        to_dict = lambda counts: {vocab[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+        
+        result = {
+            'tokens': {key: val['tokens'] for key, val in programs.items()},
+            'vocab': vocab,
+            'counts': {key: to_dict(val) for key, val in count_arrays.items()},
+            'aggregate_counts': to_dict(aggregate)
         }
+        if instructions:
+            vocab_array = np.array(vocab, dtype=object)
+            result['instructions'] = {key: vocab_array[val['tokens']].tolist() for key, val in programs.items()}
+        if instruction_lines:
+            result['instruction_lines'] = {key: self.parse_labels(key, source) for key in programs}
+        return result
 
     def gen_labels(self, force=False):
         """
@@ -1206,15 +2003,20 @@ class DataWrangler(ProjectBaseClass):
         Returns:
             None
         """
-        label_dict = self.parse_labels()["instruction_lines"]
-        for sw, labels in label_dict.items():
+        cache = self._update_label_cache()
+        vocab = np.array(cache['vocab'], dtype=object)
+        operand_vocab = np.array(cache['operand_vocab'], dtype=object)
+        for sw, entry in cache['programs'].items():
+            if not len(entry['tokens']) or sw not in self.software_dict:
+                continue
+            instructions = vocab[entry['tokens']]
+            
             # Process instructions-only file
             label_path = os.path.join(self.get_dir(sw), "debug_instr.txt")
             
             # Only write if file doesn't exist or force=True
             if force or not os.path.exists(label_path):
                 with open(label_path, "w") as f:
-                    instructions = [instr[0] for instr in labels]
                     f.write("\n".join(instructions))
             
             # Process instructions-with-registers file independently
@@ -1223,14 +2025,8 @@ class DataWrangler(ProjectBaseClass):
             # Only write if file doesn't exist or force=True
             if force or not os.path.exists(reg_label_path):
                 with open(reg_label_path, "w") as f:
-                    instr_reg_list = []
-                    for instr_parts in labels:
-                        if len(instr_parts) > 1:
-                            full_instr = instr_parts[0] + " " + " ".join(instr_parts[1:])
-                            instr_reg_list.append(full_instr.strip())
-                        else:
-                            instr_reg_list.append(instr_parts[0].strip())
-                    
+                    instr_reg_list = [(instr + " " + operand).strip()
+                                      for instr, operand in zip(instructions, operand_vocab[entry['operands']])]
                     f.write("\n".join(instr_reg_list))
 
     def genDatasetFairseq(self, dataset_dict, name="dataset", manifest_dir=None):
@@ -1262,7 +2058,7 @@ class DataWrangler(ProjectBaseClass):
         os.makedirs(dataset_path, exist_ok=True)
         
         # Parse the instruction labels for all software
-        parsed_labels = self.parse_labels(source="spike")
+        parsed_labels = self.parse_labels(source="spike", instructions=True)
         vocab = set()
         #agr_dict = parsed_labels["aggregate_counts"]
         #self.generateVocab(agr_dict.keys(), dataset_path)
@@ -1287,10 +2083,9 @@ class DataWrangler(ProjectBaseClass):
                 # Copy trace file to dataset directory with unique name
                 dest_trace_filename = f"{sw}_traces.npy"
                 dest_trace_path = os.path.join(partition_dir, dest_trace_filename)
-                shutil.copy2(source_trace_path, dest_trace_path)
                 
                 # Get trace dimensions and handle 1D vectors
-                trace_data = np.load(source_trace_path)
+                trace_data = np.load(source_trace_path, mmap_mode='r')
                 if trace_data.ndim == 1:
                     # Reshape 1D vector to a 2D matrix with a single row
                     trace_data = trace_data.reshape(1, -1)
@@ -1334,6 +2129,107 @@ class DataWrangler(ProjectBaseClass):
         print(f"Dataset '{name}' generated successfully in {dataset_path}")
         print(f"Manifests created at {os.path.join(dataset_path, 'manifest_*.json')}")
 
+    def build_dataset_store(self, name="store", software_names=None, source='spike'):
+        """
+        Consolidate per-program trace.npy files and labels into a memory-mappable dataset.
+        
+        Writes to datasets/<name>:
+        - samples.npy: all trace samples, concatenated
+        - trace_index.npy: (program_id, repetition, offset, length) per trace
+        - labels.npy: all instruction token IDs, concatenated
+        - label_index.npy: (offset, length) of the label of each program
+        - programs.json: program names and the token vocabulary
+        
+        Traces are copied one program at a time, so the corpus never has to fit in memory.
+        Labels are remapped from the cached token arrays of parse_labels. Programs saved as
+        raw ADC integers cannot be mixed with programs saved as scaled floats.
+        
+        Args:
+            name (str): Name of the dataset
+            software_names (list, optional): Software to include. Defaults to all software with traces.
+            source (str): Label source - 'gdb' or 'spike'
+            
+        Returns:
+            DatasetStore: The opened dataset
+        """
+        if software_names is None:
+            software_names = [sw for sw in self.software_names
+                              if os.path.exists(os.path.join(self.software_dict[sw], "trace.npy"))]
+        
+        dataset_path = os.path.join(self.root_path, "datasets", name)
+        os.makedirs(dataset_path, exist_ok=True)
+        
+        def open_trace(sw):
+            path = os.path.join(self.software_dict[sw], "trace.npy")
+            try:
+                trace_data = np.load(path, mmap_mode='r')
+            except ValueError:
+                # Object arrays cannot be memory-mapped
+                trace_data = np.asarray(np.load(path, allow_pickle=True))
+            return trace_data.reshape(1, -1) if trace_data.ndim == 1 else trace_data
+        
+        # First pass: only read the .npy headers to size the output
+        shapes = {}
+        dtypes = []
+        for sw in software_names:
+            trace_data = open_trace(sw)
+            shapes[sw] = trace_data.shape
+            dtypes.append(trace_data.dtype)
+        total = sum(reps * length for reps, length in shapes.values())
+        is_int = [np.issubdtype(dtype, np.integer) for dtype in dtypes]
+        if any(is_int) and not all(is_int):
+            ints = [sw for sw, i in zip(software_names, is_int) if i]
+            floats = [sw for sw, i in zip(software_names, is_int) if not i]
+            raise ValueError(f"Cannot mix integer traces ({', '.join(ints)}) with float traces "
+                             f"({', '.join(floats)}); regenerate them with the same as_int setting")
+        
+        samples = np.lib.format.open_memmap(os.path.join(dataset_path, "samples.npy"), mode='w+',
+                                            dtype=np.result_type(*dtypes) if dtypes else np.float64, shape=(total,))
+        trace_index = []
+        offset = 0
+        for pid, sw in enumerate(software_names):
+            reps, length = shapes[sw]
+            samples[offset:offset + reps * length] = open_trace(sw).reshape(-1)
+            trace_index.extend((pid, rep, offset + rep * length, length) for rep in range(reps))
+            offset += reps * length
+        samples.flush()
+        del samples
+        np.save(os.path.join(dataset_path, "trace_index.npy"), np.array(trace_index, dtype=np.int64).reshape(-1, 4))
+        
+        # Labels as token IDs, remapped from the cache's vocabulary to the sorted
+        # vocabulary of the programs in this dataset
+        parsed = self.parse_labels(source=source)
+        cached_tokens = [parsed['tokens'].get(sw, np.zeros(0, dtype=np.int32)) for sw in software_names]
+        used = np.unique(np.concatenate(cached_tokens)) if cached_tokens else np.zeros(0, dtype=np.int32)
+        vocab = sorted(parsed['vocab'][i] for i in used)
+        remap = np.zeros(len(parsed['vocab']), dtype=np.int32)
+        token_ids = {token: i for i, token in enumerate(vocab)}
+        remap[used] = [token_ids[parsed['vocab'][i]] for i in used]
+        label_tokens = [remap[tokens] for tokens in cached_tokens]
+        lengths = np.array([len(tokens) for tokens in label_tokens], dtype=np.int64)
+        label_index = np.stack([np.cumsum(lengths) - lengths, lengths], axis=1) if len(lengths) else np.zeros((0, 2), dtype=np.int64)
+        np.save(os.path.join(dataset_path, "labels.npy"),
+                np.concatenate(label_tokens) if label_tokens else np.zeros(0, dtype=np.int32))
+        np.save(os.path.join(dataset_path, "label_index.npy"), label_index)
+        
+        with open(os.path.join(dataset_path, "programs.json"), 'w') as f:
+            json.dump({"programs": list(software_names), "vocab": vocab}, f, indent=2)
+        
+        print(f"Dataset store '{name}' with {len(software_names)} programs written to {dataset_path}")
+        return DatasetStore(dataset_path)
+    
+    def open_dataset_store(self, name="store"):
+        """
+        Open a dataset written by build_dataset_store without loading it into memory.
+        
+        Args:
+            name (str): Name of the dataset
+            
+        Returns:
+            DatasetStore: The opened dataset
+        """
+        return DatasetStore(os.path.join(self.root_path, "datasets", name))
+
     def generateVocab(self, labels, out_dir):
         """
         labels: list of strings, labels to generate vocab from
@@ -212,7 +212,7 @@ def open_project(filename : str):
     return proj
 
 
-def create_project(filename : str, overwrite : bool=False):
+def create_project(filename : str, overwrite : bool=False, trace_format : str="native"):
     """Create a new project with the path <filename>.
 
     If <overwrite> is False, raise an OSError if this path already exists.
@@ -222,6 +222,9 @@ def create_project(filename : str, overwrite : bool=False):
        overwrite (bool, optional): Whether or not to overwrite an existing
            project with <filename>. Raises an OSError if path already exists
            and this is false. Defaults to false.
+       trace_format (str, optional): How the traces are stored on disk,
+           'native' or 'compressed' (chunked and zlib compressed, int16 for
+           ADC data). Defaults to 'native'.
 
     Returns:
        A chipwhisperer project object.
@@ -237,7 +240,7 @@ def create_project(filename : str, overwrite : bool=False):
     # If the user gives a relative path including ~, expand to the absolute path
     filename = os.path.abspath(os.path.expanduser(filename))
 
-    proj = project.Project()
+    proj = project.Project(trace_format=trace_format)
     proj.setFilename(filename)
 
     return proj
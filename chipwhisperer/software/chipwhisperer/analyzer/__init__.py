@@ -1,4 +1,4 @@
-from chipwhisperer.analyzer.attacks.snr import calculate_snr
+from chipwhisperer.analyzer.attacks.snr import calculate_snr, SNRAccumulator
 from chipwhisperer.analyzer.attacks import cpa_algorithms
 from chipwhisperer.analyzer import preprocessing
 from chipwhisperer.common.utils.util import camel_case_deprecated
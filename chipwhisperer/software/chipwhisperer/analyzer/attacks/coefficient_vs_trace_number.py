@@ -1,6 +1,9 @@
+import itertools
+
 import matplotlib.pyplot as plt # type: ignore
-from tqdm import tnrange # type: ignore
+from tqdm.autonotebook import tqdm # type: ignore
 import numpy as np
+from chipwhisperer.common.api.ProjectFormat import Project
 
 class CoefficientVsTracesNumber:
     """Calculate coefficient from increasing number of traces.
@@ -19,6 +22,9 @@ class CoefficientVsTracesNumber:
     calculate coming E(X2 * Y2), E(X2), E(Y2), E(X2**2), E(Y2**2).
     We can get the new coefficient([X1, X2], [Y1, Y2]) without overlapping coefficient(X1, Y1) that we have calculated.
 
+    The running sums are kept for all 256 guesses of every requested subkey,
+    and each interval of traces is folded in with one matrix product per
+    subkey, so the traces are streamed and never all loaded at once.
 
     Example:
         import chipwhisperer.analyzer as cwa
@@ -32,10 +38,16 @@ class CoefficientVsTracesNumber:
         results = coefficient.get_effecient()
         coefficient.plot_and_save(results, [20,8], 'your_path_saving_figure')
 
+        # All subkeys at once, as a (16, 256, intervals) array
+        coefficient = CoefficientVsTracesNumber(proj.traces, range(16), interval, leak_model)
+        results = coefficient.get_coefficients()
+
 
     Args:
         traces (Iterable of :class:`Traces <chipwhisperer.common.traces.Trace>`): An iterable of traces.
-        subkey (int): The subkey you want to obverse.
+            A Project or a trace source with get_traces() (such as a preprocessing
+            module) is read in batches of interval traces.
+        subkey (int or Iterable of int): The subkey(s) you want to obverse.
         interval (int): The number of traces that we use for once calculation.
         leak_model (ModelsBase): A leakage model selected from.
 
@@ -45,60 +57,145 @@ class CoefficientVsTracesNumber:
         self.subkey_index = subkey_index
         self.interval = interval
         self.leak_model = leak_model
+        self.reset()
+
+    @property
+    def subkeys(self):
+        """List of the subkeys being tracked"""
+        if isinstance(self.subkey_index, (int, np.integer)):
+            return [int(self.subkey_index)]
+        return [int(bnum) for bnum in self.subkey_index]
+
+    def reset(self):
+        """Clear the running sums"""
+        self.num_traces = 0
+        self._t_offset = None
+        self._sum_t = None
+        self._sum_t2 = None
+        self._sum_h = None
+        self._sum_h2 = None
+        self._sum_ht = None
+
+    def _hypotheses(self, bnum, textins, textouts, keys):
+        """(N, 256) leakage of every trace for every guess of subkey bnum"""
+        if hasattr(self.leak_model, 'leakage_batch') and not getattr(self.leak_model, '_has_prev', False):
+            try:
+                pts = np.asarray(textins, dtype=np.uint8)
+                cts = np.asarray(textouts, dtype=np.uint8)
+                kys = np.asarray(keys, dtype=np.uint8)
+            except (TypeError, ValueError):
+                pass
+            else:
+                return self.leak_model.leakage_batch(pts, cts, np.arange(256), bnum, kys).astype(np.float64)
+
+        return np.array([[self.leak_model.leakage(textin, textout, kguess, bnum, {'knownkey': key})
+                          for kguess in range(256)]
+                         for textin, textout, key in zip(textins, textouts, keys)], dtype=np.float64)
+
+    def add_traces(self, waves, textins, textouts, keys):
+        """Fold a batch of traces into the running sums.
+
+        Args:
+            waves (array): (N, points) power traces
+            textins (array): (N, 16) plaintexts
+            textouts (array): (N, 16) ciphertexts
+            keys (array): (N, 16) known keys
+
+        Returns:
+            (len(subkeys), 256) array of the maximum absolute correlation of each
+            guess over all the traces added so far.
+        """
+        waves = np.asarray(waves, dtype=np.float64)
+        subkeys = self.subkeys
+        if self._sum_t is None:
+            # Offset by the first batch mean so the sums don't lose precision
+            # to a large DC component. Correlation doesn't depend on it.
+            self._t_offset = np.mean(waves, axis=0)
+            self._sum_t = np.zeros(waves.shape[1])
+            self._sum_t2 = np.zeros(waves.shape[1])
+            self._sum_h = np.zeros((len(subkeys), 256))
+            self._sum_h2 = np.zeros((len(subkeys), 256))
+            self._sum_ht = np.zeros((len(subkeys), 256, waves.shape[1]))
+
+        waves = waves - self._t_offset
+        self.num_traces += len(waves)
+        self._sum_t += np.sum(waves, axis=0)
+        self._sum_t2 += np.sum(waves ** 2, axis=0)
+
+        for i, bnum in enumerate(subkeys):
+            hyp = self._hypotheses(bnum, textins, textouts, keys)
+            self._sum_h[i] += np.sum(hyp, axis=0)
+            self._sum_h2[i] += np.sum(hyp ** 2, axis=0)
+            self._sum_ht[i] += np.dot(hyp.T, waves)
+
+        return self.max_coefficients()
+
+    def max_coefficients(self):
+        """(len(subkeys), 256) maximum absolute correlation over the trace points"""
+        n = self.num_traces
+        var_t = n * self._sum_t2 - self._sum_t ** 2
+        var_h = n * self._sum_h2 - self._sum_h ** 2
+        cov = n * self._sum_ht - self._sum_h[:, :, None] * self._sum_t
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cpaoutput = cov / np.sqrt(var_h[:, :, None] * var_t)
+        # Constant points/guesses have no defined correlation
+        return np.max(np.abs(np.nan_to_num(cpaoutput, nan=0.0, posinf=0.0, neginf=0.0)), axis=2)
+
+    def _batches(self):
+        """Yield (waves, textins, textouts, keys) for each full interval of traces"""
+        source = self.traces
+        if isinstance(source, Project):
+            source = source.trace_manager()
+
+        if hasattr(source, 'get_traces'):
+            for start in range(0, source.num_traces() - self.interval + 1, self.interval):
+                end = start + self.interval
+                yield (source.get_traces(start, end),
+                       [source.get_textin(n) for n in range(start, end)],
+                       [source.get_textout(n) for n in range(start, end)],
+                       [source.get_known_key(n) for n in range(start, end)])
+            return
+
+        it = iter(source)
+        while True:
+            batch = list(itertools.islice(it, self.interval))
+            if len(batch) < self.interval:
+                return
+            yield ([t.wave for t in batch], [t.textin for t in batch],
+                   [t.textout for t in batch], [t.key for t in batch])
+
+    def _num_intervals(self):
+        try:
+            if isinstance(self.traces, Project):
+                return len(self.traces.traces) // self.interval
+            if hasattr(self.traces, 'get_traces'):
+                return self.traces.num_traces() // self.interval
+            return len(self.traces) // self.interval
+        except TypeError:
+            return None
+
+    def get_coefficients(self):
+        """Maximum absolute correlation of every guess after each interval of traces.
+
+        Traces left over after the last full interval are ignored.
+
+        Returns:
+            (256, intervals) array, or (len(subkeys), 256, intervals) if subkey_index
+            is an iterable of subkeys.
+        """
+        self.reset()
+        all_coef = [self.add_traces(*batch) for batch in tqdm(self._batches(), total=self._num_intervals())]
+        if all_coef:
+            all_coef = np.stack(all_coef, axis=-1)
+        else:
+            all_coef = np.zeros((len(self.subkeys), 256, 0))
+
+        if isinstance(self.subkey_index, (int, np.integer)):
+            return all_coef[0]
+        return all_coef
 
     def get_effecient(self):
-        # Get all hamming weights or other measurements related to leakage.
-        all_hws = []
-        for kguess in tnrange(0, 256):
-            all_hws.append(np.array([self.leak_model.leakage(trace_tmp.textin, trace_tmp.textout, kguess, self.subkey_index, {'knownkey': trace_tmp.key}) for trace_tmp in self.traces]))
-        maxcpa = [0] * 256
-        all_traces = np.array(list(map(lambda x:x.wave, self.traces)))
-
-        N = len(all_traces)
-        all_coef = [[0 for _ in range(int(N / self.interval))] for _ in range(256)]
-
-        # Initialize first state by first set of traces.
-        trace_array = all_traces[:self.interval]
-        t_bar = self.mean(trace_array)
-        t_old_square_bar = self.mean(trace_array ** 2)
-        o_t = self.std_dev(trace_array, t_bar)
-        all_hws_bar = []
-        all_hws_old_square_bar = []
-        all_hws_x_t_bar = []
-
-        for kguess in range(256):
-            hws = all_hws[kguess][: self.interval][:, np.newaxis]
-            all_hws_bar.append(self.mean(hws))
-            o_hws = self.std_dev(hws, all_hws_bar[kguess])
-            all_hws_old_square_bar.append(self.mean(hws ** 2))
-            all_hws_x_t_bar.append(self.mean(hws * trace_array))
-            correlation = self.cov(trace_array, t_bar, hws, all_hws_bar[kguess])
-            cpaoutput = correlation / (o_t * o_hws)
-            maxcpa[kguess] = max(abs(cpaoutput))
-
-        for j in range(256):
-            all_coef[j][0] = maxcpa[j]
-
-        # Update correaltion by coming traces.
-        for i in tnrange(1, int(N/interval)):
-            trace_array = all_traces[i * self.interval:(i  +1) * self.interval]
-            maxcpa = [0] * 256
-            t_bar = self.continue_mean(trace_array, t_bar, i)
-            o_t, t_old_square_bar = self.continue_std(trace_array, t_bar, t_old_square_bar, i)
-
-            for kguess in range(256):
-                hws = all_hws[kguess][i * self.interval: (i + 1) * self.interval][:, np.newaxis]
-                all_hws_bar[kguess] = self.continue_mean(hws, all_hws_bar[kguess], i)
-                o_hws, tmp_square = self.continue_std(hws, all_hws_bar[kguess], all_hws_old_square_bar[kguess], i)
-                all_hws_old_square_bar[kguess] = tmp_square
-                all_hws_x_t_bar[kguess] = self.continue_mean(hws * trace_array, all_hws_x_t_bar[kguess], i)
-                correlation = self.continue_cov(all_hws_x_t_bar[kguess], t_bar, all_hws_bar[kguess])
-                cpaoutput = correlation/(o_t*o_hws)
-                maxcpa[kguess] = max(abs(cpaoutput))
-
-            for j in range(256):
-                all_coef[j][i] = maxcpa[j]
-        return all_coef
+        return self.get_coefficients().tolist()
 
     def plot_and_save(self, all_coef, figsize, save_path=None):
         plt.figure(figsize=[20,8])
@@ -107,23 +204,3 @@ class CoefficientVsTracesNumber:
         if save_path:
             plt.savefig(save_path)
         plt.show()
-
-    def mean(self, X):
-        return np.sum(X, axis=0)/len(X)
-
-    def std_dev(self, X, X_bar):
-        return np.sqrt(np.sum((X-X_bar)**2, axis=0))
-
-    def cov(self, X, X_bar, Y, Y_bar):
-        return np.sum((X-X_bar)*(Y-Y_bar), axis=0)
-
-    def continue_mean(self, X, X_old_bar, n):
-        return (X_old_bar*n + self.mean(X))/(n + 1)
-
-    def continue_std(self, X, X_bar, X_old_square_bar, n):
-        X_square_bar = self.continue_mean(X**2, X_old_square_bar, n)
-        output = np.sqrt(X_square_bar - X_bar**2)
-        return output, X_square_bar
-
-    def continue_cov(self, XY_bar, X_bar, Y_bar):
-        return XY_bar - X_bar * Y_bar
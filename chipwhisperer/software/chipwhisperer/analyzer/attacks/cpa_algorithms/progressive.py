@@ -32,134 +32,160 @@ from ..algorithmsbase import AlgorithmsBase
 from chipwhisperer.logging import *
 
 
-class CPAProgressiveOneSubkey(object):
-    """This class is the basic progressive CPA attack, capable of adding traces onto a variable with previous data"""
-    def __init__(self, model):
+class CPAProgressiveSubkeys(object):
+    """This class is the basic progressive CPA attack, capable of adding traces onto a variable with previous data.
+
+    All subkeys in bnums are attacked together: the hypotheses of every subkey are
+    stacked into one (traces, subkeys, guesses) array per batch of traces, and the
+    sums of every subkey and guess are updated with a single matrix product.
+    """
+    def __init__(self, model, bnums):
         self.model = model
-        self.sumhq = [0] * self.model.getPermPerSubkey()
-        self.sumtq = [0]
-        self.sumt = [0]
-        self.sumh = [0] * self.model.getPermPerSubkey()
-        self.sumht = [0] * self.model.getPermPerSubkey()
-        self.totalTraces = 0
+        self.bnums = list(bnums)
+        #Allocated once the number of points is known
+        self.sumh = None
+        self.sumhq = None
+        self.sumt = None
+        self.sumtq = None
+        self.sumht = None
+        self.totalTraces = np.zeros(len(self.bnums), dtype=np.int64)
         self.modelstate = {'knownkey':None}
 
-    def oneSubkey(self, bnum, pointRange, traces_all, numtraces, plaintexts, ciphertexts, knownkeys, progressBar, state, pbcnt):
-        diffs = [0] * self.model.getPermPerSubkey()
-        self.totalTraces += numtraces
-
-        if pointRange == None:
-            traces = traces_all
-            # padbefore = 0
-            # padafter = 0
-        else:
-            traces = traces_all[:, pointRange[0] : pointRange[1]]
-            # padbefore = pointRange[0]
-            # padafter = len(traces_all[0, :]) - pointRange[1]
-            # print "%d - %d (%d %d)" % (pointRange[0], pointRange[1], padbefore, padafter)
-
-        self.sumtq += np.sum(np.square(traces), axis=0, dtype=np.longdouble)
-        self.sumt += np.sum(traces, axis=0, dtype=np.longdouble)
-        sumden2 = np.square(self.sumt) - self.totalTraces * self.sumtq
-
-        #For each 0..0xFF possible value of the key byte
-        for key in range(0, self.model.getPermPerSubkey()):
-            #Initialize arrays & variables to zero
-            sumnum = np.zeros(len(traces[0,:]))
-            # sumden1 = np.zeros(len(traces[0,:]))
-            # sumden2 = np.zeros(len(traces[0,:]))
-
-            hyp = [0] * numtraces
-
-            #Formula for CPA & description found in "Power Analysis Attacks"
-            # by Mangard et al, page 124, formula 6.2.
-            #
-            # This has been modified to reduce computational requirements such that adding a new waveform
-            # doesn't require you to recalculate everything
-
-            prev_cts = np.insert(ciphertexts[:-1], 0, 0, axis=0)
-            prev_pts = np.insert(plaintexts[:-1], 0, 0, axis=0)
-            #Generate hypotheticals
-            for tnum in range(numtraces):
-
-                if len(plaintexts) > 0:
-                    pt = plaintexts[tnum]
-
-                if len(ciphertexts) > 0:
-                    ct = ciphertexts[tnum]
-
-                if len(prev_cts) > 0:
-                    prev_ct = prev_cts[tnum]
+    def hypotheses(self, bnum, numtraces, plaintexts, ciphertexts, knownkeys, state):
+        """Build the (numtraces, perms) matrix of hypothetical leakages for subkey bnum"""
+        perms = self.model.getPermPerSubkey()
+        prev_cts = np.insert(ciphertexts[:-1], 0, 0, axis=0)
+        prev_pts = np.insert(plaintexts[:-1], 0, 0, axis=0)
+
+        if hasattr(self.model, 'leakage_batch'):
+            try:
+                pts = np.asarray(plaintexts, dtype=np.uint8).reshape(numtraces, -1)
+                cts = np.asarray(ciphertexts, dtype=np.uint8).reshape(numtraces, -1)
+            except (TypeError, ValueError):
+                #Missing textin/textout, let the model deal with it one trace at a time
+                pts = cts = None
+
+            if pts is not None:
+                keys = knownkeys if knownkeys and len(knownkeys) > 0 else None
+                state['knownkey'] = keys[numtraces - 1] if keys else None
+                #Every trace for every guess in one call
+                guesses = np.arange(perms)
+                if self.model._has_prev:
+                    return self.model.leakage_batch(pts, cts, guesses, bnum, keys, prev_pts=prev_pts, prev_cts=prev_cts).astype(np.float64)
+                return self.model.leakage_batch(pts, cts, guesses, bnum, keys).astype(np.float64)
 
-                if len(prev_pts) > 0:
-                    prev_pt = prev_pts[tnum]
+        hyp = np.zeros((numtraces, perms))
+        for tnum in range(numtraces):
+            pt = plaintexts[tnum] if len(plaintexts) > 0 else None
+            ct = ciphertexts[tnum] if len(ciphertexts) > 0 else None
+            prev_ct = prev_cts[tnum] if len(prev_cts) > 0 else None
+            prev_pt = prev_pts[tnum] if len(prev_pts) > 0 else None
 
+            if knownkeys and len(knownkeys) > 0:
+                nk = knownkeys[tnum]
+            else:
+                nk = None
 
-                if knownkeys and len(knownkeys) > 0:
-                    nk = knownkeys[tnum]
-                else:
-                    nk = None
-
-                state['knownkey'] = nk
+            state['knownkey'] = nk
 
+            for key in range(perms):
                 if self.model._has_prev:
-                    hypint = self.model.leakage(pt, ct, prev_pt, prev_ct, key, bnum, state)
+                    hyp[tnum, key] = self.model.leakage(pt, ct, prev_pt, prev_ct, key, bnum, state)
                 else:
-                    hypint = self.model.leakage(pt, ct, key, bnum, state)
-
-                hyp[tnum] = hypint
-
-            hyp = np.array(hyp)
-
-            self.sumh[key] += np.sum(hyp, axis=0, dtype=np.longdouble)
-            self.sumht[key] += np.sum(np.multiply(np.transpose(traces), hyp), axis=1, dtype=np.longdouble)
-
-            #WARNING: not casting to np.float64 causes algorithm degredation... always be careful
-            #meanh = self.sumh[key] / np.float64(self.totalTraces)
-            #meant = self.sumt[key] / np.float64(self.totalTraces)
-
-            #numtraces * meanh * meant = sumh * meant
-            #sumnum =  self.sumht[key] - meant*self.sumh[key] - meanh*self.sumt[key] + (self.sumh[key] * meant)
-            #sumnum =  self.sumht[key] - meanh*self.sumt[key]
-#            sumnum =  self.sumht[key] - meanh*self.sumt[key]
-            #sumnum =  self.sumht[key] - self.sumh[key]*self.sumt[key] / np.float64(self.totalTraces)
-            sumnum = self.totalTraces * self.sumht[key] - self.sumh[key] * self.sumt
-
-            self.sumhq[key] += np.sum(np.square(hyp),axis=0, dtype=np.longdouble)
-
-            #numtraces * meanh * meanh = sumh * meanh
-            #sumden1 = sumhq - (2*meanh*self.sumh) + (numtraces*meanh*meanh)
-            #sumden1 = sumhq - (2*meanh*self.sumh) + (self.sumh * meanh)
-            # sumden1 = sumhq - meanh*self.sumh
-            # similarly for sumden2
-            #sumden1 = self.sumhq[key] - meanh*self.sumh[key]
-            #sumden2 = self.sumtq[key] - meant*self.sumt[key]
-            # sumden = sumden1 * sumden2
+                    hyp[tnum, key] = self.model.leakage(pt, ct, key, bnum, state)
+        return hyp
+
+    def add_traces(self, traces, plaintexts, ciphertexts, knownkeys, active=None, trace_sums=None):
+        """Add a batch of traces to the sums of the selected subkeys.
+
+        Args:
+            traces: (numtraces, points) array, already cut down to the point range
+            plaintexts, ciphertexts, knownkeys: Texts and known keys of each trace
+            active: Boolean mask over bnums of the subkeys to update, all of them if None
+            trace_sums: Optional (sum, sum of squares) of traces over axis 0, if
+                the caller already has them
+
+        Returns:
+            List of (perms, points) arrays of the correlation of every guess, one
+            per active subkey
+        """
+        numtraces, npoints = traces.shape
+        perms = self.model.getPermPerSubkey()
+        nsub = len(self.bnums)
+        if self.sumht is None:
+            self.sumh = np.zeros((nsub, perms), dtype=np.longdouble)
+            self.sumhq = np.zeros((nsub, perms), dtype=np.longdouble)
+            self.sumt = np.zeros((nsub, npoints), dtype=np.longdouble)
+            self.sumtq = np.zeros((nsub, npoints), dtype=np.longdouble)
+            self.sumht = np.zeros((nsub, perms, npoints), dtype=np.longdouble)
+
+        #Views rather than copies when every subkey is updated
+        if active is None or np.all(active):
+            idx = np.arange(nsub)
+            sel = slice(None)
+        else:
+            idx = sel = np.flatnonzero(active)
+
+        if trace_sums is None:
+            trace_sums = (np.sum(traces, axis=0, dtype=np.longdouble),
+                          np.sum(np.square(traces), axis=0, dtype=np.longdouble))
+        self.totalTraces[sel] += numtraces
+        self.sumt[sel] += trace_sums[0]
+        self.sumtq[sel] += trace_sums[1]
+
+        #Formula for CPA & description found in "Power Analysis Attacks"
+        # by Mangard et al, page 124, formula 6.2.
+        #
+        # This has been modified to reduce computational requirements such that adding a new waveform
+        # doesn't require you to recalculate everything. All subkeys and key guesses are updated at
+        # once: entry [s, key] of the arrays below is what the per-guess loop used to compute.
+        hyp = np.stack([self.hypotheses(self.bnums[i], numtraces, plaintexts, ciphertexts, knownkeys, self.modelstate)
+                        for i in idx], axis=1)
+
+        self.sumh[sel] += np.sum(hyp, axis=0, dtype=np.longdouble)
+        self.sumhq[sel] += np.sum(np.square(hyp), axis=0, dtype=np.longdouble)
+        #The batch's products are summed in float64 by the matrix product, only the
+        #running sums across batches are kept in longdouble
+        self.sumht[sel] += np.dot(hyp.reshape(numtraces, -1).T, traces).reshape(len(idx), perms, npoints)
+
+        #One subkey at a time, so the longdouble temporaries stay small
+        diffs = []
+        for i in idx:
+            n = self.totalTraces[i]
+            sumnum = n * self.sumht[i] - self.sumh[i][:, None] * self.sumt[i]
 
             #Sumden1/Sumden2 are variance of these variables, may be numeric unstability
             #See http://en.wikipedia.org/wiki/Algorithms_for_calculating_variance for online update
             #algorithm which might be better
-            sumden1 = (np.square(self.sumh[key]) - self.totalTraces * self.sumhq[key])
+            sumden1 = np.square(self.sumh[i]) - n * self.sumhq[i]
+            sumden2 = np.square(self.sumt[i]) - n * self.sumtq[i]
 
-            sumden = sumden1 * sumden2
+            if self.bnums[i] == 0 and perms > 0x2B:
+                other_logger.info("sumden1: {}".format(sumden1[0x2B]))
 
-            if ((key == 0x2B) and (bnum == 0)):
-                other_logger.info("sumden1: {}".format(sumden1))
+            diffs.append(sumnum / np.sqrt(sumden1[:, None] * sumden2))
+        return diffs
 
-            #if sumden.any() < 1E-12:
-            #    print "WARNING: sumden small"
 
-            diffs[key] = sumnum / np.sqrt(sumden)
+class CPAProgressiveOneSubkey(CPAProgressiveSubkeys):
+    """Progressive CPA attack of a single subkey"""
+    def __init__(self, model):
+        CPAProgressiveSubkeys.__init__(self, model, [None])
 
-            if progressBar:
-                progressBar.updateStatus(pbcnt, (self.totalTraces-numtraces, self.totalTraces-1, bnum))
-            pbcnt = pbcnt + 1
+    def oneSubkey(self, bnum, pointRange, traces_all, numtraces, plaintexts, ciphertexts, knownkeys, progressBar, state, pbcnt, trace_sums=None):
+        self.bnums = [bnum]
+        self.modelstate = state
+
+        if pointRange == None:
+            traces = traces_all
+        else:
+            traces = traces_all[:, pointRange[0] : pointRange[1]]
 
-            # if padafter > 0:
-            #    diffs[key] = np.concatenate([diffs[key], np.zeros(padafter)])
+        diffs = list(self.add_traces(traces, plaintexts, ciphertexts, knownkeys, trace_sums=trace_sums)[0])
 
-            # if padbefore > 0:
-            #    diffs[key] = np.concatenate([np.zeros(padbefore), diffs[key]])
+        pbcnt = pbcnt + len(diffs)
+        if progressBar:
+            progressBar.updateStatus(pbcnt - 1, (self.totalTraces[0]-numtraces, self.totalTraces[0]-1, bnum))
 
         return (diffs, pbcnt)
 
@@ -187,10 +213,6 @@ class CPAProgressive(AlgorithmsBase):
             progressBar.setMaximum(len(self.brange) * self.model.getPermPerSubkey() * math.ceil(float(numtraces) / self._reportingInterval) - 1)
 
         pbcnt = 0
-        cpa = [None]*(max(self.brange)+1)
-        for bnum in self.brange:
-            cpa[bnum] = CPAProgressiveOneSubkey(self.model)
-
         brangeMap = [None]*(max(self.brange)+1)
         i = 1
         for bnum in self.brange:
@@ -202,15 +224,15 @@ class CPAProgressive(AlgorithmsBase):
 
         #bf specifies a 'breadth-first' search. bf means we search across each
         #subkey by only the amount of traces specified. Depth-First means we
-        #search each subkey completely, then move onto the next.
+        #search each subkey completely, then move onto the next. Breadth-first
+        #attacks all subkeys together, in one pass over each interval of traces.
         if bf:
-            brange_df = [0]
-            brange_bf = self.brange
+            bgroups = [list(self.brange)]
         else:
-            brange_bf = [0]
-            brange_df = self.brange
+            bgroups = [[bnum] for bnum in self.brange]
 
-        for bnum_df in brange_df:
+        for bgroup in bgroups:
+            cpa = CPAProgressiveSubkeys(self.model, bgroup)
             tstart = 0
             tend = self._reportingInterval
 
@@ -244,28 +266,32 @@ class CPAProgressive(AlgorithmsBase):
                 textouts = np.array(textouts)
                 # knownkeys = np.array(knownkeys)
 
-                for bnum_bf in brange_bf:
-                    if bf:
-                        bnum = bnum_bf
-                    else:
-                        bnum = bnum_df
-
-                    skip = False
-                    if (self.stats.simple_PGE(bnum) != 0) or (skipPGE == False):
-                        bptrange = pointRange
-                        (data, pbcnt) = cpa[bnum].oneSubkey(bnum, bptrange, traces, tend - tstart, textins, textouts, knownkeys, progressBar, cpa[bnum].modelstate, pbcnt)
+                if pointRange == None:
+                    ptraces = traces
+                else:
+                    ptraces = traces[:, pointRange[0] : pointRange[1]]
+
+                #Subkeys with PGE=0 are masked out of the update
+                active = [(self.stats.simple_PGE(bnum) != 0) or (skipPGE == False) for bnum in bgroup]
+                if any(active):
+                    diffs = cpa.add_traces(ptraces, textins, textouts, knownkeys, active)
+                    for k, bnum in enumerate(np.array(bgroup)[active].tolist()):
+                        data = list(diffs[k])
                         self.stats.update_subkey(bnum, data, tnum=tend)
-                    else:
-                        skip = True
+                        pbcnt = pbcnt + len(data)
+                        if progressBar:
+                            ntraces = cpa.totalTraces[bgroup.index(bnum)]
+                            progressBar.updateStatus(pbcnt - 1, (ntraces - (tend - tstart), ntraces - 1, bnum))
 
-                    if skip:
+                for bnum, act in zip(bgroup, active):
+                    if not act:
                         pbcnt = brangeMap[bnum] * self.model.getPermPerSubkey() * (numtraces / self._reportingInterval + 1)
 
                         if bf is False:
                             tstart = numtraces
 
-                    if progressBar and progressBar.wasAborted():
-                        return
+                if progressBar and progressBar.wasAborted():
+                    return
 
                 tend += self._reportingInterval
                 tstart += self._reportingInterval
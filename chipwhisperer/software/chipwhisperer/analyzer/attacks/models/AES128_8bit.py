@@ -27,7 +27,10 @@
 from collections import OrderedDict
 import inspect
 
+import numpy as np
+
 from chipwhisperer.analyzer.attacks.models.aes.funcs import sbox, inv_sbox, subbytes, inv_subbytes, mixcolumns, inv_mixcolumns, shiftrows, inv_shiftrows
+from chipwhisperer.analyzer.attacks.models.aes.funcs import _sbox, _i_sbox
 from chipwhisperer.common.utils.aes_tables import t_table_hw, t_table_hw_dec
 
 from .base import ModelsBase
@@ -35,6 +38,27 @@ from chipwhisperer.analyzer.attacks.models.aes.key_schedule import key_schedule_
 from chipwhisperer.common.utils.util import camel_case_deprecated
 from typing import Optional
 
+_sbox_table = np.array(_sbox, dtype=np.uint8)
+_i_sbox_table = np.array(_i_sbox, dtype=np.uint8)
+
+
+def _batch_is_native(obj, scalar_name, batch_name):
+    """True if the class defining obj's scalar_name also defines batch_name.
+
+    A subclass that overrides only the scalar function must not inherit a
+    batch version written for its parent.
+    """
+    owner = next(c for c in type(obj).__mro__ if scalar_name in c.__dict__)
+    return batch_name in owner.__dict__
+
+
+def _as_guess_array(guesses):
+    """Guesses broadcast against (traces, 1): a (G,) vector gives (1, G), per-trace guesses (N, 1)"""
+    guesses = np.asarray(guesses, dtype=np.uint8)
+    if guesses.ndim == 1:
+        guesses = guesses[None, :]
+    return guesses
+
 class AESLeakageHelper(object):
 
     #Name of AES Model
@@ -108,11 +132,62 @@ class AESLeakageHelper(object):
         """
         raise NotImplementedError("ASKLeakageHelper does not implement leakage")
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        """
+        Override this function with a vectorized version of leakage(), if the model has one.
+
+        Only models whose intermediate depends on nothing but the texts and key byte 'bnum'
+        can implement this. Arguments are as for leakage_batch(), with guesses already
+        shaped to broadcast against (traces, 1).
+        """
+        raise NotImplementedError()
+
+    def leakage_batch(self, pts, cts, guesses, bnum, keys=None, prev_pts=None, prev_cts=None):
+        """
+        Intermediate values for many traces and key guesses at once.
+
+        Args:
+            pts: (N, 16) array of plain-texts.
+            cts: (N, 16) array of cipher-texts.
+            guesses: (G,) vector of guesses for key byte 'bnum', or (N, 1) array with one guess per trace.
+            bnum: Byte number we are trying to attack.
+            keys: Optional (N, 16) known keys, used for the other key bytes by models that need them.
+            prev_pts: (N, 16) plain-texts of the previous encryptions, for models that take them.
+            prev_cts: (N, 16) cipher-texts of the previous encryptions, for models that take them.
+
+        Returns:
+            (N, G) integer array of intermediate values. Models without a native
+            _leakage_batch() fall back to calling leakage() for every entry.
+        """
+        pts = np.asarray(pts)
+        cts = np.asarray(cts)
+        guesses = _as_guess_array(guesses)
+
+        if _batch_is_native(self, 'leakage', '_leakage_batch'):
+            return np.asarray(self._leakage_batch(pts, cts, guesses, bnum, prev_pts, prev_cts), dtype=np.int64)
+
+        numtraces = max(len(pts), len(cts))
+        out = np.zeros((numtraces, guesses.shape[1]), dtype=np.int64)
+        for tnum in range(numtraces):
+            key = list(keys[tnum]) if keys is not None and keys[tnum] is not None else [None]*16
+            pt = pts[tnum] if len(pts) > 0 else None
+            ct = cts[tnum] if len(cts) > 0 else None
+            for i, guess in enumerate(guesses[tnum if len(guesses) > 1 else 0]):
+                key[bnum] = int(guess)
+                if prev_pts is not None or prev_cts is not None:
+                    out[tnum, i] = self.leakage(pt, ct, prev_pts[tnum], prev_cts[tnum], key, bnum)
+                else:
+                    out[tnum, i] = self.leakage(pt, ct, key, bnum)
+        return out
+
 class PtKey_XOR(AESLeakageHelper):
     name = 'HW: AddRoundKey Output, First Round (Enc)'
     def leakage(self, pt, ct, key, bnum):
         return pt[bnum] ^ key[bnum]
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        return pts[:, bnum, None] ^ guesses
+
 class SBox_output(AESLeakageHelper):
     name = 'HW: AES SBox Output, First Round (Enc)'
     c_model_enum_value = 1
@@ -120,6 +195,9 @@ class SBox_output(AESLeakageHelper):
     def leakage(self, pt, ct, key, bnum):
         return self.sbox(pt[bnum] ^ key[bnum])
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        return _sbox_table[pts[:, bnum, None] ^ guesses]
+
 class InvSBox_output(AESLeakageHelper):
     name = 'HW: AES Inv SBox Output, First Round (Dec)'
     c_model_enum_value = 6
@@ -127,6 +205,9 @@ class InvSBox_output(AESLeakageHelper):
     def leakage(self, pt, ct, key, bnum):
         return self.inv_sbox(pt[bnum] ^ key[bnum])
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        return _i_sbox_table[pts[:, bnum, None] ^ guesses]
+
 class InvSBox_output_alt(AESLeakageHelper):
     name = 'HW: AES Inv SBox Output, First Round (Dec)'
     c_model_enum_value = 61
@@ -134,6 +215,9 @@ class InvSBox_output_alt(AESLeakageHelper):
     def leakage(self, pt, ct, key, bnum):
         return self.inv_sbox(pt[bnum] ^ key[bnum])
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        return _i_sbox_table[pts[:, bnum, None] ^ guesses]
+
     def process_known_key(self, inpkey):
         k = key_schedule_rounds(inpkey, 0, 10)
         return k
@@ -147,6 +231,9 @@ class LastroundHW(AESLeakageHelper):
         st9 = inv_sbox(ct[bnum] ^ key[bnum])
         return st9
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        return _i_sbox_table[cts[:, bnum, None] ^ guesses]
+
     def process_known_key(self, inpkey):
         return key_schedule_rounds(inpkey, 0, 10)
 
@@ -161,6 +248,9 @@ class LastroundStateDiff(AESLeakageHelper):
         st9 = inv_sbox(ct[bnum] ^ key[bnum])
         return (st9 ^ st10)
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        return _i_sbox_table[cts[:, bnum, None] ^ guesses] ^ cts[:, self.INVSHIFT_undo[bnum], None]
+
     def process_known_key(self, inpkey):
         return key_schedule_rounds(inpkey, 0, 10)
 
@@ -171,6 +261,10 @@ class PipelineDiff(AESLeakageHelper):
         prev = inv_sbox(prev_ct[bnum] ^ key[bnum])
         return curr ^ prev
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        prev_cts = np.asarray(prev_cts)
+        return _i_sbox_table[cts[:, bnum, None] ^ guesses] ^ _i_sbox_table[prev_cts[:, bnum, None] ^ guesses]
+
     def process_known_key(self, inpkey):
         return key_schedule_rounds(inpkey, 0, 10)
 
@@ -181,6 +275,10 @@ class HalfPipelineDiff(AESLeakageHelper):
         prev = prev_ct[self.INVSHIFT_undo[bnum]]
         return curr ^ prev
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        prev_cts = np.asarray(prev_cts)
+        return _i_sbox_table[cts[:, bnum, None] ^ guesses] ^ prev_cts[:, self.INVSHIFT_undo[bnum], None]
+
     def process_known_key(self, inpkey):
         return key_schedule_rounds(inpkey, 0, 10)
 
@@ -192,6 +290,9 @@ class LastroundStateDiffAlternate(AESLeakageHelper):
         st9 = inv_sbox(ct[bnum] ^ key[bnum])
         return (st9 ^ st10)
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        return _i_sbox_table[cts[:, bnum, None] ^ guesses] ^ cts[:, bnum, None]
+
     def process_known_key(self, inpkey):
         k = key_schedule_rounds(inpkey, 0, 10)
         k = self.shiftrows(k)
@@ -206,6 +307,10 @@ class SBoxInOutDiff(AESLeakageHelper):
         st2 = self.sbox(st1)
         return st1 ^ st2
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, prev_pts, prev_cts):
+        st1 = pts[:, bnum, None] ^ guesses
+        return st1 ^ _sbox_table[st1]
+
 class SBoxInputSuccessive(AESLeakageHelper):
     name = 'HD: AES SBox Input i to i+1'
     c_model_enum_value = 4
@@ -310,6 +415,9 @@ class AES128_8bit(ModelsBase):
 
     _has_prev = False
 
+    #Table leakage_batch() maps masked intermediates through, matching leakage()
+    _leakage_table = ModelsBase.HW
+
     def __init__(self, model=SBox_output, bitmask=0xFF):
         ModelsBase.__init__(self, 16, 256, model=model)
         self.numRoundKeys = 10
@@ -377,6 +485,43 @@ class AES128_8bit(ModelsBase):
         #Return HW of guess
         return self.HW[intermediate_value]
 
+    def leakage_batch(self, pts, cts, guesses, bnum, knownkeys=None):
+        """ Leakage as set by model, for many traces and guesses at once
+
+        Args:
+            pts (array): (N, 16) plaintexts/textins
+            cts (array): (N, 16) ciphertexts/textouts
+            guesses (array): (G,) key guesses, or (N, 1) with one guess per trace
+            bnum (int): Subkey Byte Number
+            knownkeys (array): Optional (N, 16) known key of each trace
+
+        Returns:
+            (N, G) array of hamming weights, entry [t, g] equal to
+            leakage(pts[t], cts[t], guesses[g], bnum, {'knownkey': knownkeys[t]})
+        """
+        if not _batch_is_native(self, 'leakage', '_leakage_batch'):
+            return self._scalar_leakage_batch(pts, cts, guesses, bnum, knownkeys)
+        return self._leakage_batch(pts, cts, guesses, bnum, knownkeys)
+
+    def _leakage_batch(self, pts, cts, guesses, bnum, knownkeys, *prev):
+        """Vectorized leakage(), through the model's leakage_batch()"""
+        intermediate_value = self.modelobj.leakage_batch(pts, cts, guesses, bnum, knownkeys, *prev)
+        return np.asarray(self._leakage_table)[self._mask & intermediate_value]
+
+    def _scalar_leakage_batch(self, pts, cts, guesses, bnum, knownkeys, *prev):
+        """Fallback for subclasses that only override the scalar leakage()"""
+        guesses = _as_guess_array(guesses)
+        numtraces = max(len(pts), len(cts))
+        out = np.zeros((numtraces, guesses.shape[1]), dtype=np.int64)
+        state = {'knownkey': None}
+        for tnum in range(numtraces):
+            state['knownkey'] = knownkeys[tnum] if knownkeys is not None else None
+            args = [pts[tnum] if len(pts) > 0 else None, cts[tnum] if len(cts) > 0 else None]
+            args += [p[tnum] for p in prev]
+            for i, guess in enumerate(guesses[tnum if len(guesses) > 1 else 0]):
+                out[tnum, i] = self.leakage(*(args + [int(guess), bnum, state]))
+        return out
+
     def key_schedule_rounds(self, inputkey, inputround, desiredround):
         """Changes the round of inputkey from inputround to desiredround
 
@@ -395,6 +540,8 @@ class AES128_8bit(ModelsBase):
 
 class AES128_ttable(AES128_8bit):
     _has_prev = False
+    _leakage_table = t_table_hw
+
     def leakage(self, pt, ct, guess, bnum, state):
         """ Leakage as set by model
 
@@ -430,8 +577,14 @@ class AES128_ttable(AES128_8bit):
         #Return HW of guess
         return t_table_hw[intermediate_value]
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, knownkeys):
+        """Vectorized leakage(), the inherited one already uses _leakage_table"""
+        return super()._leakage_batch(pts, cts, guesses, bnum, knownkeys)
+
 class AES128_ttable_dec(AES128_8bit):
     _has_prev = False
+    _leakage_table = t_table_hw_dec
+
     def leakage(self, pt, ct, guess, bnum, state):
         """ Leakage as set by model
 
@@ -467,6 +620,10 @@ class AES128_ttable_dec(AES128_8bit):
         #Return HW of guess
         return t_table_hw_dec[intermediate_value]
 
+    def _leakage_batch(self, pts, cts, guesses, bnum, knownkeys):
+        """Vectorized leakage(), the inherited one already uses _leakage_table"""
+        return super()._leakage_batch(pts, cts, guesses, bnum, knownkeys)
+
 
 class AES128_prev(AES128_8bit):
     """Extension of AES128_8bit which adds prev_pt and prev_ct parameters, for when the
@@ -511,3 +668,16 @@ class AES128_prev(AES128_8bit):
         #Return HW of guess
         return self.HW[intermediate_value]
 
+    def leakage_batch(self, pts, cts, guesses, bnum, knownkeys=None, prev_pts=None, prev_cts=None):
+        """ Leakage as set by model, for many traces and guesses at once
+
+        Same as AES128_8bit.leakage_batch(), with the (N, 16) plaintexts and
+        ciphertexts of the previous encryptions as prev_pts and prev_cts.
+        """
+        if not _batch_is_native(self, 'leakage', '_leakage_batch'):
+            return self._scalar_leakage_batch(pts, cts, guesses, bnum, knownkeys, prev_pts, prev_cts)
+        return self._leakage_batch(pts, cts, guesses, bnum, knownkeys, prev_pts, prev_cts)
+
+    def _leakage_batch(self, pts, cts, guesses, bnum, knownkeys, prev_pts, prev_cts):
+        """Vectorized leakage(), through the model's leakage_batch()"""
+        return super()._leakage_batch(pts, cts, guesses, bnum, knownkeys, prev_pts, prev_cts)
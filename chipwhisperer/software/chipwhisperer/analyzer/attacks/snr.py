@@ -30,6 +30,140 @@ from chipwhisperer.common.api.ProjectFormat import Project
 from chipwhisperer.common.traces import Trace
 
 
+class SNRAccumulator(object):
+    """One-pass SNR over any number of traces, bytes and leakage models.
+
+    Keeps a running count, mean and sum of squared deviations (Welford/Chan
+    update) of the traces in each leakage class, so memory doesn't grow with
+    the number of traces. Batches are merged in as they arrive::
+
+        snr = SNRAccumulator([cwa.leakage_models.sbox_output, cwa.leakage_models.last_round_state_diff])
+        snr.add_project(project)
+        sbox_snr_byte3 = snr.snr(model=0, bnum=3)
+
+    Args:
+        leak_models (ModelsBase or list): Leakage model(s) selected from
+            :data:`leakage_models <chipwhisperer.analyzer.leakage_models>`.
+        bnums (Iterable of int): Byte numbers to calculate the SNR for.
+            Defaults to all 16.
+    """
+    def __init__(self, leak_models, bnums=range(16)):
+        if not isinstance(leak_models, (list, tuple)):
+            leak_models = [leak_models]
+        self.leak_models = list(leak_models)
+        self.bnums = list(bnums)
+        self.num_traces = 0
+        self._counts = {}
+        self._means = {}
+        self._m2 = {}
+
+    def _leakage(self, leak_model, bnum, textins, textouts, keys):
+        """Leakage class of every trace in a batch, using the known key"""
+        if hasattr(leak_model, 'leakage_batch') and not getattr(leak_model, '_has_prev', False):
+            try:
+                pts = np.asarray(textins, dtype=np.uint8)
+                cts = np.asarray(textouts, dtype=np.uint8)
+                kys = np.asarray(keys, dtype=np.uint8)
+            except (TypeError, ValueError):
+                pass
+            else:
+                return leak_model.leakage_batch(pts, cts, kys[:, bnum:bnum+1], bnum, kys)[:, 0]
+
+        return np.array([leak_model.leakage(textin, textout, None, bnum, {'knownkey':key})
+                         for textin, textout, key in zip(textins, textouts, keys)], dtype=np.int64)
+
+    def add_traces(self, waves, textins, textouts, keys):
+        """Merge a batch of traces into the running statistics.
+
+        Args:
+            waves (array): (N, points) power traces
+            textins (array): (N, 16) plaintexts
+            textouts (array): (N, 16) ciphertexts
+            keys (array): (N, 16) known keys
+        """
+        waves = np.asarray(waves, dtype=np.float64)
+        if len(waves) == 0:
+            return
+        self.num_traces += len(waves)
+
+        for m, leak_model in enumerate(self.leak_models):
+            for bnum in self.bnums:
+                leakage = self._leakage(leak_model, bnum, textins, textouts, keys)
+                self._merge((m, bnum), leakage, waves)
+
+    def _merge(self, idx, leakage, waves):
+        nclasses = int(leakage.max()) + 1
+        if idx not in self._counts:
+            self._counts[idx] = np.zeros(0, dtype=np.int64)
+            self._means[idx] = np.zeros((0, waves.shape[1]))
+            self._m2[idx] = np.zeros((0, waves.shape[1]))
+        if nclasses > len(self._counts[idx]):
+            grow = nclasses - len(self._counts[idx])
+            self._counts[idx] = np.concatenate([self._counts[idx], np.zeros(grow, dtype=np.int64)])
+            self._means[idx] = np.concatenate([self._means[idx], np.zeros((grow, waves.shape[1]))])
+            self._m2[idx] = np.concatenate([self._m2[idx], np.zeros((grow, waves.shape[1]))])
+
+        #Per-class mean and squared deviations of this batch
+        order = np.argsort(leakage, kind='stable')
+        classes, starts, nb = np.unique(leakage[order], return_index=True, return_counts=True)
+        sorted_waves = waves[order]
+        mean_b = np.add.reduceat(sorted_waves, starts, axis=0) / nb[:, None]
+        dev = sorted_waves - np.repeat(mean_b, nb, axis=0)
+        m2_b = np.add.reduceat(dev * dev, starts, axis=0)
+
+        #Chan et al. parallel update of the running statistics
+        na = self._counts[idx][classes]
+        n = na + nb
+        delta = mean_b - self._means[idx][classes]
+        self._means[idx][classes] += delta * (nb / n)[:, None]
+        self._m2[idx][classes] += m2_b + delta * delta * (na * nb / n)[:, None]
+        self._counts[idx][classes] = n
+
+    def add_project(self, source, batch_size=1000):
+        """Add every trace from a Project, TraceManager/preprocessing module or list of Traces.
+
+        Traces are read batch_size at a time.
+        """
+        if isinstance(source, Project):
+            source = source.trace_manager()
+
+        if hasattr(source, 'get_traces'):
+            ntraces = source.num_traces()
+            for start in range(0, ntraces, batch_size):
+                end = min(start + batch_size, ntraces)
+                self.add_traces(source.get_traces(start, end),
+                                [source.get_textin(n) for n in range(start, end)],
+                                [source.get_textout(n) for n in range(start, end)],
+                                [source.get_known_key(n) for n in range(start, end)])
+        else:
+            for start in range(0, len(source), batch_size):
+                batch = source[start:start + batch_size]
+                self.add_traces([t.wave for t in batch], [t.textin for t in batch],
+                                [t.textout for t in batch], [t.key for t in batch])
+
+    def snr(self, model=0, bnum=0, db=True):
+        """SNR of one byte and leakage model, same definition as :func:`calculate_snr`.
+
+        Args:
+            model (int): Index of the leakage model in leak_models.
+            bnum (int): Byte number.
+            db (bool): Return signal-to-noise ratio in decibals.
+        """
+        counts = self._counts[(model, bnum)]
+        inc_list = np.flatnonzero(counts)
+        best_choice = np.argmax(counts)
+
+        signal_var = np.var(self._means[(model, bnum)][inc_list], axis=0)
+        noise_var_onehw = self._m2[(model, bnum)][best_choice] / counts[best_choice]
+
+        snr = signal_var / noise_var_onehw
+
+        if db:
+            return 20*np.log(snr)
+
+        return snr
+
+
 def calculate_snr(input, leak_model, bnum=0, db=True):
     """Calculate the SNR based on the leakage model.
 
@@ -41,61 +175,14 @@ def calculate_snr(input, leak_model, bnum=0, db=True):
             :data:`leakage_models <chipwhisperer.analyzer.leakage_models>`.
         bnum (int): Byte number used for leakage model.
         bd (bool): Return signal-to-noise ratio in decibals.
-    """
-
-    textin = None
-    textout = None
-    key = None
-    trace = None
-
-    hwarray = []
-
-    tm = None
-
-    ntrace = len(input)
-    npoints = len(input[0].wave)
 
-    for tnum in range(0, ntrace):
-        trace = input[tnum].wave
-        textin = input[tnum].textin
-        textout = input[tnum].textout
-        key = input[tnum].key
-
-        state = {'knownkey':key}
-
-        leakage = leak_model.leakage(textin, textout, None, bnum, state)
-
-        while leakage >= len(hwarray):
-            hwarray.append([])
-
-        hwarray[leakage].append(trace)
-
-    hwmean = np.zeros((len(hwarray), npoints))
-
-    for i in range(0, len(hwarray)):
-        hwmean[i] = np.mean(hwarray[i], axis=0)
-
-    inc_list = []
-    best_choice = -1
-    best_choice_len = 0
-    for i in range(0, len(hwarray)):
-        num_elements = len(hwarray[i])
-        if num_elements > 0:
-            inc_list.append(i)
-            #Figure out if this is largest list as well
-            if num_elements > best_choice_len:
-                best_choice = i
-                best_choice_len = num_elements
-
-
-    hwmean_valid = hwmean[inc_list]
-
-    signal_var = np.var(hwmean_valid, axis=0)
-    noise_var_onehw = np.var(hwarray[best_choice], axis=0)
-
-    snr = signal_var / noise_var_onehw
+    For projects, several bytes or leakage models at once, use
+    :class:`SNRAccumulator`.
+    """
 
-    if db:
-        return 20*np.log(snr)
+    if isinstance(input, Project):
+        raise TypeError("Expected an iterable of Traces; use SNRAccumulator.add_project() for projects", input)
 
-    return snr
+    acc = SNRAccumulator(leak_model, bnums=[bnum])
+    acc.add_project(input)
+    return acc.snr(0, bnum, db)
@@ -28,6 +28,7 @@
 from ._base import PreprocessingBase
 import numpy as np
 from chipwhisperer.common.utils.parameter import setupSetParam
+from chipwhisperer.common.utils.util import camel_case_deprecated
 
 
 class NormBase(object):
@@ -54,12 +55,18 @@ class NormMean(NormBase):
     def processTrace(self, t, tindex):
         return t - np.mean(t)
 
+    def processTraces(self, t, tstart):
+        return t - np.mean(t, axis=1, keepdims=True)
+
 
 class NormMeanStd(NormBase):
     """Normalize by mean & std-dev """
     def processTrace(self, t, tindex):
         return (t - np.mean(t)) / np.std(t)
 
+    def processTraces(self, t, tstart):
+        return (t - np.mean(t, axis=1, keepdims=True)) / np.std(t, axis=1, keepdims=True)
+
 
 class Normalize(PreprocessingBase):
     """
@@ -110,9 +117,9 @@ class Normalize(PreprocessingBase):
             raise ValueError("Unrecognized mode; expected one of 'mean', 'mean_stddev'", mode)
 
 
-    def getTrace(self, n):
+    def get_trace(self, n):
         if self.enabled:
-            trace = self._traceSource.getTrace(n)
+            trace = self._traceSource.get_trace(n)
 
             if trace is None:
                 return None
@@ -120,4 +127,13 @@ class Normalize(PreprocessingBase):
 
             return proc
         else:
-            return self._traceSource.getTrace(n)
\ No newline at end of file
+            return self._traceSource.get_trace(n)
+
+    getTrace = camel_case_deprecated(get_trace)
+
+    def get_traces(self, start, end):
+        if self.enabled:
+            traces = self._traceSource.get_traces(start, end)
+            return self._norm.processTraces(np.asarray(traces, dtype=np.float64), start)
+        else:
+            return self._traceSource.get_traces(start, end)
\ No newline at end of file
@@ -26,6 +26,8 @@
 #=================================================
 import logging
 
+import numpy as np
+
 from chipwhisperer.common.utils.tracesource import TraceSource, PassiveTraceObserver
 from chipwhisperer.common.utils.parameter import setupSetParam
 from chipwhisperer.common.utils import util
@@ -34,6 +36,22 @@ from chipwhisperer.common.api.ProjectFormat import Project
 from chipwhisperer.common.traces import Trace
 
 from tqdm import trange # type: ignore
+
+
+def shift_traces(traces, shifts):
+    """Shift each row of traces, out[i, p] = traces[i, p + shifts[i]], padding with zeros.
+
+    Vectorized version of the np.append(np.zeros(...), ...) shifting done by the resync modules.
+    """
+    traces = np.asarray(traces)
+    shifts = np.asarray(shifts, dtype=np.int64).reshape(-1, 1)
+    idx = np.arange(traces.shape[1]) + shifts
+    valid = (idx >= 0) & (idx < traces.shape[1])
+    out = np.take_along_axis(traces, np.clip(idx, 0, traces.shape[1] - 1), axis=1).astype(np.float64)
+    out[~valid] = 0
+    return out
+
+
 class PreprocessingBase(TraceSource, PassiveTraceObserver):
     """
     Base Class for all preprocessing modules
@@ -105,6 +123,30 @@ class PreprocessingBase(TraceSource, PassiveTraceObserver):
             return self._traceSource.get_trace(n)
 
     getTrace = camel_case_deprecated(get_trace)
+
+    def get_traces(self, start, end):
+        """Get traces start..end-1 as a (end-start, points) array.
+
+        Traces this module rejects (get_trace() returns None) are rows of NaN.
+        Modules override this with a vectorized version of get_trace(), the
+        default just processes one trace at a time.
+        """
+        if self.enabled:
+            return self._stack_traces([self.get_trace(n) for n in range(start, end)])
+        else:
+            return self._traceSource.get_traces(start, end)
+
+    def _stack_traces(self, traces):
+        """Stack per-trace results into an array, with NaN rows for rejected traces"""
+        npoints = next((len(t) for t in traces if t is not None), None)
+        if npoints is None:
+            npoints = self.num_points()
+        out = np.full((len(traces), npoints), np.nan)
+        for i, t in enumerate(traces):
+            if t is not None:
+                out[i] = t
+        return out
+
     def get_textin(self, n):
         """Get text-in number n"""
         return self._traceSource.get_textin(n)
@@ -27,8 +27,9 @@
 
 import random
 import numpy as np
-from ._base import PreprocessingBase
+from ._base import PreprocessingBase, shift_traces
 from chipwhisperer.common.utils.parameter import setupSetParam
+from chipwhisperer.common.utils.util import camel_case_deprecated
 
 
 class AddNoiseJitter(PreprocessingBase):
@@ -71,9 +72,9 @@ class AddNoiseJitter(PreprocessingBase):
             raise TypeError("Expected int; got %s" % type(jit), jit)
         self._setJitter(jit)
    
-    def getTrace(self, n):
+    def get_trace(self, n):
         if self.enabled:
-            trace = self._traceSource.getTrace(n)
+            trace = self._traceSource.get_trace(n)
             if trace is None:
                 return None
             
@@ -81,7 +82,17 @@ class AddNoiseJitter(PreprocessingBase):
 
             return roll_zeropad(trace, jit)
         else:
-            return self._traceSource.getTrace(n)
+            return self._traceSource.get_trace(n)
+
+    getTrace = camel_case_deprecated(get_trace)
+
+    def get_traces(self, start, end):
+        if self.enabled:
+            traces = self._traceSource.get_traces(start, end)
+            jit = [random.randint(-self._maxJitter, self._maxJitter) for _ in range(len(traces))]
+            return shift_traces(traces, -np.array(jit, dtype=np.int64))
+        else:
+            return self._traceSource.get_traces(start, end)
 
         
 # This function stolen from: http://stackoverflow.com/questions/2777907/python-numpy-roll-with-padding
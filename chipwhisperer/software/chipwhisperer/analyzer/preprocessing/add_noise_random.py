@@ -28,6 +28,7 @@
 import numpy as np
 from ._base import PreprocessingBase
 from chipwhisperer.common.utils.parameter import setupSetParam
+from chipwhisperer.common.utils.util import camel_case_deprecated
 
 
 class AddNoiseRandom(PreprocessingBase):
@@ -67,9 +68,9 @@ class AddNoiseRandom(PreprocessingBase):
             raise TypeError("Expected number; got %s" % type(std_dev), std_dev)
         self._setNoise(std_dev)
 
-    def getTrace(self, n):
+    def get_trace(self, n):
         if self.enabled:
-            trace = self._traceSource.getTrace(n)
+            trace = self._traceSource.get_trace(n)
             if trace is None:
                 return None
 
@@ -78,4 +79,16 @@ class AddNoiseRandom(PreprocessingBase):
             else:
                 return trace + np.random.normal(scale=self._noise_std_dev, size=len(trace))
         else:
-            return self._traceSource.getTrace(n)
+            return self._traceSource.get_trace(n)
+
+    getTrace = camel_case_deprecated(get_trace)
+
+    def get_traces(self, start, end):
+        if self.enabled:
+            traces = self._traceSource.get_traces(start, end)
+            if self._noise_std_dev == 0:
+                return traces
+            else:
+                return traces + np.random.normal(scale=self._noise_std_dev, size=np.shape(traces))
+        else:
+            return self._traceSource.get_traces(start, end)
@@ -32,6 +32,7 @@ import scipy.signal # type: ignore
 import scipy.fftpack # type: ignore
 import numpy as np
 from matplotlib.mlab import find # type: ignore
+from chipwhisperer.common.utils.util import camel_case_deprecated
 
 
 def fft(signal, freq=None):
@@ -85,7 +86,7 @@ class DecimationClockRecovery(PreprocessingBase):
             self._order = order
 
         try:
-            fftdata = scipy.fft(self._traceSource.getTrace(tnum))
+            fftdata = scipy.fft(self._traceSource.get_trace(tnum))
             fftdata = abs(fftdata[2:(len(fftdata) / 2)])
             maxindx = fftdata.argmax() + 2
             centerfreq = float(maxindx) / float(len(fftdata) + 2)
@@ -105,9 +106,9 @@ class DecimationClockRecovery(PreprocessingBase):
         self.b = b
         self.a = a
    
-    def getTrace(self, n):
+    def get_trace(self, n):
         if self.enabled:
-            trace = self._traceSource.getTrace(n)
+            trace = self._traceSource.get_trace(n)
             if trace is None:
                 return None
             
@@ -149,7 +150,9 @@ class DecimationClockRecovery(PreprocessingBase):
             #print len(filttrace)
             return filttrace
         else:
-            return self._traceSource.getTrace(n)
+            return self._traceSource.get_trace(n)
+
+    getTrace = camel_case_deprecated(get_trace)
 
     def getSampleRate(self):
         return 0  # TODO: it is not zero!
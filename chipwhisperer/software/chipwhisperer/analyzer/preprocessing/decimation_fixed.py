@@ -28,6 +28,7 @@
 from ._base import PreprocessingBase
 import numpy as np
 from chipwhisperer.common.utils.parameter import setupSetParam
+from chipwhisperer.common.utils.util import camel_case_deprecated
 
         
 class DecimationFixed(PreprocessingBase):
@@ -63,20 +64,24 @@ class DecimationFixed(PreprocessingBase):
             raise TypeError("Expected int; got %s" % type(dec), dec)
         self._setDecFactor(dec)
 
-    def getTrace(self, n):
+    def get_trace(self, n):
         if self.enabled:
-            trace = self._traceSource.getTrace(n)
+            trace = self._traceSource.get_trace(n)
             if trace is None:
                 return None
 
-            outtrace = np.zeros(len(range(0, len(trace), self._dec_factor)))
+            return np.array(trace[::self._dec_factor], dtype=np.float64)
+        else:
+            return self._traceSource.get_trace(n)
 
-            for idx, val in enumerate(range(0, len(trace), self._dec_factor)):
-                outtrace[idx] = trace[val]
+    getTrace = camel_case_deprecated(get_trace)
 
-            return outtrace
+    def get_traces(self, start, end):
+        if self.enabled:
+            traces = self._traceSource.get_traces(start, end)
+            return np.array(traces[:, ::self._dec_factor], dtype=np.float64)
         else:
-            return self._traceSource.getTrace(n)
+            return self._traceSource.get_traces(start, end)
 
     def numPoints(self):
         if self.enabled:
@@ -32,6 +32,7 @@
 from ._base import PreprocessingBase
 from scipy import signal # type: ignore
 from chipwhisperer.common.utils.parameter import setupSetParam
+from chipwhisperer.common.utils.util import camel_case_deprecated
 
 class Filter(PreprocessingBase):
     """
@@ -179,11 +180,19 @@ class Filter(PreprocessingBase):
         self._setFilterForm()
         self._setFilterParams(self._type, freqs, self._order)
 
-    def getTrace(self, n):
+    def get_trace(self, n):
         if self.enabled:
-            trace = self._traceSource.getTrace(n)
+            trace = self._traceSource.get_trace(n)
             if trace is None:
                 return None
             return signal.lfilter(self.b, self.a, trace)
         else:
-            return self._traceSource.getTrace(n)
+            return self._traceSource.get_trace(n)
+
+    getTrace = camel_case_deprecated(get_trace)
+
+    def get_traces(self, start, end):
+        if self.enabled:
+            return signal.lfilter(self.b, self.a, self._traceSource.get_traces(start, end), axis=1)
+        else:
+            return self._traceSource.get_traces(start, end)
@@ -26,6 +26,7 @@
 #=================================================
 
 from ._base import PreprocessingBase
+from chipwhisperer.common.utils.util import camel_case_deprecated
 
 class PassThrough(PreprocessingBase):
     """
@@ -38,5 +39,10 @@ class PassThrough(PreprocessingBase):
         PreprocessingBase.__init__(self, traceSource, name=name)
         self.findParam('Enabled').hide()
 
-    def getTrace(self, n):
-        return self._traceSource.getTrace(n)
+    def get_trace(self, n):
+        return self._traceSource.get_trace(n)
+
+    getTrace = camel_case_deprecated(get_trace)
+
+    def get_traces(self, start, end):
+        return self._traceSource.get_traces(start, end)
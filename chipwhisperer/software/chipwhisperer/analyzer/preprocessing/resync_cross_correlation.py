@@ -28,8 +28,9 @@
 import numpy as np
 import scipy as sp # type: ignore
 
-from ._base import PreprocessingBase
+from ._base import PreprocessingBase, shift_traces
 from chipwhisperer.common.utils.parameter import setupSetParam
+from chipwhisperer.common.utils.util import camel_case_deprecated
 
 
 class ResyncCrossCorrelation(PreprocessingBase):
@@ -104,10 +105,10 @@ class ResyncCrossCorrelation(PreprocessingBase):
             raise TypeError("Expected int; got %s" % type(win[1]), win[1])
         self._setWindow(win)
    
-    def getTrace(self, n):
+    def get_trace(self, n):
         if self.enabled:
             #TODO: fftconvolve
-            trace = self._traceSource.getTrace(n)
+            trace = self._traceSource.get_trace(n)
             if trace is None:
                 return None
             cross = sp.signal.fftconvolve(trace, self._reftrace, mode='valid')
@@ -126,7 +127,21 @@ class ResyncCrossCorrelation(PreprocessingBase):
             return trace
             
         else:
-            return self._traceSource.getTrace(n)
+            return self._traceSource.get_trace(n)
+
+    getTrace = camel_case_deprecated(get_trace)
+
+    def get_traces(self, start, end):
+        if self.enabled:
+            traces = self._traceSource.get_traces(start, end)
+            #One FFT convolution along the whole block instead of per trace
+            cross = sp.signal.fftconvolve(traces, self._reftrace[None, :], mode='valid', axes=1)
+            if self._debugReturnCorr:
+                return cross
+            newmaxloc = np.argmax(cross[:, self._ccStart:self._ccEnd], axis=1)
+            return shift_traces(traces, newmaxloc - self._refmaxloc)
+        else:
+            return self._traceSource.get_traces(start, end)
    
     def _calculateRef(self):
         try:
@@ -139,9 +154,9 @@ class ResyncCrossCorrelation(PreprocessingBase):
         if self.enabled == False:
             return
 
-        self._reftrace = self._traceSource.getTrace(tnum)[self._ccStart:self._ccEnd]
+        self._reftrace = self._traceSource.get_trace(tnum)[self._ccStart:self._ccEnd]
         self._reftrace = self._reftrace[::-1]
         #TODO: fftconvolve
-        cross = sp.signal.fftconvolve(self._traceSource.getTrace(tnum), self._reftrace, mode='valid')
+        cross = sp.signal.fftconvolve(self._traceSource.get_trace(tnum), self._reftrace, mode='valid')
         self._refmaxloc = np.argmax(cross[self._ccStart:self._ccEnd])
         self._refmaxsize = max(cross[self._ccStart:self._ccEnd])
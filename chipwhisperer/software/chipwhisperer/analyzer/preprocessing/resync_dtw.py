@@ -25,14 +25,45 @@
 #    along with chipwhisperer.  If not, see <http://www.gnu.org/licenses/>.
 #=================================================
 
+from concurrent.futures import ProcessPoolExecutor
+
 from ._base import PreprocessingBase
 from chipwhisperer.common.utils.util import camel_case_deprecated
+from chipwhisperer.analyzer.utils.fasterdtw import fastdtw_banded, reduce_pyramid
 try:
-    from fastdtw import fastdtw # type: ignore
-except ModuleNotFoundError:
-    from chipwhisperer.analyzer.utils.fasterdtw import fastdtw
+    # Only the compiled fastdtw, its pure Python fallback is slower than fastdtw_banded
+    from fastdtw._fastdtw import fastdtw as _cython_fastdtw # type: ignore
+except ImportError:
+    _cython_fastdtw = None
 import numpy as np
 
+
+def _align_to_reference(ref_pyramid, trace, radius, npoints):
+    """Warp trace onto the reference, averaging the points mapped to each reference point"""
+    trace = np.asarray(trace, dtype=np.float64)
+    if _cython_fastdtw is not None:
+        dist, path = _cython_fastdtw(ref_pyramid[0], trace, radius=radius, dist=None)
+        px, py = np.array(path, dtype=np.int64).T
+    else:
+        dist, px, py = fastdtw_banded(ref_pyramid, trace, radius)
+    s = np.bincount(px, weights=trace[py], minlength=npoints)[:npoints]
+    n = np.bincount(px, minlength=npoints)[:npoints]
+    return s / n
+
+
+_worker_args = None
+
+
+def _init_worker(ref_pyramid, radius, npoints):
+    global _worker_args
+    _worker_args = (ref_pyramid, radius, npoints)
+
+
+def _align_worker(trace):
+    ref_pyramid, radius, npoints = _worker_args
+    return _align_to_reference(ref_pyramid, trace, radius, npoints)
+
+
 class ResyncDTW(PreprocessingBase):
     """Align traces using the Dynamic Time Warp algorithm. Doesn't play well
     with noisy traces, but can remove random per-trace delays and synchronize
@@ -45,10 +76,12 @@ class ResyncDTW(PreprocessingBase):
         PreprocessingBase.__init__(self, traceSource, name=name)
         self._rtrace = 0
         self._radius = 3
-
+        self._processes = 1
+        self._ref_pyramid = None
 
     def _setRefTrace(self, num):
         self._rtrace = num
+        self._ref_pyramid = None
 
     def _getRefTrace(self):
         return self._rtrace
@@ -68,6 +101,7 @@ class ResyncDTW(PreprocessingBase):
 
     def _setRadius(self, radius):
         self._radius = radius
+        self._ref_pyramid = None
 
     def _getRadius(self):
         return self._radius
@@ -87,39 +121,61 @@ class ResyncDTW(PreprocessingBase):
         if not isinstance(radius, int):
             raise TypeError("Expected int; got %s" % type(radius), radius)
         self._setRadius(radius)
-   
+
+    @property
+    def processes(self):
+        """Number of worker processes get_traces() aligns traces with.
+
+        1 (the default) aligns in this process.
+        """
+        return self._processes
+
+    @processes.setter
+    def processes(self, processes):
+        if not isinstance(processes, int):
+            raise TypeError("Expected int; got %s" % type(processes), processes)
+        self._processes = processes
+
+    def tracesUpdated(self):
+        self._ref_pyramid = None
+
+    def _get_ref_pyramid(self):
+        """Reference trace at every resolution used by FastDTW, computed once"""
+        if self._ref_pyramid is None:
+            ref_trace = self._traceSource.get_trace(self._rtrace)
+            if ref_trace is None:
+                return None
+            self._ref_pyramid = reduce_pyramid(ref_trace, self._radius)
+        return self._ref_pyramid
+
     def get_trace(self, n):
         if not self.enabled:
             return self._traceSource.get_trace(n)
 
         trace = self._traceSource.get_trace(n)
-        ref_trace = self._traceSource.get_trace(self._rtrace)
-        if trace is None or ref_trace is None:
+        ref_pyramid = self._get_ref_pyramid()
+        if trace is None or ref_pyramid is None:
             return None
 
-        aligned = self._align_traces(ref_trace, trace)
-        return aligned
-
+        return _align_to_reference(ref_pyramid, trace, self._radius, self._traceSource.num_points())
 
     getTrace = camel_case_deprecated(get_trace)
-        
-    def _align_traces(self, ref, trace):
-        N = self._traceSource.num_points()
-        r = self._radius
-        #try:
-        # cython fastdtw can't take numpy.memmap inputs, so we convert them to arrays:
-        aref = np.array(list(ref))
-        atrace = np.array(list(trace))
-        dist, path = fastdtw(aref, atrace, radius=r, dist=None)
-        #except:
-        #    return None
-        px = [x for x, y in path]
-        py = [y for x, y in path]
-        n = [0] * N
-        s = [0.0] * N
-        for x, y in path:
-            s[x] += trace[y]
-            n[x] += 1
-
-        ret = [s[i] / n[i] for i in range(N)]
-        return ret
+
+    def get_traces(self, start, end):
+        if not self.enabled:
+            return self._traceSource.get_traces(start, end)
+
+        traces = self._traceSource.get_traces(start, end)
+        ref_pyramid = self._get_ref_pyramid()
+        if ref_pyramid is None:
+            return np.full(np.shape(traces), np.nan)
+
+        npoints = self._traceSource.num_points()
+        if self._processes > 1 and len(traces) > 1:
+            chunksize = max(1, len(traces) // (4 * self._processes))
+            with ProcessPoolExecutor(max_workers=self._processes, initializer=_init_worker,
+                                     initargs=(ref_pyramid, self._radius, npoints)) as pool:
+                aligned = list(pool.map(_align_worker, np.asarray(traces), chunksize=chunksize))
+        else:
+            aligned = [_align_to_reference(ref_pyramid, trace, self._radius, npoints) for trace in traces]
+        return np.array(aligned)
@@ -27,8 +27,9 @@
 
 import numpy as np
 
-from ._base import PreprocessingBase
+from ._base import PreprocessingBase, shift_traces
 from chipwhisperer.common.utils.parameter import setupSetParam
+from chipwhisperer.common.utils.util import camel_case_deprecated
 
 
 class ResyncPeakDetect(PreprocessingBase):
@@ -176,9 +177,9 @@ class ResyncPeakDetect(PreprocessingBase):
         self._ccEnd = refrange[1]
         self.init()
 
-    def getTrace(self, n):
+    def get_trace(self, n):
         if self.enabled:
-            trace = self._traceSource.getTrace(n)
+            trace = self._traceSource.get_trace(n)
             if trace is None:
                 return None
             if str.lower(self._type) == 'max':
@@ -199,7 +200,28 @@ class ResyncPeakDetect(PreprocessingBase):
                 trace = np.append(trace[diff:], np.zeros(diff))
             return trace
         else:
-            return self._traceSource.getTrace(n)
+            return self._traceSource.get_trace(n)
+
+    getTrace = camel_case_deprecated(get_trace)
+
+    def get_traces(self, start, end):
+        if self.enabled:
+            traces = self._traceSource.get_traces(start, end)
+            window = traces[:, self._ccStart:self._ccEnd]
+            if str.lower(self._type) == 'max':
+                newmaxloc = np.argmax(window, axis=1)
+                maxval = np.max(window, axis=1)
+            else:
+                newmaxloc = np.argmin(window, axis=1)
+                maxval = np.min(window, axis=1)
+
+            out = shift_traces(traces, newmaxloc - self._refmaxloc)
+            if self._limit:
+                invalid = (maxval > self._refmaxsize * (1.0 + self._limit)) | (maxval < self._refmaxsize * (1.0 - self._limit))
+                out[invalid] = np.nan
+            return out
+        else:
+            return self._traceSource.get_traces(start, end)
 
     def _calculateRef(self):
         try:
@@ -212,7 +234,7 @@ class ResyncPeakDetect(PreprocessingBase):
         if self.enabled == False:
             return
 
-        reftrace = self._traceSource.getTrace(tnum)[self._ccStart:self._ccEnd]
+        reftrace = self._traceSource.get_trace(tnum)[self._ccStart:self._ccEnd]
         if self._type == 'max':
             self._refmaxloc = np.argmax(reftrace)
             self._refmaxsize = max(reftrace)
@@ -30,6 +30,7 @@ from ._base import PreprocessingBase
 from matplotlib.mlab import find # type: ignore
 import scipy.signal as sig # type: ignore
 from chipwhisperer.common.utils.parameter import setupSetParam
+from chipwhisperer.common.utils.util import camel_case_deprecated
 
 
 class ResyncResampleZC(PreprocessingBase):
@@ -119,9 +120,9 @@ class ResyncResampleZC(PreprocessingBase):
             raise TypeError("Expected float; got %s" % type(len), len)
         self._setBinLength(len)
 
-    def getTrace(self, n):
+    def get_trace(self, n):
         if self.enabled:
-            trace = self._traceSource.getTrace(n)
+            trace = self._traceSource.get_trace(n)
             if trace is None:
                 return None
             
@@ -130,7 +131,9 @@ class ResyncResampleZC(PreprocessingBase):
             ind = self._findZerocrossing(trace)
             return self._resampleResize(trace, ind, self._binlen)
         else:
-            return self._traceSource.getTrace(n)
+            return self._traceSource.get_trace(n)
+
+    getTrace = camel_case_deprecated(get_trace)
    
     def _calculateRef(self):
         try:
@@ -146,7 +149,7 @@ class ResyncResampleZC(PreprocessingBase):
             return
         
         if self._binlen == 0:
-            self._reftrace = self._traceSource.getTrace(tnum) - self._zcoffset
+            self._reftrace = self._traceSource.get_trace(tnum) - self._zcoffset
             ind = self._findZerocrossing(self._reftrace)
             self._binlen = self._findAvgLength(ind)
 
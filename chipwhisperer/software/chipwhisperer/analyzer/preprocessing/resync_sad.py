@@ -26,8 +26,9 @@
 #=================================================
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
-from ._base import PreprocessingBase
+from ._base import PreprocessingBase, shift_traces
 from collections import OrderedDict
 
 
@@ -180,6 +181,30 @@ class ResyncSAD(PreprocessingBase):
 
     getTrace = get_trace
 
+    def get_traces(self, start, end):
+        if self.enabled:
+            if self._init_not_done:
+                self._calculateRef()
+                self._init_not_done = False
+
+            traces = self._traceSource.get_traces(start, end)
+            sad = self._findSADs(traces)
+
+            if self._debugReturnSad:
+                return sad
+
+            if sad.shape[1] == 0:
+                return np.full(np.shape(traces), np.nan)
+
+            newmaxloc = np.argmin(sad, axis=1)
+            maxval = sad[np.arange(len(sad)), newmaxloc]
+
+            out = shift_traces(traces, newmaxloc - self.refmaxloc)
+            out[maxval > self.maxthreshold] = np.nan
+            return out
+        else:
+            return self._traceSource.get_traces(start, end)
+
     def _calculateRef(self):
         try:
             self.calcRefTrace(self._rtrace)
@@ -188,9 +213,20 @@ class ResyncSAD(PreprocessingBase):
         except ValueError:
             pass
 
+    #Max number of elements in the (traces, shifts, window) difference array built at once
+    _sad_block_elements = 1 << 18
+
     def _findSAD(self, inputtrace):
+        return self._findSADs(np.asarray(inputtrace)[None, :])[0]
+
+    def _findSADs(self, inputtraces):
+        """SAD between the reference and every shift of the window, for a block of traces.
+
+        Returns a (traces, 2*maxshift) array, all shifts are compared at once
+        through a sliding window view of each trace.
+        """
+        inputtraces = np.asarray(inputtraces)
         sadlen = self._maxshift * 2
-        sadarray = np.ones(sadlen)*1E6
 
         wdlen = self._wdEnd - self._wdStart
 
@@ -201,14 +237,31 @@ class ResyncSAD(PreprocessingBase):
         if minshift + self._wdStart < 0:
             raise ValueError("Invalid size or maximum shift, starting search location is < 0")
 
-        if maxshift + self._wdEnd > len(inputtrace):
+        if maxshift + self._wdEnd > inputtraces.shape[1]:
             raise ValueError("Invalid size or maximum shift, ending search location is outside trace")
 
-        for ptoffset in range(minshift, maxshift):
-            ptstart = ptoffset + self._wdStart
-            diff_data = inputtrace[ptstart:(ptstart+wdlen)] - self.reftrace
-            abs_data = np.abs(diff_data)
-            sadarray[ptoffset + self._maxshift] = np.sum(abs_data)
+        sadarray = np.ones((len(inputtraces), sadlen))*1E6
+        if sadlen == 0:
+            return sadarray
+
+        #Window starting at each shift in [minshift, maxshift)
+        search = inputtraces[:, minshift + self._wdStart:maxshift + self._wdStart + wdlen - 1]
+        windows = sliding_window_view(search, wdlen, axis=1)
+
+        #Work in cache-sized blocks: several whole traces at a time if they are small,
+        #otherwise a range of shifts of one trace at a time
+        per_trace = sadlen * max(wdlen, 1)
+        if per_trace <= self._sad_block_elements:
+            step = self._sad_block_elements // per_trace
+            for i in range(0, len(inputtraces), step):
+                diff_data = windows[i:i+step] - self.reftrace
+                sadarray[i:i+step] = np.sum(np.abs(diff_data, out=diff_data), axis=2)
+        else:
+            step = max(1, self._sad_block_elements // max(wdlen, 1))
+            for i in range(len(inputtraces)):
+                for j in range(0, sadlen, step):
+                    diff_data = windows[i, j:j+step] - self.reftrace
+                    sadarray[i, j:j+step] = np.sum(np.abs(diff_data, out=diff_data), axis=1)
         return sadarray
 
     def calcRefTrace(self, tnum):
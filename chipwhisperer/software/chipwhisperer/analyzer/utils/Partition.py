@@ -31,12 +31,15 @@ import random
 
 import numpy as np
 from chipwhisperer.analyzer.attacks.models.aes.funcs import sbox, inv_sbox
-from chipwhisperer.analyzer.attacks.models.AES128_8bit import AES128_8bit
+from chipwhisperer.analyzer.attacks.models.AES128_8bit import AES128_8bit, AESLeakageHelper, _sbox_table, _i_sbox_table
 from chipwhisperer.analyzer.attacks.models.aes.key_schedule import keyScheduleRounds
 from chipwhisperer.common.utils.parameter import Parameterized
 from chipwhisperer.common.utils import util
 
 
+_HW_table = np.array(AES128_8bit.HW, dtype=np.int64)
+
+
 class PartitionHDLastRound(object):
 
     sectionName = "Partition Based on HD of Last Round"
@@ -59,11 +62,23 @@ class PartitionHDLastRound(object):
 
         guess = [0] * 16
         for i in range(0, 16):
-            st10 = ct[AES128_8bit.INVSHIFT[i]]
+            st10 = ct[AESLeakageHelper.INVSHIFT_undo[i]]
             st9 = inv_sbox(ct[i] ^ key[i])
             guess[i] = AES128_8bit.getHW(st9 ^ st10)
         return guess
 
+    def getPartitionNums(self, textins, textouts, keys):
+        if keys.shape[1] != 16:
+            raise ValueError("Need to implement for selected AES")
+
+        # Key schedule once per distinct key, usually there is only one
+        uniq, inverse = np.unique(keys, axis=0, return_inverse=True)
+        lastkeys = np.array([keyScheduleRounds(list(k), 0, 10) for k in uniq], dtype=np.uint8)[inverse.reshape(-1)]
+
+        st10 = textouts[:, AESLeakageHelper.INVSHIFT_undo]
+        st9 = _i_sbox_table[textouts ^ lastkeys]
+        return _HW_table[st9 ^ st10]
+
 
 class PartitionHWIntermediate(object):
 
@@ -83,6 +98,9 @@ class PartitionHWIntermediate(object):
 
         return guess
 
+    def getPartitionNums(self, textins, textouts, keys):
+        return _HW_table[_sbox_table[textins ^ keys]]
+
 
 class PartitionEncKey(object):
 
@@ -96,6 +114,9 @@ class PartitionEncKey(object):
         key = trace.getKnownKey(tnum)
         return key
 
+    def getPartitionNums(self, textins, textouts, keys):
+        return keys.astype(np.int64)
+
 
 class PartitionRandvsFixed(object):
     """The Rand vs Fixed partition works with the TVLA test to randomly interleave random and fixed plaintexts.
@@ -112,22 +133,29 @@ class PartitionRandvsFixed(object):
     def getNumPartitions(self):
         return 2
 
+    #Fixed TVLA plaintext for each key length
+    fixedPlaintexts = {
+        16: "da 39 a3 ee 5e 6b 4b 0d 32 55 bf ef 95 60 18 90",
+        24: "da 39 a3 ee 5e 6b 4b 0d 32 55 bf ef 95 60 18 88",
+        32: "da 39 a3 ee 5e 6b 4b 0d 32 55 bf ef 95 60 18 95",
+    }
+
     def getPartitionNum(self, trace, tnum):
         """Checks if plaintext is the fixed TVLA plaintext for this key length or a random value.
 
         Returns [1] if fixed and [0] if random.
         """
-        klen = len(trace.getKnownKey(tnum))
-
-        pt = trace.getTextin(tnum)
-        if klen == 16 and (pt == util.hexStrToByteArray("da 39 a3 ee 5e 6b 4b 0d 32 55 bf ef 95 60 18 90")).all():
-            return [1]
-        elif klen == 24 and (pt == util.hexStrToByteArray("da 39 a3 ee 5e 6b 4b 0d 32 55 bf ef 95 60 18 88")).all():
-            return [1]
-        elif klen == 32 and (pt == util.hexStrToByteArray("da 39 a3 ee 5e 6b 4b 0d 32 55 bf ef 95 60 18 95")).all():
+        fixed = self.fixedPlaintexts.get(len(trace.getKnownKey(tnum)))
+        if fixed is not None and np.all(np.asarray(trace.getTextin(tnum)) == np.array(util.hexStrToByteArray(fixed))):
             return [1]
         return [0]
 
+    def getPartitionNums(self, textins, textouts, keys):
+        fixed = self.fixedPlaintexts.get(keys.shape[1])
+        if fixed is None:
+            return np.zeros((len(textins), 1), dtype=np.int64)
+        return np.all(textins == np.array(util.hexStrToByteArray(fixed)), axis=1).astype(np.int64)[:, None]
+
 
 class PartitionRandDebug(object):
 
@@ -142,6 +170,9 @@ class PartitionRandDebug(object):
     def getPartitionNum(self, trace, tnum):
         return [random.randint(0, self.numRand - 1)]
 
+    def getPartitionNums(self, textins, textouts, keys):
+        return np.random.randint(0, self.numRand, (len(textins), 1))
+
 
 class Partition(Parameterized):
     """
@@ -166,6 +197,7 @@ class Partition(Parameterized):
     def __init__(self):
         self.setPartMethod(PartitionRandvsFixed)
         self.partDataCache = None
+        self.partLabelsCache = None
 
     def setPartMethod(self, method):
         self.partMethodClass = method
@@ -188,103 +220,122 @@ class Partition(Parameterized):
 
         return partitionTable
 
+    def labelsToTable(self, labels, offset=0):
+        """Convert a (traces, subkeys) label array to partitionTable[subkey][partition] = list of trace numbers"""
+        labels = np.asarray(labels)
+        num_parts = self.partMethod.getNumPartitions()
+        partitionTable = []
+        for j in range(labels.shape[1]):
+            order = np.argsort(labels[:, j], kind='stable')
+            counts = np.bincount(labels[:, j], minlength=num_parts)
+            partitionTable.append([part.tolist() for part in np.split(order + offset, np.cumsum(counts)[:-1])])
+        return partitionTable
+
+    def _segmentTexts(self, t, n):
+        """textin, textout and key arrays of the first n traces in segment t"""
+        texts = []
+        for values, getter in ((t.textins, t.getTextin), (t.textouts, t.getTextout), (t.keylist, t.getKnownKey)):
+            if values is not None:
+                texts.append(np.asarray(values[:n]))
+            else:
+                texts.append(np.asarray([getter(i) for i in range(n)]))
+        return texts
+
     def loadPartitions(self, tRange=(0, -1)):
-        """Load partitions from trace files, convert to mapped range"""
+        """Load partitions from trace files, convert to mapped range
+
+        Returns:
+            (traces, subkeys) array with the partition of each trace
+        """
         start = tRange[0]
         end = tRange[1]
 
         if end == -1:
             end = self._traces.numTraces()
 
-        # Generate blank partition table
-        partitionTable = self.createBlankTable(self._traces.getSegment(start))
-        logging.info(np.shape(partitionTable))
-
+        labels = []
         tnum = start
         while tnum < end:
             t = self._traces.getSegment(tnum)
             # Discover where this trace starts & ends
             tmapstart = t.mappedRange[0]
-            tmapend = t.mappedRange[1]
-            tmapend = min(tmapend, end)
+            tmapend = min(t.mappedRange[1], end - 1)
 
             partcfg = t.getAuxDataConfig(self.attrDictPartition)
-            # print partcfg
-            # print partcfg["filename"]
+            if partcfg is None:
+                raise ValueError("No saved partition data for segment with traces %d-%d" % (tmapstart, t.mappedRange[1]))
             partdata = t.loadAuxData(partcfg["filename"])
 
-            # Merge tables now - better way to do this?
-            for j in range(0, len(self.partMethod.getPartitionNum(t, 0))):
-                for i in range(0, self.partMethod.getNumPartitions()):
-                    partitionTable[j][i] = partitionTable[j][i] + partdata[j][i]
-
-            # print tmapstart
+            # Saved data is the label of every trace in the segment
+            labels.append(partdata[tnum - tmapstart:tmapend - tmapstart + 1])
 
             # Next trace round
             tnum = tmapend + 1
 
-        return partitionTable
+        return np.concatenate(labels)
 
     def getPartitionData(self):
         return self.partDataCache
 
-    def generatePartitions(self, partitionClass=None, saveFile=False, loadFile=False, tRange=(0, -1)):
+    def getPartitionLabels(self):
+        return self.partLabelsCache
+
+    def generatePartitionLabels(self, partitionClass=None, saveFile=False, loadFile=False, tRange=(0, -1)):
         """
-        Generate partitions, using previously setup setTraceManager & partition class, or if they are passed as
-        arguments will update the class data
+        Generate the partition of every trace, as a (traces, subkeys) integer array.
+
+        Each segment's textin/textout/keys are classified at once by the
+        partition method. With saveFile the labels of each segment are saved
+        as aux data, loadFile reads those back instead.
         """
         if partitionClass:
             self.setPartMethod(partitionClass)
 
-        partitionTable = None
-
-        if loadFile:
-            partitionTable = self.loadPartitions(tRange)
-            raise AttributeError("WARNING: loadPartitions broken for split files, disabled for now")
-
         start = tRange[0]
         end = tRange[1]
+        if end == -1:
+            end = self._traces.numTraces()
 
-        num_keys=len(self.partMethod.getPartitionNum(self._traces.getSegment(start), 0))
-        num_parts=self.partMethod.getNumPartitions()
-
-        if partitionTable is None:
-            partitionTable = self.createBlankTable(num_keys, num_parts)
-
-            if end == -1:
-                end = self._traces.numTraces()
-
+        if loadFile:
+            labels = self.loadPartitions((start, end))
+        else:
+            labels = []
             tnum = start
             while tnum < end:
                 t = self._traces.getSegment(tnum)
                 # Discover where this trace starts & ends
                 tmapstart = t.mappedRange[0]
                 tmapend = t.mappedRange[1]
-                
-                partitionTableTemp = self.createBlankTable(num_keys, num_parts)
-
-                for tnum in range(tmapstart, tmapend + 1):
-                    # Check each trace, write partition number
-                    partNum = self.partMethod.getPartitionNum(t, tnum - tmapstart)
-                    for i, pn in enumerate(partNum):
-                        partitionTable[i][pn].append(tnum)
-                        partitionTableTemp[i][pn].append(tnum - tmapstart)
 
-                    # self.traceDone.emit(tnum)
+                if hasattr(self.partMethod, "getPartitionNums"):
+                    textins, textouts, keys = self._segmentTexts(t, tmapend - tmapstart + 1)
+                    seglabels = np.asarray(self.partMethod.getPartitionNums(textins, textouts, keys), dtype=np.int64)
+                else:
+                    seglabels = np.array([self.partMethod.getPartitionNum(t, i) for i in range(tmapend - tmapstart + 1)], dtype=np.int64)
 
                 if saveFile:
-                    # Save partition table, reference it in config file
+                    # Save partition labels, reference it in config file
                     newCfgDict = copy.deepcopy(self.attrDictPartition)
                     updatedDict = t.addAuxDataConfig(newCfgDict)
-                    t.saveAuxData(partitionTableTemp, updatedDict)
-
-                # Debug - Dump Table
-                # for t in range(0, self.partMethod.getNumPartitions()):
-                #    print "Traces in %d:" % t
-                #    print "  ",
-                #    print partitionTable[0][t]
+                    t.saveAuxData(seglabels, updatedDict)
 
+                labels.append(seglabels[tnum - tmapstart:min(tmapend, end - 1) - tmapstart + 1])
                 tnum = tmapend + 1
+            labels = np.concatenate(labels)
+
+        self.partLabelsCache = labels
+        return labels
+
+    def generatePartitions(self, partitionClass=None, saveFile=False, loadFile=False, tRange=(0, -1)):
+        """
+        Generate partitions, using previously setup setTraceManager & partition class, or if they are passed as
+        arguments will update the class data
+
+        Returns:
+            partitionTable[subkey][partition] = list of trace numbers in that partition
+        """
+        labels = self.generatePartitionLabels(partitionClass, saveFile, loadFile, tRange)
+        partitionTable = self.labelsToTable(labels, offset=tRange[0])
 
         self.partDataCache = partitionTable
         return partitionTable
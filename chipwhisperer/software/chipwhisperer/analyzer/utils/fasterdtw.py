@@ -230,3 +230,129 @@ def __expand_window(path, len_x, len_y, radius):
         start_j = new_start_j
 
     return window
+
+
+# Banded, NumPy version of the above. Each row of the search window is a
+# contiguous range of columns, given by its first and last column, and the
+# cost table is filled one anti-diagonal at a time. The
+# multi-resolution pyramid of the reference can be built once with
+# reduce_pyramid() and reused for every trace aligned against it.
+
+def reduce_pyramid(x, radius):
+    ''' return [x, x halved, x halved twice, ...] down to the first level shorter
+        than radius + 2, as used by fastdtw_banded()
+    '''
+    levels = [np.asarray(x, dtype=np.float64)]
+    while len(levels[-1]) >= radius + 2:
+        prev = levels[-1]
+        n = len(prev) - len(prev) % 2
+        levels.append((prev[0:n:2] + prev[1:n:2]) / 2)
+    return levels
+
+
+def fastdtw_banded(x_pyramid, y, radius=1):
+    ''' same result as fastdtw(x, y, radius) with dist=None, where x_pyramid is
+        reduce_pyramid(x, radius)
+
+        Returns
+        -------
+        (float, ndarray, ndarray)
+            the approximate distance, and the x and y indices of the warp path
+    '''
+    min_time_size = radius + 2
+    y_pyramid = [np.asarray(y, dtype=np.float64)]
+    depth = 0
+    while len(x_pyramid[depth]) >= min_time_size and len(y_pyramid[depth]) >= min_time_size:
+        prev = y_pyramid[depth]
+        n = len(prev) - len(prev) % 2
+        y_pyramid.append((prev[0:n:2] + prev[1:n:2]) / 2)
+        depth += 1
+
+    xl, yl = x_pyramid[depth], y_pyramid[depth]
+    lo = np.zeros(len(xl), dtype=np.int64)
+    hi = np.full(len(xl), len(yl) - 1, dtype=np.int64)
+    distance, px, py = _banded_dtw(xl, yl, lo, hi)
+
+    for level in range(depth - 1, -1, -1):
+        xl, yl = x_pyramid[level], y_pyramid[level]
+        lo, hi = _expand_band(px, py, len(xl), len(yl), radius)
+        distance, px, py = _banded_dtw(xl, yl, lo, hi)
+
+    return distance, px, py
+
+
+def _expand_band(px, py, len_x, len_y, radius):
+    # Column range of each coarse row on the path, widened by radius in both
+    # directions and projected onto the 2x finer grid (as __expand_window)
+    ncoarse = (len_x + 1) // 2
+    jmin = np.full(ncoarse + 2 * radius, np.iinfo(np.int64).max)
+    jmax = np.full(ncoarse + 2 * radius, np.iinfo(np.int64).min)
+    inrange = px < ncoarse
+    np.minimum.at(jmin, px[inrange] + radius, py[inrange])
+    np.maximum.at(jmax, px[inrange] + radius, py[inrange])
+
+    win = 2 * radius + 1
+    lo_c = np.lib.stride_tricks.sliding_window_view(jmin, win).min(axis=1) - radius
+    hi_c = np.lib.stride_tricks.sliding_window_view(jmax, win).max(axis=1) + radius
+
+    rows = np.arange(len_x) // 2
+    lo = np.clip(2 * lo_c[rows], 0, len_y - 1)
+    hi = np.clip(2 * hi_c[rows] + 1, 0, len_y - 1)
+    return lo, hi
+
+
+def _banded_dtw(x, y, lo, hi):
+    # The band's cells are stored flat, sorted by anti-diagonal i + j: every
+    # cell of an anti-diagonal only depends on the two before it, so each one
+    # is filled with a few array operations. A cell is c + min(diag, left, up),
+    # the same sum as dtw() (min itself doesn't round), so the costs and the
+    # warp path match it exactly.
+    widths = hi - lo + 1
+    ncells = int(widths.sum())
+    row_start = np.cumsum(widths) - widths
+    ci = np.repeat(np.arange(len(x)), widths)
+    cj = lo[ci] + np.arange(ncells) - row_start[ci]
+    order = np.argsort(ci + cj, kind='stable')
+    ci, cj = ci[order], cj[order]
+    position = np.empty(ncells, dtype=np.int64)
+    position[order] = np.arange(ncells)
+
+    # Flat index of each cell's diagonal, left and up neighbours. Cells
+    # outside the band point at an inf entry past the end, (-1, -1) at a 0
+    inf_cell, origin_cell = ncells, ncells + 1
+    def neighbour(i, j):
+        ii = np.maximum(i, 0)
+        inband = (i >= 0) & (j >= lo[ii]) & (j <= hi[ii])
+        idx = np.full(len(i), inf_cell, dtype=np.int64)
+        idx[inband] = position[row_start[ii[inband]] + j[inband] - lo[ii[inband]]]
+        idx[(i == -1) & (j == -1)] = origin_cell
+        return idx
+    diag = neighbour(ci - 1, cj - 1)
+    left = neighbour(ci, cj - 1)
+    up = neighbour(ci - 1, cj)
+
+    cost = np.abs(x[ci] - y[cj])
+    D = np.empty(ncells + 2)
+    D[inf_cell], D[origin_cell] = np.inf, 0.0
+    bounds = np.searchsorted(ci + cj, np.arange(len(x) + len(y)))
+    for s, e in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        D[s:e] = cost[s:e] + np.minimum(np.minimum(D[diag[s:e]], D[left[s:e]]), D[up[s:e]])
+
+    # Predecessor of every cell, with the same tie-breaking as dtw(): diagonal
+    # (0), then left (1), then up (2)
+    best = D[diag]
+    direction = np.zeros(ncells, dtype=np.int8)
+    is_left = D[left] < best
+    direction[is_left] = 1
+    best = np.where(is_left, D[left], best)
+    direction[D[up] < best] = 2
+
+    previous = np.choose(direction, [diag, left, up]).tolist()
+    path = []
+    cell = ncells - 1
+    while cell != origin_cell:
+        path.append(cell)
+        cell = previous[cell]
+    path = np.array(path[::-1], dtype=np.int64)
+
+    return D[ncells - 1], ci[path], cj[path]
@@ -36,7 +36,7 @@ import time
 import numpy as np
 from ..api.cwcommon import ChipWhispererCommonInterface
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 CODE_READ              = 0x80
 CODE_WRITE             = 0xC0
@@ -133,7 +133,7 @@ class OpenADC(util.DisableNewAttr, ChipWhispererCommonInterface):
         self.digitalPattern = None
 
         self._is_connected = False
-        self.data_points = []
+        self._data_points = []
         self._is_husky = False
         self._is_husky_plus = False
 
@@ -814,14 +814,27 @@ class OpenADC(util.DisableNewAttr, ChipWhispererCommonInterface):
             num_points = self.adc.samples
         scope_logger.debug("Expecting {} points".format(num_points))
 
-        self.data_points = self.sc.readData(num_points)
+        points = self.sc.readData(num_points, as_int=True)
+        # Only converted to floats if data_points is used, as_int traces don't need it
+        self.data_points = None if len(points) else []
 
-        scope_logger.debug("Read {} datapoints".format(len(self.data_points)))
-        if (self.data_points is None) or (len(self.data_points) != num_points):
-            scope_logger.error("Received fewer points than expected: {} vs {}".format(len(self.data_points), num_points))
+        scope_logger.debug("Read {} datapoints".format(len(points)))
+        if len(points) != num_points:
+            scope_logger.error("Received fewer points than expected: {} vs {}".format(len(points), num_points))
             return True
         return False
 
+    @property
+    def data_points(self):
+        """Samples of the last capture as floats"""
+        if self._data_points is None:
+            self._data_points = self.sc.get_fp_data()
+        return self._data_points
+
+    @data_points.setter
+    def data_points(self, points):
+        self._data_points = points
+
 
     def capture(self, poll_done : bool =False) -> bool:
         """Captures trace. Scope must be armed before capturing.
@@ -873,7 +886,7 @@ class OpenADC(util.DisableNewAttr, ChipWhispererCommonInterface):
         b = self._capture_read(samples)
         return a or b
 
-    def get_last_trace(self, as_int : bool=False) -> np.ndarray:
+    def get_last_trace(self, as_int : bool=False, out : Optional[np.ndarray]=None) -> np.ndarray:
         """Return the last trace captured with this scope.
 
         Can return traces as floating point values (:code:`as_int=False`)
@@ -887,9 +900,11 @@ class OpenADC(util.DisableNewAttr, ChipWhispererCommonInterface):
 
         Args:
             as_int: If False, return trace as a float. Otherwise, return as an int.
+            out: Array to write the trace into (e.g. a row of a preallocated trace
+                array), instead of a new one.
 
         Returns:
-           Numpy array of the last capture trace.
+           Numpy array of the last capture trace (a view of out if given).
 
         .. versionchanged:: 5.6.1
             Added as_int parameter
@@ -897,9 +912,16 @@ class OpenADC(util.DisableNewAttr, ChipWhispererCommonInterface):
         if as_int:
             if self._is_husky:
                 # for Husky this is always appropriately sized (also there would be # of segments to consider)
-                return self.sc._int_data
+                trace = self.sc._int_data
             else:
-                return self.sc._int_data[:self.adc.samples]
+                trace = self.sc._int_data[:self.adc.samples]
+            if out is not None:
+                out = out[:len(trace)]
+                out[:] = trace
+                return out
+            return trace
+        if out is not None and self.sc._int_data is not None:
+            return self.sc.get_fp_data(out)
         return self.data_points
 
     getLastTrace = util.camel_case_deprecated(get_last_trace)
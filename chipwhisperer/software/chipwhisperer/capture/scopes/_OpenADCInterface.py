@@ -14,7 +14,6 @@ from ...common.utils import util
 import array
 import numpy as np
 from collections import OrderedDict
-import copy
 import io
 import re
 
@@ -53,6 +52,91 @@ def SIGNEXT(x, b):
     x = x & ((1 << b) - 1)
     return (x ^ m) - m
 
+def unpack_husky_samples(data, bits, num_points=None, out=None):
+    """Unpacks raw Husky ADC FIFO data into samples.
+
+    8-bit samples are one byte each, 12-bit samples are packed two per three bytes
+    (big-endian). The samples are written straight into out, with no temporary arrays
+    the size of the trace.
+
+    Args:
+        data: Bytes read from the FIFO (bytearray or np.uint8 array).
+        bits (int): Bits per sample, 8 or 12.
+        num_points (int): Number of samples to unpack, all of them if None.
+        out: Integer array to unpack into (e.g. a preallocated np.int16 one). A new
+            np.uint8 (8-bit) or np.uint16 (12-bit) array if None.
+
+    Return:
+        The samples (a view of out if given).
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+    if bits == 12:
+        groups = data[:len(data) // 3 * 3].reshape(-1, 3)
+        avail = 2 * len(groups)
+    else:
+        avail = len(data)
+    n = avail if num_points is None else min(int(num_points), avail)
+    if out is None:
+        out = np.empty(n, dtype=np.uint16 if bits == 12 else np.uint8)
+    out = out[:n]
+
+    if bits == 12:
+        even = out[0::2]
+        odd = out[1::2]
+        even[:] = groups[:len(even), 0]
+        even <<= 4
+        even |= groups[:len(even), 1] >> 4
+        odd[:] = groups[:len(odd), 1] & 0x0F
+        odd <<= 8
+        odd |= groups[:len(odd), 2]
+    else:
+        out[:] = data[:n]
+    return out
+
+def unpack_openadc_samples(data, out=None):
+    """Unpacks raw OpenADC (CW-Lite/Pro) FIFO data into 10-bit samples.
+
+    After the sync byte, each big-endian 32-bit word holds 3 samples (bits 0-9,
+    10-19 and 20-29) and in bits 30-31 the trigger position: 3 until the trigger,
+    then the index in the word of the first sample after it.
+
+    Args:
+        data: Bytes read from the FIFO, starting with the sync byte.
+        out: Integer array to unpack into. A new np.int16 array if None.
+
+    Return:
+        (samples, trigsamp) - trigsamp is the index of the trigger sample, or None
+        if there's no trigger in the data.
+    """
+    nwords = (len(data) - 1) // 4
+    words = np.frombuffer(data, dtype='>u4', count=nwords, offset=1)
+    if out is None:
+        out = np.empty(3 * nwords, dtype=np.int16)
+    out = out[:3 * nwords]
+    for i in range(3):
+        np.bitwise_and(words >> (10 * i), 0x3FF, out=out[i::3], casting='unsafe')
+
+    trigger = words >> 30
+    first = int(np.argmax(trigger != 3)) if nwords else 0
+    if nwords == 0 or trigger[first] == 3:
+        return out, None
+    return out, 3 * first + int(trigger[first])
+
+def samples_to_float(samples, bits, offset, out=None):
+    """Scales raw ADC samples to floats, samples / 2**bits - offset.
+
+    Args:
+        out: Float array to write into (e.g. a preallocated np.float32 one). A new
+            np.float64 array if None.
+    """
+    if out is None:
+        out = np.empty(len(samples), dtype=np.float64)
+    out = out[:len(samples)]
+    # 2**-bits is exact, so this matches dividing by 2**bits
+    np.multiply(samples, 2.0**-bits, out=out)
+    out -= offset
+    return out
+
 class OpenADCInterface(util.DisableNewAttr):
 
     def __init__(self, serial_instance, registers):
@@ -83,6 +167,9 @@ class OpenADCInterface(util.DisableNewAttr):
         self._stream_len = 0
         self._total_samples = 0
         self._int_data = None
+        self._fp_data = None
+        self._fp_format = (10, 0, 0.0)
+        self._read_buf = None
         self._stream_rx_bytes = 0
         self._clear_caches()
 
@@ -223,6 +310,30 @@ class OpenADCInterface(util.DisableNewAttr):
 
         return bytearray(data)
 
+    def read_fifo(self, nbytes):
+        """Reads nbytes from the ADC sample FIFO.
+
+        The data is received straight into a buffer kept from one read to the next, when the
+        serial instance supports it (cmdReadMemInto()), instead of a new one each capture.
+
+        Return:
+            A np.uint8 array of the data received, only valid until the next read, or None on
+            a timeout.
+        """
+        if not (self._serial_not_stream and hasattr(self.serial, "cmdReadMemInto")):
+            data = self.msg_read("ADCREAD_ADDR", nbytes)
+            if data is None:
+                return None
+            return np.frombuffer(data, dtype=np.uint8)
+
+        nbytes = int(nbytes)
+        if self._read_buf is None or len(self._read_buf) < nbytes:
+            self._read_buf = np.empty(nbytes, dtype=np.uint8)
+
+        self.flushInput()
+        data = self.serial.cmdReadMemInto(self._address_str2int("ADCREAD_ADDR"), nbytes, self._read_buf)
+        return self._read_buf[:len(data)]
+
     def _address_str2int(self, address):
         if type(address) is str:
             if address in self.registers:
@@ -770,10 +881,20 @@ class OpenADCInterface(util.DisableNewAttr):
         # Flush output FIFO
         self.sendMessage(CODE_READ, "ADCREAD_ADDR", None, False, None)
 
-    def readData(self, NumberPoints=None, progressDialog=None):
+    def readData(self, NumberPoints=None, progressDialog=None, as_int=False, out=None):
+        """Reads and decodes the samples of the last capture.
+
+        Args:
+            out: Array to decode the samples into (an integer one if as_int, a float one
+                otherwise), instead of a new one.
+
+        Return:
+            The samples as floats, or as raw ADC values if as_int. The floats of an as_int
+            read are only computed if asked for later, see get_fp_data().
+        """
         scope_logger.debug("Reading data from OpenADC (NumberPoints=%d)..." % NumberPoints)
         if self._is_husky: 
-            return self.readHuskyData(NumberPoints)
+            return self.readHuskyData(NumberPoints, as_int, out)
         elif self._stream_mode:
             # Process data
             bsize = self.serial.cmdReadStream_size_of_fpgablock()
@@ -795,8 +916,8 @@ class OpenADCInterface(util.DisableNewAttr):
 
             scope_logger.debug("Stream mode: read %d bytes"%len(data))
 
-            # Turn raw bytes into samples
-            datapoints = self.processData(data, 0.0)
+            # Turn raw bytes into samples, into out only once trimmed
+            datapoints = self.processData(data, 0.0, as_int=as_int or out is not None)
 
             if datapoints is not None and len(datapoints):
                 scope_logger.debug("Stream mode: done, %d samples processed"%len(datapoints))
@@ -804,8 +925,8 @@ class OpenADCInterface(util.DisableNewAttr):
                 scope_logger.warning("Stream mode: done, no samples resulted from processing")
                 datapoints = []
 
-            if len(datapoints) > NumberPoints:
-                datapoints = datapoints[0:NumberPoints]
+            if len(datapoints) > NumberPoints or (out is not None and len(datapoints)):
+                datapoints = self._trim_data(NumberPoints, as_int, out)
 
             return datapoints
 
@@ -872,15 +993,14 @@ class OpenADCInterface(util.DisableNewAttr):
                 bytesToRead = min(hypBytes, bytesToRead)
 
                 # +1 for sync byte
-                data = self.sendMessage(CODE_READ, "ADCREAD_ADDR", None, False, bytesToRead + 1)  # BytesPerPackage)
+                data = self.read_fifo(bytesToRead + 1)  # BytesPerPackage)
                 #print(data)
 
                 # for p in data:
                 #       print "%x "%p,
 
                 if data is not None:
-                    data = np.array(data)
-                    datapoints = self.processData(data, 0.0)
+                    datapoints = self.processData(data, 0.0, as_int=as_int or out is not None)
 
                 if progressDialog:
                     progressDialog.setValue(status)
@@ -893,11 +1013,7 @@ class OpenADCInterface(util.DisableNewAttr):
 
             if datapoints is None:
                 return []
-            if len(datapoints) > NumberPoints:
-                datapoints = datapoints[0:NumberPoints]
-
-            if len(self._int_data) > NumberPoints:
-                self._int_data = self._int_data[0:NumberPoints]
+            datapoints = self._trim_data(NumberPoints, as_int, out)
 
             # if len(datapoints) < NumberPoints:
             # print len(datapoints),
@@ -907,7 +1023,7 @@ class OpenADCInterface(util.DisableNewAttr):
 
 
 
-    def readHuskyData(self, NumberPoints=None):
+    def readHuskyData(self, NumberPoints=None, as_int=False, out=None):
         if self._bits_per_sample == 12:
             bytesToRead = int(np.ceil(NumberPoints*1.5))
         else:
@@ -924,46 +1040,71 @@ class OpenADCInterface(util.DisableNewAttr):
             if self._fast_fifo_read_enable:
                 # switch FPGA and SAM3U into fast read timing mode
                 self.setFastSMC(1)
-            data = self.sendMessage(CODE_READ, "ADCREAD_ADDR", None, False, bytesToRead)
+            data = self.read_fifo(bytesToRead)
             # switch FPGA and SAM3U back to regular read timing mode
             if self._fast_fifo_read_enable:
                 scope_logger.debug("DISABLING fast fifo read")
                 self.setFastSMC(0)
 
         scope_logger.debug("XXX read %d bytes; NumberPoints=%d, bytesToRead=%d" % (len(data), NumberPoints, bytesToRead))
+        datapoints = None
         if data is not None:
-            data = np.array(data)
-            datapoints = self.processHuskyData(NumberPoints, data)
+            datapoints = self.processHuskyData(NumberPoints, data, as_int, out)
         if datapoints is None:
             return []
         return datapoints
 
-
-    def processHuskyData(self, NumberPoints, data):
-        if self._bits_per_sample == 12:
-            data = np.frombuffer(data, dtype=np.uint8)
-            fst_uint8, mid_uint8, lst_uint8 = np.reshape(data, (data.shape[0] // 3, 3)).astype(np.uint16).T
-            fst_uint12 = (fst_uint8 << 4) + (mid_uint8 >> 4)
-            snd_uint12 = ((mid_uint8 % 16) << 8) + lst_uint8
-            data = np.reshape(np.concatenate((fst_uint12[:, None], snd_uint12[:, None]), axis=1), 2 * fst_uint12.shape[0])
-
-        self._int_data = data[:NumberPoints]
-        fpData = data / 2**self._bits_per_sample - self.offset
-        return fpData[:NumberPoints]
-
-
-    def processData(self, data, pad=float('NaN'), debug=False):
+    def get_fp_data(self, out=None):
+        """The samples of the last capture as floats, between -offset and 1-offset.
+
+        Converted from _int_data the first time they're asked for. If out is given, they
+        are converted into it instead, and it isn't kept.
+        """
+        if self._int_data is None or (self._fp_data is not None and out is None):
+            return self._fp_data
+        bits, npad, pad = self._fp_format
+        fp_data = samples_to_float(self._int_data, bits, self.offset, out=out)
+        fp_data[:npad] = pad
+        if out is None:
+            self._fp_data = fp_data
+        return fp_data
+
+    def _trim_data(self, NumberPoints, as_int=False, out=None):
+        """Cuts the samples of the last capture down to NumberPoints and returns them, in out if given"""
+        self._int_data = self._int_data[:NumberPoints]
+        if self._fp_data is not None:
+            self._fp_data = self._fp_data[:NumberPoints]
+        if as_int:
+            if out is not None:
+                out = out[:len(self._int_data)]
+                out[:] = self._int_data
+                self._int_data = out
+            return self._int_data
+        return self.get_fp_data(out)
+
+    def processHuskyData(self, NumberPoints, data, as_int=False, out=None):
+        # Unpacked into a new array (or out), data may be the read buffer the next capture overwrites
+        self._int_data = unpack_husky_samples(data, self._bits_per_sample, NumberPoints, out=out if as_int else None)
+        self._fp_data = None
+        self._fp_format = (self._bits_per_sample, 0, 0.0)
+        if as_int:
+            return self._int_data
+        return self.get_fp_data(out)
+
+
+    def processData(self, data, pad=float('NaN'), debug=False, as_int=False):
         if data[0] != 0xAC:
             scope_logger.warning('Unexpected sync byte in processData(): 0x%x' % data[0])
             #print(data)
             return None
 
         self._int_data = None
+        self._fp_data = None
 
-        orig_data = copy.copy(data)
         if debug:
-            fpData = []
             intData = []
+            trigfound = False
+            trigsamp = 0
             # Slow, verbose processing method
             # Useful for fixing issues in ADC read
             for i in range(1, len(data) - 3, 4):
@@ -998,74 +1139,45 @@ class OpenADCInterface(util.DisableNewAttr):
 
                 # print "%x %x %x"%(intpt1, intpt2, intpt3)
 
-                fpData.append(float(intpt1) / 1024.0 - self.offset)
-                fpData.append(float(intpt2) / 1024.0 - self.offset)
-                fpData.append(float(intpt3) / 1024.0 - self.offset)
                 intData.extend([intpt1, intpt2, intpt3])
+
+            self._int_data = np.array(intData, dtype='int16')
                 
         else:
             # Fast, efficient NumPy implementation
-
-            # Figure out how many bytes we're going to process
-            # Cut off some bytes at the end: we need the length to be a multiple of 4, and we probably have extra data
-            numbytes = len(data) - 1
-            extralen = (len(data) - 1) % 4
-
-            # Copy the data into a NumPy array. For long traces this is the longest part
-            data = data[1:1+numbytes-extralen]
-
-            # Split data into groups of 4 bytes and combine into words
-            data = np.reshape(data, (-1, 4))
-            data = np.left_shift(data, [24, 16, 8, 0])
-            data = np.sum(data, 1)
-
-            # Split words into samples and trigger bytes
-            data = np.right_shift(np.reshape(data, (-1, 1)), [0, 10, 20, 30]) & 0x3FF
-            fpData = np.reshape(data[:, [0, 1, 2]], (-1))
-            trigger = data[:, 3] % 4
-            self._int_data = np.array(fpData, dtype='int16')
-            fpData = fpData / 1024.0 - self.offset
-            scope_logger.debug("Trigger_data: {} len={}".format(trigger, len(trigger)))
-            scope_logger.debug("Unprocessed data, fpData: {}, int_data: {}".format(len(fpData), len(self._int_data)))
-
-            # Search for the trigger signal
-            trigfound = False
-            trigsamp = 0
-            for t in trigger:
-                if(t != 3):
-                    trigfound = True
-                    trigsamp = trigsamp + (t & 0x3)
-                    scope_logger.debug("Trigger found at %d"%trigsamp)
-                    break
-                else:
-                    trigsamp += 3
-
-        #print len(fpData)
+            self._int_data, trigsamp = unpack_openadc_samples(data)
+            trigfound = trigsamp is not None
+            if trigfound:
+                scope_logger.debug("Trigger found at %d"%trigsamp)
+            else:
+                trigsamp = len(self._int_data)
+            scope_logger.debug("Unprocessed data, int_data: {}".format(len(self._int_data)))
 
         if trigfound == False:
             scope_logger.warning('Trigger not found in ADC data. No data reported!')
             scope_logger.debug('Trigger not found typically caused by the actual \
             capture starting too late after the trigger event happens')
-            scope_logger.debug('Data: {}'.format(orig_data))
+            scope_logger.debug('Data: {}'.format(data))
 
 
         #Ensure that the trigger point matches the requested by padding/chopping
         diff = self.presamples_desired - trigsamp
         if diff > 0:
-            #fpData = [pad]*diff + fpData
-            fpData = np.append([pad]*diff, fpData)
-            self._int_data = np.append([0x00]*diff, self._int_data)
-            scope_logger.debug("Diff > 0, fpData: {}, int_data: {}".format(len(fpData), len(self._int_data)))
+            self._int_data = np.concatenate((np.zeros(diff, dtype=self._int_data.dtype), self._int_data))
+            scope_logger.debug("Diff > 0, int_data: {}".format(len(self._int_data)))
             scope_logger.warning('Pretrigger not met: Do not use downsampling and pretriggering at same time.')
             scope_logger.debug('Pretrigger not met: can attempt to increase presampleTempMargin(in the code).')
         else:
-            scope_logger.debug("Diff <= 0, fpData: {}, int_data: {}".format(len(fpData), len(self._int_data)))
-            fpData = fpData[-diff:]
+            scope_logger.debug("Diff <= 0, int_data: {}".format(len(self._int_data)))
             self._int_data = self._int_data[-diff:]
+        # The padding samples are reported as pad when converted to floats
+        self._fp_format = (10, max(diff, 0), pad)
 
-        scope_logger.debug("Processed data, fpData: {}, int_data: {}".format(len(fpData), len(self._int_data)))
+        scope_logger.debug("Processed data, int_data: {}".format(len(self._int_data)))
 
-        return fpData
+        if as_int:
+            return self._int_data
+        return self.get_fp_data()
 
 class HWInformation(util.DisableNewAttr):
     _name = 'HW Information'
@@ -872,18 +872,22 @@ class TraceWhisperer(util.DisableNewAttr):
             print(self._ss.read().split('\n')[0])
 
 
-    def read_capture_data(self):
+    def read_capture_data(self, check_empty=False, burst_size=8192):
         """Read captured trace data.
 
-        Returns: List of captured entries. Each list element is itself a 3-element list,
+        Args:
+            check_empty (bool): check that the FIFO isn't empty before reading
+                each entry (two USB transactions per entry, much slower);
+                otherwise the FIFO is read burst_size entries at a time.
+                Both return the same entries.
+            burst_size (int): number of FIFO entries read per USB transfer.
+
+        Returns: (N, 3) numpy array of uint8. Each row is a captured entry,
         containing the 3 bytes that make up a capture entry. Can be parsed by get_rule_match_times()
         or get_raw_trace_packets(). See defines_trace.v for definition of the FIFO
         data fields.
 
         """
-        data = []
-        starttime = time.time()
-
         # first check for FIFO to not be empty:
         assert self.fifo_empty() == False, 'FIFO is empty'
 
@@ -891,8 +895,32 @@ class TraceWhisperer(util.DisableNewAttr):
         if  self.errors:
             tracewhisperer_logger.warning("FIFO errors occured: %s" % self.errors)
 
-        while not self.fifo_empty():
-            data.append(self.fpga_read(self.REG_SNIFF_FIFO_RD, 4)[1:4])
+        if check_empty:
+            data = []
+            while not self.fifo_empty():
+                data.append(self.fpga_read(self.REG_SNIFF_FIFO_RD, 4)[1:4])
+            data = np.array(data, dtype=np.uint8).reshape(-1, 3)
+        else:
+            # Reading an empty FIFO returns filler entries flagged with the
+            # FIFO empty status bit, so we can read in bursts until the last
+            # entry read says the FIFO has run empty, then drop the filler:
+            bursts = []
+            while True:
+                raw = np.asarray(self.fpga_read(self.REG_SNIFF_FIFO_RD, 4*burst_size), dtype=np.uint8)
+                raw = raw[:len(raw)//4*4].reshape(-1, 4)[:, 1:4]
+                empty = (raw[:, 2] & 2**self.FE_FIFO_STAT_EMPTY) != 0
+                bursts.append(raw[~empty])
+                if not len(raw) or empty[-1]:
+                    break
+            data = np.concatenate(bursts)
+            # reading past the end of the FIFO is expected here; clear the
+            # underflow it flagged so it isn't reported on the next capture,
+            # but leave any other error flags set:
+            errors = self.errors
+            if errors == "FIFO underflow, ":
+                self.errors = 0
+            elif errors:
+                tracewhisperer_logger.warning("FIFO errors occured: %s" % errors)
 
         if len(data): # maybe we only got empty reads
             if data[-1][2] & 2**self.FE_FIFO_STAT_UNDERFLOW:
@@ -906,19 +934,43 @@ class TraceWhisperer(util.DisableNewAttr):
         type, timestamp, and payload. See defines_trace.v for bitfield
         definitions.
         """
-        for e in rawdata:
-            entry = 0
-            entry += (e[2] & 0x3) << 16
-            entry += e[1] << 8
-            entry += e[0]
+        raw = self._raw_array(rawdata).astype(np.uint32)
+        for entry in ((raw[:, 2] & 0x3) << 16) + (raw[:, 1] << 8) + raw[:, 0]:
             print('%05x' % entry)
 
 
+    @staticmethod
+    def _raw_array(rawdata):
+        """Raw capture data (list of 3-byte entries or array) as an (N, 3) uint8 array."""
+        return np.asarray(rawdata, dtype=np.uint8).reshape(-1, 3)
+
+
+    @staticmethod
+    def _find_pattern(data, pattern):
+        """Indices where pattern starts in the 1D array data."""
+        if len(data) < len(pattern):
+            return np.zeros(0, dtype=np.int64)
+        windows = np.lib.stride_tricks.sliding_window_view(data, len(pattern))
+        return np.flatnonzero(np.all(windows == pattern, axis=1))
+
+
+    def _raw_times(self, raw):
+        """Time counter after each raw capture entry: DATA and STAT entries
+        carry a short timestamp delta, TIME entries a long one.
+        """
+        command = raw[:, 2] & 0x3
+        shorttime = raw[:, 0].astype(np.int64)
+        longtime = shorttime + (raw[:, 1].astype(np.int64) << 8)
+        incr = np.where(command == self.FE_FIFO_CMD_TIME, longtime,
+                        np.where((command == self.FE_FIFO_CMD_DATA) | (command == self.FE_FIFO_CMD_STAT), shorttime, 0))
+        return command, np.cumsum(incr)
+
+
     def get_rule_match_times(self, rawdata, rawtimes=False, verbose=False):
         """Split raw capture data into data events and times, stat events and times.
 
         Args:
-            rawdata: raw capture data, list of lists, e.g. obtained from read_capture_data()
+            rawdata: raw capture data, (N, 3) array or list of lists, e.g. obtained from read_capture_data()
             rawtimes:
                 True: return reported times (obtained at the *end* of the pattern match)
                 False: roll back times to the *start* of the pattern match
@@ -927,34 +979,29 @@ class TraceWhisperer(util.DisableNewAttr):
             list of [time, rule index] tuples
         """
 
-        times = []
-        timecounter = 0
-        lasttime = 0
-        lastadjust = 0
-        for raw in rawdata:
-            command = raw[2] & 0x3
-            if command == self.FE_FIFO_CMD_DATA:
-                timecounter += raw[0]
-                data = raw[1]
-                rule = int(math.log2(data))
-                if rawtimes:
-                    adjust = 0
-                else:
-                    adjust = self.rule_length[rule]*self._cycles_per_byte()
-                timecounter = timecounter - adjust + lastadjust
-                delta = timecounter - lasttime
-                lasttime = timecounter
-                lastadjust = adjust
-                if verbose:
-                    print("%8d rule # %d, delta = %d" % (timecounter, rule, delta))
-                times.append([timecounter, rule])
-            elif command == self.FE_FIFO_CMD_TIME:
-                timecounter += raw[0] + (raw[1] << 8)
-            elif command == self.FE_FIFO_CMD_STAT:
-                tracewhisperer_logger.error("Unexpected STAT command, not supported by this method; maybe try get_raw_trace_packets() instead?")
-            elif command == self.FE_FIFO_CMD_STRM:
-                pass
-        return times
+        raw = self._raw_array(rawdata)
+        command, timecounter = self._raw_times(raw)
+        if np.any(command == self.FE_FIFO_CMD_STAT):
+            tracewhisperer_logger.error("Unexpected STAT command, not supported by this method; maybe try get_raw_trace_packets() instead?")
+
+        isdata = command == self.FE_FIFO_CMD_DATA
+        data = raw[isdata, 1]
+        if np.any(data == 0):
+            raise ValueError("DATA entry with no rule set")
+        rules = np.floor(np.log2(data)).astype(np.int64)
+        times = timecounter[isdata]
+        if not rawtimes:
+            # each match's time is rolled back by its own pattern length only:
+            times = times - np.asarray(self.rule_length)[rules]*self._cycles_per_byte()
+
+        times = times.tolist()
+        rules = rules.tolist()
+        if verbose:
+            lasttime = 0
+            for time, rule in zip(times, rules):
+                print("%8d rule # %d, delta = %d" % (time, rule, time - lasttime))
+                lasttime = time
+        return [[time, rule] for time, rule in zip(times, rules)]
 
 
     def _cycles_per_byte(self):
@@ -974,60 +1021,46 @@ class TraceWhisperer(util.DisableNewAttr):
         trace packets, which is best left to other tools!
 
         Args:
-            rawdata: raw capture data, list of lists, e.g. obtained from read_capture_data()
+            rawdata: raw capture data, (N, 3) array or list of lists, e.g. obtained from read_capture_data()
             verbose: print timestamped packets
         Returns:
             list of pseudo-frames
         """
 
-        pseudoframes = []
-        pseudoframe = []
-        timecounter = 0
-        lasttime = 0
-        for raw in rawdata:
-            command = raw[2] & 0x3
-            if command == self.FE_FIFO_CMD_STAT:
-                timecounter += raw[0]
-                data = raw[1]
-                if not len(pseudoframe):
-                    starttime = timecounter
-                pseudoframe.append(data)
-
-                if removesyncs:
-                    if pseudoframe[-len(self.longsync):] == self.longsync:
-                        pseudoframe = pseudoframe[:-len(self.longsync)]
-                        sync_removed = True
-                        #print('Removed long')
-                    elif pseudoframe[-len(self.shortsync):] == self.shortsync:
-                        pseudoframe = pseudoframe[:-len(self.shortsync)]
-                        sync_removed = True
-                        #print('Removed short')
-                    else:
-                        sync_removed = False
-                else:
-                    sync_removed = False
-
-                if sync_removed and len(pseudoframe):
-                    pseudoframes.append([starttime, pseudoframe])
-                    if verbose:
-                        print("Pseudoframe: ", end='')
-                        for b in pseudoframe:
-                            print('%02x ' % b, end='')
-                        print();
-                    pseudoframe = []
-
-                delta = timecounter - lasttime
-                lasttime = timecounter
-
-            elif command == self.FE_FIFO_CMD_TIME:
-                timecounter += raw[0] + (raw[1] << 8)
-            elif command == self.FE_FIFO_CMD_DATA:
-                raise ValueError("Unexpected DATA command, not supported by this method; maybe try get_rule_match_times() instead?")
-            elif command == self.FE_FIFO_CMD_STRM:
-                pass
+        raw = self._raw_array(rawdata)
+        command, timecounter = self._raw_times(raw)
+        if np.any(command == self.FE_FIFO_CMD_DATA):
+            raise ValueError("Unexpected DATA command, not supported by this method; maybe try get_rule_match_times() instead?")
+
+        isstat = command == self.FE_FIFO_CMD_STAT
+        data = raw[isstat, 1]
+        times = timecounter[isstat]
 
         if not removesyncs:
-            pseudoframes.append([starttime, pseudoframe])
+            if not len(data):
+                return []
+            return [[int(times[0]), data.tolist()]]
+
+        # Syncs end with shortsync; they're long syncs if preceded by enough of
+        # longsync. A sync's bytes can't include the end of another sync, so
+        # where syncs are doesn't depend on which pseudo-frame they're in:
+        longlen = len(self.longsync)
+        shortlen = len(self.shortsync)
+        sync_end = self._find_pattern(data, self.shortsync) + shortlen
+        is_long = np.isin(sync_end - longlen, self._find_pattern(data, self.longsync))
+        sync_start = sync_end - np.where(is_long, longlen, shortlen)
+        frame_start = np.concatenate([[0], sync_end[:-1]]).astype(np.int64)
+
+        pseudoframes = []
+        for start, end in zip(frame_start.tolist(), sync_start.tolist()):
+            if end > start:
+                pseudoframe = data[start:end].tolist()
+                pseudoframes.append([int(times[start]), pseudoframe])
+                if verbose:
+                    print("Pseudoframe: ", end='')
+                    for b in pseudoframe:
+                        print('%02x ' % b, end='')
+                    print();
 
         return pseudoframes
 
@@ -2171,25 +2204,19 @@ class UARTTrigger(TraceWhisperer):
         """ Helper function to parse the captured UART data.
 
         Args:
-            rawdata (list): raw capture data, list of lists, e.g. obtained from read_capture_data()
+            rawdata (array): raw capture data, e.g. obtained from read_capture_data()
             prepend_matched_pattern (bool): 
             return_ascii (bool): return data as ASCII (otherwise hex)
         """
-        datalist = []
-        prepend = []
+        raw = self._raw_array(rawdata)
+        command = raw[:, 2] & 0x3
+        if np.any(command == self.FE_FIFO_CMD_DATA):
+            print("Unexpected data command.")
+        datalist = raw[command == self.FE_FIFO_CMD_STAT, 1].tolist()
         if prepend_matched_pattern:
-            for b in self.fpga_read(self.REG_MATCHED_DATA, 8):
-                prepend.append([0, b, self.FE_FIFO_CMD_STAT])
-        for raw in prepend+rawdata:
-            command = raw[2] & 0x3
-            if command == self.FE_FIFO_CMD_STAT:
-                data = raw[1]
-                if return_ascii:
-                    datalist.append(chr(data))
-                else:
-                    datalist.append(data)
-            elif command == self.FE_FIFO_CMD_DATA:
-                print("Unexpected data command.")
+            datalist = list(self.fpga_read(self.REG_MATCHED_DATA, 8)) + datalist
+        if return_ascii:
+            return [chr(data) for data in datalist]
         return datalist
 
 
@@ -29,12 +29,13 @@ from datetime import datetime
 import zipfile
 import numpy as np
 
-from chipwhisperer.common.api.TraceManager import TraceManager
+from chipwhisperer.common.api.TraceManager import TraceManager, trace_formats
 from chipwhisperer.common.api.settings import Settings
 from chipwhisperer.common.utils.parameter import Parameter, Parameterized, setupSetParam
 from chipwhisperer.common.utils import util
 from chipwhisperer.common.traces.TraceContainerNative import TraceContainerNative
 import copy
+import functools
 from chipwhisperer.common.traces import Trace
 from ...logging import *
 import shutil
@@ -122,10 +123,16 @@ class Project(Parameterized):
       *  :meth:`project.trace_manager <.Project.trace_manager>`
       *  :meth:`project.save <.Project.save>`
       *  :meth:`project.export <.Project.export>`
+
+    Args:
+        trace_format (str): How new trace segments are stored, 'native' (.npy
+            files) or 'compressed' (chunked and zlib compressed, see
+            :class:`TraceContainerCompressed <chipwhisperer.common.traces.TraceContainerCompressed.TraceContainerCompressed>`).
+            Segments are always read back in the format they were saved in.
     """
     untitledFileName = os.path.normpath(os.path.join(Settings().value("project-home-dir"), "tmp", "default.cwp"))
 
-    def __init__(self, prog_name="ChipWhisperer", prog_ver=""):
+    def __init__(self, prog_name="ChipWhisperer", prog_ver="", trace_format="native"):
         self.valid_traces = None
         self._trace_format = None
 
@@ -135,7 +142,9 @@ class Project(Parameterized):
         ])
 
         #self.findParam("Trace Format").setValue(TraceContainerNative(project=self), addToList=True)
-        self._trace_format = TraceContainerNative(project=self)
+        if trace_format not in trace_formats:
+            raise ValueError("Unknown trace format %s, expected one of %s" % (trace_format, list(trace_formats)))
+        self._trace_format = trace_formats[trace_format](project=self)
 
         #self.traceParam = Parameter(name="Trace Settings", type='group', addLoadSave=True).register()
         #self.params.getChild('Trace Format').stealDynamicParameters(self.traceParam)
@@ -156,10 +165,14 @@ class Project(Parameterized):
 
         self._segments = Segments(self)
         self._traces = Traces(self)
-        self._keys = IndividualIterable(self._traceManager.get_known_key, self._traceManager.num_traces)
-        self._textins = IndividualIterable(self._traceManager.get_textin, self._traceManager.num_traces)
-        self._textouts = IndividualIterable(self._traceManager.get_textout, self._traceManager.num_traces)
-        self._waves = IndividualIterable(self._traceManager.get_trace, self._traceManager.num_traces)
+        self._keys = IndividualIterable(self._traceManager.get_known_key, self._traceManager.num_traces,
+                                        functools.partial(self._traceManager._get_items, 'keys'))
+        self._textins = IndividualIterable(self._traceManager.get_textin, self._traceManager.num_traces,
+                                           functools.partial(self._traceManager._get_items, 'textins'))
+        self._textouts = IndividualIterable(self._traceManager.get_textout, self._traceManager.num_traces,
+                                            functools.partial(self._traceManager._get_items, 'textouts'))
+        self._waves = IndividualIterable(self._traceManager.get_trace, self._traceManager.num_traces,
+                                         functools.partial(self._traceManager._get_items, 'traces'))
 
         if __debug__:
             logging.debug('Created: ' + str(self))
@@ -659,6 +672,8 @@ class Traces:
         self.cur_trace_num = 0
         self.seg_len = segment_length
         self.seg_ind_max = self.seg_len - 1
+        self.cur_seg.setTraceLimit(self.seg_len)
+        self._reserved = 0
 
     @property
     def max(self):
@@ -669,6 +684,35 @@ class Traces:
     def keys(self):
         return self._keys
 
+    def reserve(self, num_traces):
+        """Pre-size the trace buffers for the next num_traces appended traces.
+
+        Segments are allocated at their final size as they are started, instead
+        of growing while traces are appended.
+
+        Args:
+            num_traces (int): Number of traces about to be appended.
+        """
+        self._reserved = num_traces
+        self.cur_seg.reserve(self.cur_trace_num + min(num_traces, self.seg_len - self.cur_trace_num))
+
+    @property
+    def memmap_dir(self):
+        """Directory to keep the trace buffers of new segments in, or None.
+
+        When set, traces being captured are written to (unnamed) temporary
+        files in this directory instead of being held in memory, so long
+        captures don't need all their traces to fit in RAM. The files are
+        deleted along with the segment's trace buffer.
+        """
+        return self.project._trace_format.memmap_dir
+
+    @memmap_dir.setter
+    def memmap_dir(self, directory):
+        self.project._trace_format.memmap_dir = directory
+        if self.cur_seg.traces is None:
+            self.cur_seg.memmap_dir = directory
+
     def append(self, trace, dtype=np.double):
         """Append a Trace containing the trace and related operation information.
 
@@ -685,10 +729,14 @@ class Traces:
 
         if self.cur_trace_num > self.seg_ind_max:
             self.cur_seg = self.project.segments.new()
+            self.cur_seg.setTraceLimit(self.seg_len)
+            if self._reserved > 0:
+                self.cur_seg.reserve(min(self._reserved, self.seg_len))
             self.project.segments.append(self.cur_seg)
             self.cur_trace_num = 0
         self.cur_seg.add_trace(*trace, dtype=dtype)
         self.cur_trace_num += 1
+        self._reserved = max(self._reserved - 1, 0)
 
     def extend(self, iterable):
         """Add all traces in an iterable to the project.
@@ -724,8 +772,8 @@ class Traces:
         return result
 
     def __getitem__(self, item):
-        if isinstance(item, int):
-            ind = item
+        if isinstance(item, (int, np.integer)):
+            ind = int(item)
             if ind < 0:
                 ind = self.max + ind + 1
 
@@ -740,21 +788,13 @@ class Traces:
             )
             return result
 
-        elif isinstance(item, slice):
-            indices = item.indices(self.tm.num_traces())
-            result = []
-            for i in range(*indices):
-                result.append(
-                    Trace(
-                        self.tm.get_trace(i),
-                        self.tm.get_textin(i),
-                        self.tm.get_textout(i),
-                        self.tm.get_known_key(i)
-                    )
-                )
-            return result
+        elif isinstance(item, (slice, list, tuple, np.ndarray)):
+            # Each field is read a block per segment, the waves of a slice
+            # within one segment are views of the stored traces
+            fields = [self.tm._get_items(field, item) for field in ('traces', 'textins', 'textouts', 'keys')]
+            return [Trace(*row) for row in zip(*fields)]
         else:
-            raise TypeError('Indexing by integer or slice only')
+            raise TypeError('Indexing by integer, slice, integer array or boolean mask only')
 
     def __repr__(self):
         _, project_filename = os.path.split(self.project.get_filename())
@@ -834,9 +874,10 @@ class Segments:
 
 class IndividualIterable:
     
-    def __init__(self, getter_func, trace_num_func):
+    def __init__(self, getter_func, trace_num_func, items_func=None):
         self.getter = getter_func
         self.trace_num_func = trace_num_func
+        self.items_func = items_func
 
     @property
     def max(self):
@@ -857,8 +898,8 @@ class IndividualIterable:
         return self.trace_num_func()
 
     def __getitem__(self, item):
-        if isinstance(item, int):
-            ind = item
+        if isinstance(item, (int, np.integer)):
+            ind = int(item)
             if ind < 0:
                 ind = self.max + ind + 1
 
@@ -867,6 +908,10 @@ class IndividualIterable:
 
             return self.getter(ind)
 
+        elif self.items_func is not None and isinstance(item, (slice, list, tuple, np.ndarray)):
+            # Array of the selected rows, a view when a slice is within one segment
+            return self.items_func(item)
+
         elif isinstance(item, slice):
             indices = item.indices(self.max+1)
             result = []
@@ -876,12 +921,18 @@ class IndividualIterable:
         else:
             raise TypeError('Indexing by integer or slice only')
 
-    def __array__(self):
+    def __array__(self, dtype=None):
         # to make converting to numpy arrays much easier
         if hasattr(self.getter(0), "dtype"):
-            dtype = self.getter(0).dtype
+            default_dtype = self.getter(0).dtype
         else:
-            dtype = 'uint8'
+            default_dtype = 'uint8'
+        if dtype is None:
+            dtype = default_dtype
+
+        if self.items_func is not None:
+            return np.array(self.items_func(slice(None)), dtype=dtype)
+
         num_traces = self.trace_num_func()
         len_trace = len(self.getter(0))
         arr = np.zeros((num_traces, len_trace), dtype=dtype)
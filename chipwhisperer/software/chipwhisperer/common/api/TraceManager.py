@@ -22,12 +22,17 @@
 #    You should have received a copy of the GNU General Public License
 #    along with chipwhisperer.  If not, see <http://www.gnu.org/licenses/>.
 
+import bisect
+import collections
 import configparser
 import logging
 import os.path
 import re
 
+import numpy as np
+
 from chipwhisperer.common.traces.TraceContainerNative import TraceContainerNative
+from chipwhisperer.common.traces.TraceContainerCompressed import TraceContainerCompressed
 from chipwhisperer.common.utils import util
 from chipwhisperer.common.utils.tracesource import TraceSource
 
@@ -35,6 +40,13 @@ from datetime import datetime
 from pathlib import Path
 import copy
 
+#: Trace container for each value of the 'format' attribute of a segment config
+trace_formats = {
+    "native": TraceContainerNative,
+    "compressed": TraceContainerCompressed,
+}
+
+
 class TraceManager(TraceSource):
     """
     When using traces in ChipWhisperer, you may have remapped a bunch of trace
@@ -55,11 +67,21 @@ class TraceManager(TraceSource):
         self.lastUsedSegment = None
         self.traceSegments = []
         self.saved = False
+        # Enabled, non-empty segments and their first trace index, rebuilt by _updateRanges()
+        self._segment_index = []
+        self._segment_starts = []
+        # Segments with traces loaded, least recently used first
+        self._loaded_segments = collections.OrderedDict()
+        self.max_loaded_segments = 4
         if __debug__: logging.debug('Created: ' + str(self))
 
     def new_project(self):
         """Create a new empty set of traces."""
         self.traceSegments = []
+        self.lastUsedSegment = None
+        self._segment_index = []
+        self._segment_starts = []
+        self._loaded_segments.clear()
         self.dirty.setValue(False)
         self.sigTracesChanged.emit()
 
@@ -100,6 +122,10 @@ class TraceManager(TraceSource):
                 ti = TraceContainerNative()
                 try:
                     ti.config.loadTrace(fname)
+                    fmt = ti.config.attr("format")
+                    if fmt in trace_formats and not isinstance(ti, trace_formats[fmt]):
+                        ti = trace_formats[fmt]()
+                        ti.config.loadTrace(fname)
                     ti.loadAllTraces()
                 except Exception as e:
                     logging.error(str(e))
@@ -143,25 +169,34 @@ class TraceManager(TraceSource):
 
     def get_segment(self, traceIndex):
         """Return the trace segment with the specified trace in the list with all enabled segments."""
-        if self.lastUsedSegment is not None:
-            if self.lastUsedSegment.mappedRange is not None and self.lastUsedSegment.mappedRange[0] <= traceIndex <= \
-                    self.lastUsedSegment.mappedRange[1]:
-                return self.lastUsedSegment
-            else:
-                # Only load one segment at a time for memory reasons
-                # If the traces are actually saved :)
-                if self.saved:
-                    self.lastUsedSegment.unloadAllTraces()
-                    self.lastUsedSegment = None
-
-        for traceSegment in self.traceSegments:
-            if traceSegment.mappedRange and traceSegment.mappedRange[0] <= traceIndex <= traceSegment.mappedRange[1]:
-                if not traceSegment.isLoaded():
-                    traceSegment.loadAllTraces(None, None)
-                self.lastUsedSegment = traceSegment
-                return traceSegment
-
-        raise ValueError("Error: Trace %d is not in mapped range." % traceIndex)
+        t = self.lastUsedSegment
+        if t is not None and t.mappedRange is not None and t.mappedRange[0] <= traceIndex <= t.mappedRange[1]:
+            return t
+
+        i = bisect.bisect_right(self._segment_starts, traceIndex) - 1
+        if i < 0 or traceIndex > self._segment_index[i].mappedRange[1]:
+            raise ValueError("Error: Trace %d is not in mapped range." % traceIndex)
+
+        t = self._segment_index[i]
+        self._use_segment(t)
+        self.lastUsedSegment = t
+        return t
+
+    def _use_segment(self, t):
+        """Load segment t if needed and mark it as most recently used.
+
+        Only max_loaded_segments stay loaded, the least recently used ones are
+        unloaded for memory reasons - if the traces are actually saved :)
+        """
+        if not t.isLoaded():
+            t.loadAllTraces(None, None)
+        self._loaded_segments[id(t)] = t
+        self._loaded_segments.move_to_end(id(t))
+
+        while len(self._loaded_segments) > max(self.max_loaded_segments, 1):
+            _, old = self._loaded_segments.popitem(last=False)
+            if self.saved and not old.dirty:
+                old.unloadAllTraces()
 
     getSegment = util.camel_case_deprecated(get_segment)
 
@@ -183,6 +218,108 @@ class TraceManager(TraceSource):
 
     getTrace = util.camel_case_deprecated(get_trace)
 
+    def get_traces(self, start, end):
+        """Return traces start..end-1 in the list of enabled segments as a (end-start, points) array.
+
+        Each segment covering the range is sliced once rather than reading trace by trace.
+        """
+        blocks = []
+        n = start
+        while n < end:
+            t = self.get_segment(n)
+            stop = min(end, t.mappedRange[1] + 1)
+            blocks.append(t.get_traces(n - t.mappedRange[0], stop - t.mappedRange[0]))
+            n = stop
+
+        if len(blocks) == 1:
+            return blocks[0]
+        return np.concatenate(blocks)
+
+    def _get_items(self, field, item):
+        """Values of one field for a slice, integer index array or boolean mask of traces.
+
+        Args:
+            field (str): 'traces', 'textins', 'textouts' or 'keys'.
+            item: Slice, integer index array or boolean mask over the enabled traces.
+
+        Returns:
+            An array with one row per selected trace. A slice within a single
+            segment is a view of that segment's data, otherwise the rows are
+            gathered segment by segment into a new array.
+        """
+        num_traces = self.num_traces()
+        if isinstance(item, slice):
+            start, stop, step = item.indices(num_traces)
+            if step > 0 and start < stop:
+                t = self.get_segment(start)
+                if stop - 1 <= t.mappedRange[1]:
+                    lo = t.mappedRange[0]
+                    return self._segment_items(t, field, slice(start - lo, stop - lo, step))
+            indices = np.arange(start, stop, step)
+        else:
+            indices = np.asarray(item)
+            if indices.size == 0:
+                indices = indices.astype(np.int64)
+            if indices.dtype == bool:
+                if indices.shape != (num_traces,):
+                    raise IndexError("Boolean index has shape %s, expected (%d,)" % (indices.shape, num_traces))
+                indices = np.flatnonzero(indices)
+            elif not np.issubdtype(indices.dtype, np.integer) or indices.ndim != 1:
+                raise TypeError("Expected slice, integer array or boolean mask; got %s" % type(item), item)
+            indices = np.where(indices < 0, indices + num_traces, indices)
+            if indices.size and (indices.min() < 0 or indices.max() >= num_traces):
+                raise IndexError('Index outside of range ({}, {})'.format(0, num_traces - 1))
+
+        if len(indices) == 0:
+            if len(self._segment_index) == 0:
+                return np.empty(0)
+            return self._segment_items(self.get_segment(0), field, slice(0, 0))
+
+        # Read every segment once, in order, then put the rows back in the requested order
+        seg_ids = np.searchsorted(self._segment_starts, indices, side='right') - 1
+        order = np.argsort(seg_ids, kind='stable')
+        sorted_ids = seg_ids[order]
+        blocks = []
+        for chunk in np.split(indices[order], np.flatnonzero(np.diff(sorted_ids)) + 1):
+            t = self.get_segment(int(chunk[0]))
+            local = chunk - t.mappedRange[0]
+            if np.all(np.diff(local) == 1):
+                local = slice(int(local[0]), int(local[-1]) + 1)
+            blocks.append(self._segment_items(t, field, local))
+
+        items = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+        if np.any(order != np.arange(len(order))):
+            reordered = np.empty_like(items)
+            reordered[order] = items
+            items = reordered
+        return items
+
+    def _segment_items(self, t, field, local):
+        """Rows of one field of segment t, local is a slice or index array into the segment"""
+        if field == 'traces':
+            return t.traces[local]
+
+        values = {'textins': t.textins, 'textouts': t.textouts, 'keys': t.keylist}[field]
+        if isinstance(values, np.ndarray):
+            return values[local]
+
+        if isinstance(local, slice):
+            rows = range(t.numTraces())[local]
+        else:
+            rows = local
+        if values is None:
+            values = [t.knownkey] * len(rows)
+            rows = range(len(rows))
+        values = [values[i] for i in rows]
+        try:
+            return np.asarray(values)
+        except ValueError:
+            # Ragged values (e.g. different text lengths) - keep them as objects
+            items = np.empty(len(values), dtype=object)
+            for i, v in enumerate(values):
+                items[i] = v
+            return items
+
     def get_textin(self, n):
         """Return the input text of trace with index n in the list of enabled segments"""
         t = self.get_segment(n)
@@ -235,6 +372,13 @@ class TraceManager(TraceSource):
                 t.mappedRange = None
         self._numTraces = startTrace
 
+        self._segment_index = [t for t in self.traceSegments if t.mappedRange and t.mappedRange[1] >= t.mappedRange[0]]
+        self._segment_starts = [t.mappedRange[0] for t in self._segment_index]
+        if self._loaded_segments:
+            current = set(id(t) for t in self.traceSegments)
+            for key in [key for key in self._loaded_segments if key not in current]:
+                del self._loaded_segments[key]
+
     def num_points(self):
         """Return the number of points in traces of the selected segments."""
         return self._numPoints
@@ -0,0 +1,225 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2013-2014, NewAE Technology Inc
+# All rights reserved.
+#
+# Find this and more at newae.com - this file is part of the chipwhisperer
+# project, http://www.assembla.com/spaces/chipwhisperer
+#
+#    This file is part of chipwhisperer.
+#
+#    chipwhisperer is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    chipwhisperer is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with chipwhisperer.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import os
+import shutil
+import numpy as np
+from .TraceContainerNative import TraceContainerNative
+
+
+def find_scale(traces, max_bits=15):
+    """Find a gain of 2**-bits that turns the traces into int16 values exactly.
+
+    Scope data is usually raw ADC codes scaled by 1/2**bits (minus an offset
+    that keeps them on the same grid), so this finds the ADC resolution.
+
+    Returns:
+        (gain, offset) or None if the traces aren't on such a grid.
+    """
+    traces = np.asarray(traces)
+    if traces.size == 0:
+        return None
+    if np.issubdtype(traces.dtype, np.integer):
+        if traces.min() >= -2**15 and traces.max() < 2**15:
+            return 1, 0
+        return None
+    if not np.issubdtype(traces.dtype, np.floating):
+        return None
+
+    # Find the resolution on the first trace, then check it holds for all of them
+    for bits in range(max_bits + 1):
+        q = traces[0] * 2.0**bits
+        if np.array_equal(q, np.round(q)):
+            break
+    else:
+        return None
+
+    q = traces * 2.0**bits
+    if not np.array_equal(q, np.round(q)) or q.min() < -2**15 or q.max() >= 2**15:
+        return None
+    return 2.0**-bits, 0
+
+
+class ChunkedTraces(object):
+    """Read-only (traces, points) array over a compressed trace file.
+
+    Supports the indexing the trace containers use (integer, slice, index
+    array, boolean mask, with an optional column index), only decompressing
+    the chunks holding the requested traces. The last few chunks read are
+    cached.
+    """
+    def __init__(self, filename, cache_chunks=4):
+        self.filename = filename
+        self._npz = np.load(filename)
+        self.chunk_size = int(self._npz["chunk_size"])
+        self.shape = (int(self._npz["num_traces"]), int(self._npz["num_points"]))
+        self.dtype = np.dtype(str(self._npz["dtype"]))
+        self.ndim = 2
+        self._codec = str(self._npz["codec"])
+        self._quantized = bool(self._npz["quantized"])
+        self._gain = float(self._npz["gain"])
+        self._offset = float(self._npz["offset"])
+        self._cache = collections.OrderedDict()
+        self._cache_chunks = cache_chunks
+
+    def __len__(self):
+        return self.shape[0]
+
+    def close(self):
+        self._cache.clear()
+        self._npz.close()
+
+    def _chunk(self, c):
+        """Decompressed traces of chunk c"""
+        if c in self._cache:
+            self._cache.move_to_end(c)
+            return self._cache[c]
+
+        data = self._npz["chunk_%06d" % c]
+        if self._codec == "delta":
+            data = np.cumsum(data, axis=1, dtype=data.dtype)
+        if self._quantized:
+            if self._gain == 1 and self._offset == 0:
+                data = data.astype(self.dtype)
+            else:
+                data = (data * self._gain + self._offset).astype(self.dtype)
+        data.setflags(write=False)
+
+        self._cache[c] = data
+        if len(self._cache) > self._cache_chunks:
+            self._cache.popitem(last=False)
+        return data
+
+    def _rows(self, indices):
+        out = np.empty((len(indices), self.shape[1]), dtype=self.dtype)
+        chunks = indices // self.chunk_size
+        for c in np.unique(chunks):
+            sel = chunks == c
+            out[sel] = self._chunk(c)[indices[sel] - c * self.chunk_size]
+        return out
+
+    def __getitem__(self, item):
+        cols = None
+        if isinstance(item, tuple):
+            item, cols = item[0], item[1:]
+
+        if isinstance(item, (int, np.integer)):
+            n = int(item)
+            if n < 0:
+                n += self.shape[0]
+            if not 0 <= n < self.shape[0]:
+                raise IndexError("index %d is out of bounds for %d traces" % (item, self.shape[0]))
+            rows = self._chunk(n // self.chunk_size)[n % self.chunk_size]
+        elif isinstance(item, slice):
+            start, stop, step = item.indices(self.shape[0])
+            c = start // self.chunk_size
+            if step == 1 and start < stop and (stop - 1) // self.chunk_size == c:
+                rows = self._chunk(c)[start - c * self.chunk_size:stop - c * self.chunk_size]
+            else:
+                rows = self._rows(np.arange(start, stop, step))
+        else:
+            indices = np.asarray(item)
+            if indices.dtype == bool:
+                indices = np.flatnonzero(indices)
+            indices = np.where(indices < 0, indices + self.shape[0], indices).astype(np.int64)
+            rows = self._rows(indices)
+
+        if cols:
+            return rows[(Ellipsis,) + cols]
+        return rows
+
+    def __array__(self, dtype=None):
+        return np.asarray(self[:], dtype=dtype)
+
+
+class TraceContainerCompressed(TraceContainerNative):
+    """ Native container with the traces stored compressed, in chunks
+
+    Traces are stored in groups of chunk_size, each compressed on its own
+    (zlib, in a .npz file) so reading a trace only decompresses its chunk.
+    Scope data that is on an ADC grid (raw codes * 2**-bits) is stored as
+    int16 with the gain kept alongside - this is lossless. Setting scale to a
+    (gain, offset) tuple forces that quantization for any data instead (lossy).
+    The 'delta' codec stores the difference between neighbouring points,
+    which compresses much better for sampled waveforms.
+
+    Textin/textout/keys are stored the same way as the native format.
+    """
+    _name = "ChipWhisperer/Compressed"
+
+    chunk_size = 32
+    codec = "delta"
+    scale = None
+
+    def clear(self):
+        super(TraceContainerCompressed, self).clear()
+        self.config.setAttr("format", "compressed")
+
+    def _loadTraceData(self, directory, prefix):
+        """Open the compressed trace file, chunks are read as they are used"""
+        return ChunkedTraces(os.path.join(directory, "%straces.npz" % prefix))
+
+    def _saveTraceData(self, directory, prefix):
+        filename = os.path.join(directory, "%straces.npz" % prefix)
+        traces = self.traces
+        if isinstance(traces, ChunkedTraces) and not self.dirty:
+            # Already compressed, no need to decode everything again
+            if os.path.abspath(traces.filename) != os.path.abspath(filename):
+                shutil.copyfile(traces.filename, filename)
+            return
+
+        if traces is None:
+            traces = np.zeros((0, 0))
+        # Buffer grows ahead of the traces added, only save the used part
+        traces = np.asarray(traces[:self.numTraces()])
+
+        scale = self.scale if self.scale is not None else find_scale(traces)
+        if scale is not None:
+            gain, offset = scale
+            if gain == 1 and offset == 0 and np.issubdtype(traces.dtype, np.integer):
+                data = traces
+            else:
+                data = np.round((traces - offset) / gain)
+            data = np.clip(data, -2**15, 2**15 - 1).astype(np.int16)
+        else:
+            gain, offset = 1, 0
+            data = traces
+
+        codec = self.codec if scale is not None else "raw"
+        meta = {"num_traces": traces.shape[0], "num_points": traces.shape[1], "dtype": str(traces.dtype),
+                "chunk_size": self.chunk_size, "codec": codec, "quantized": scale is not None,
+                "gain": gain, "offset": offset}
+        chunks = {}
+        for c, start in enumerate(range(0, len(data), self.chunk_size)):
+            chunk = data[start:start + self.chunk_size]
+            if codec == "delta":
+                chunk = np.diff(chunk, axis=1, prepend=np.zeros((len(chunk), 1), dtype=chunk.dtype))
+            chunks["chunk_%06d" % c] = chunk
+        np.savez_compressed(filename, **meta, **chunks)
+
+    def unloadAllTraces(self):
+        if isinstance(self.traces, ChunkedTraces):
+            self.traces.close()
+        super(TraceContainerCompressed, self).unloadAllTraces()
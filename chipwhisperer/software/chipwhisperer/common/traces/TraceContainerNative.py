@@ -75,7 +75,7 @@ class TraceContainerNative(TraceContainer):
             if prefix is None or prefix == '':
                 prefix = self.config.attr("prefix")
 
-        self.traces = np.load(os.path.join(directory, "%straces.npy" % prefix), mmap_mode='r', allow_pickle=True)
+        self.traces = self._loadTraceData(directory, prefix)
         self.textins = np.load(os.path.join(directory, "%stextin.npy" % prefix), allow_pickle=True)
         self.textouts = np.load(os.path.join(directory, "%stextout.npy" % prefix), allow_pickle=True)
 
@@ -97,6 +97,7 @@ class TraceContainerNative(TraceContainer):
     def unloadAllTraces(self):
         """Drop traces from memory to save space """
         self.traces = None
+        self._memmap_file = None
         self.textins = None
         self.textouts = None
         self.knownkey = None
@@ -124,9 +125,20 @@ class TraceContainerNative(TraceContainer):
         file_path = os.path.join(path, fname)
         return np.load(file_path)
 
+    def _loadTraceData(self, directory, prefix):
+        """Open the trace data file, memory mapped"""
+        return np.load(os.path.join(directory, "%straces.npy" % prefix), mmap_mode='r', allow_pickle=True)
+
+    def _saveTraceData(self, directory, prefix):
+        traces = self.traces
+        if traces is not None:
+            # Buffer grows ahead of the traces added, only save the used part
+            traces = traces[:self.numTraces()]
+        np.save(os.path.join(directory, "%straces.npy" % prefix), traces)
+
     def saveAllTraces(self, directory, prefix=""):
         self.config.saveTrace()
-        np.save(os.path.join(directory, "%straces.npy" % prefix), self.traces)
+        self._saveTraceData(directory, prefix)
         np.save(os.path.join(directory, "%stextin.npy" % prefix), self.textins)
         np.save(os.path.join(directory, "%stextout.npy" % prefix), self.textouts)
         np.save(os.path.join(directory, "%skeylist.npy" % prefix), self.keylist)
@@ -139,6 +151,7 @@ class TraceContainerNative(TraceContainer):
         # Release memory associated with data in case this isn't deleted
         if clearTrace:
             self.traces = None
+            self._memmap_file = None
 
         if clearText:
             self.textins = None
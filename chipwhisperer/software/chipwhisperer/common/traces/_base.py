@@ -25,6 +25,7 @@
 import copy
 import logging
 import re
+import tempfile
 import numpy as np
 from . import _cfgfile
 from chipwhisperer.common.utils.parameter import Parameterized
@@ -43,6 +44,7 @@ class TraceContainer(Parameterized):
     def __init__(self, configfile=None, project=None, default_setup=False):
         self.configfile = configfile
         self.fmt = None
+        self.memmap_dir = None
         self.getParams().register()
         self.getParams().addChildren([
                 {'name':'Config File', 'key':'cfgfile', 'type':'str', 'readonly':True, 'value':''},
@@ -64,7 +66,9 @@ class TraceContainer(Parameterized):
         self.dirty = False
         self.tracedtype = np.double
         self.traces = None
+        self._memmap_file = None
         self.tracehint = 1
+        self.tracelimit = None
         self.pointhint = 0
         self._numTraces = 0
         self._isloaded = False
@@ -87,7 +91,21 @@ class TraceContainer(Parameterized):
 
     def setTraceHint(self, traces):
         self.tracehint = traces
-        
+
+    def setTraceLimit(self, traces):
+        """Most traces this container is expected to hold, growing stops there"""
+        self.tracelimit = traces
+
+    def reserve(self, traces):
+        """Make room for at least this many traces, so adding them doesn't reallocate.
+
+        If no trace has been added yet this sets the size of the first
+        allocation, as the number of points isn't known until then.
+        """
+        self.tracehint = max(self.tracehint, traces)
+        if self.traces is not None and self.traces.shape[0] < traces:
+            self._grow(traces)
+
     def setPointHint(self, points):
         self.pointhint = points
 
@@ -112,35 +130,51 @@ class TraceContainer(Parameterized):
         self.config.setAttr("numTraces", self._numTraces)
         self.config.setAttr("numPoints", self.numPoints())      
 
+    def _allocate(self, rows, points, dtype):
+        """New zeroed trace buffer, in memory or in a temporary file under memmap_dir"""
+        if self.memmap_dir is None:
+            return np.zeros((rows, points), dtype=dtype)
+
+        if self._memmap_file is None:
+            self._memmap_file = tempfile.TemporaryFile(prefix="cwtraces_", dir=self.memmap_dir)
+        # Growing the file keeps the traces already written, no copy needed
+        self._memmap_file.truncate(rows * points * np.dtype(dtype).itemsize)
+        return np.memmap(self._memmap_file, dtype=dtype, mode='r+', shape=(rows, points))
+
+    def _grow(self, rows):
+        old = self.traces
+        remap = isinstance(old, np.memmap) and self._memmap_file is not None and self.memmap_dir is not None
+        self.traces = self._allocate(rows, old.shape[1], old.dtype)
+        if not remap:
+            self.traces[:self._numTraces] = old[:self._numTraces]
+
     def addWave(self, trace, dtype=None):
         try:
             if self.traces is None:
                 if dtype is None:
                     dtype = np.double
                 self.tracedtype = dtype
-                self.traces = np.zeros((self.tracehint, len(trace)), dtype=dtype)
-                self.traces[self._numTraces][:] = trace
+                self.traces = self._allocate(max(self.tracehint, 1), len(trace), dtype)
+            elif self.traces.shape[0] <= self._numTraces:
+                # Out of room - double the buffer, so long captures only reallocate
+                # log(N) times
+                rows = max(self.tracehint, 2 * self.traces.shape[0])
+                if self.tracelimit:
+                    rows = max(min(rows, self.tracelimit), self._numTraces + 1)
+                self._grow(rows)
+
+            #Validate traces fit - if too short warn & pad (prevents aborting long captures)
+            pad = self.traces.shape[1] - len(trace)
+            if pad > 0:
+                logging.warning('Trace too short (length=%d)' % len(trace) + " *This MAY SUGGEST DATA CORRUPTION*")
+                logging.warning('Padding with %d zero points' % pad)
+                self.traces[self._numTraces, len(trace):] = 0
+                self.traces[self._numTraces, :len(trace)] = trace
             else:
-                # Check can fit this
-                if self.traces.shape[0] <= self._numTraces:
-                    if self._numTraces >= self.tracehint:
-                        # Tracehint wrong - increase by 25
-                        self.tracehint += 25
-
-                    # Do a resize now to allocate more memory
-                    self.traces.resize((self.tracehint, self.traces.shape[1]))
-
-                #Validate traces fit - if too short warn & pad (prevents aborting long captures)
-                pad = self.traces.shape[1] - len(trace)
-                if pad > 0:
-                    logging.warning('Trace too short (length=%d)' % len(trace) + " *This MAY SUGGEST DATA CORRUPTION*")
-                    logging.warning('Padding with %d zero points' % pad)
-                    trace = np.concatenate((trace, [0]*pad))
-
                 self.traces[self._numTraces][:] = trace
         except MemoryError:
-            raise Warning("Failed to allocate/resize array for %d x %d, if you have sufficient memory it may be fragmented. Use smaller segments and retry." % (self.tracehint, self.traces.shape[1]))
-            
+            raise Warning("Failed to allocate/resize array for %d x %d, if you have sufficient memory it may be fragmented. Use smaller segments and retry." % (max(self.tracehint, 2 * self._numTraces), len(trace)))
+
         self._numTraces += 1
         self.setDirty(True)
         self.writeDataToConfig()
@@ -165,6 +199,10 @@ class TraceContainer(Parameterized):
         #data = (data - np.mean(data)) / np.std(data)
         return data
 
+    def get_traces(self, start, end):
+        """Return traces start..end-1 of this segment as a (end-start, points) array"""
+        return self.traces[start:end]
+
     def getTextin(self, n):
         return self.textins[n]
 
@@ -20,7 +20,7 @@
 #    limitations under the License.
 
 from chipwhisperer.common.utils import util
-from tqdm.notebook import tnrange
+from tqdm.autonotebook import trange # type: ignore
 import numpy as np
 
 
@@ -188,7 +188,8 @@ class SADCounter(object):
 
 class SADModel(object):
     """Python model of the Verilog SAD implementation, used for validation.
-    Efficiency in computation is not the primary objective of this class!
+    run() simulates all the counters over the whole trace at once; step()
+    advances the model one sample at a time, the way the hardware does.
     Almost 100% cycle-accurate; there can be small differences when
     multiple_triggers is false because the model will only ever generate a
     single trigger, whereas some implementations can let a extra one slip
@@ -206,6 +207,7 @@ class SADModel(object):
 
     def __init__(self, counter_width, ref, refen, triglen, half_threshold, threshold, interval_threshold, startup_latency, multiple_triggers, emode=False, interval_matching=False, verbose=False):
         self.emode = emode # True: eSAD; False: regular SAD
+        self.counter_width = counter_width
         self.ref = ref
         self.refen = refen
         self.triglen = triglen
@@ -263,17 +265,243 @@ class SADModel(object):
         for c in self.counters:
             c.reset()
 
-    def run(self, wave):
+    def run(self, wave, fast=True):
+        """Runs the model over a full power trace.
+
+        By default all the counters are simulated at once over the whole trace
+        (see :meth:`sweep`), which gives the same results as stepping the
+        model through the trace one sample at a time (fast=False), only much
+        faster.
+        """
+        if fast:
+            result = self._simulate(self._scores(wave), len(wave), self.threshold, self.half_threshold)
+            self.index += len(wave)
+            self.match_times = result['match_times']
+            self.match_scores = result['match_scores']
+            self.match_counters = result['match_counters']
+            self.uncovered_samples = result['uncovered_samples']
+            self.covered = result['covered']
+            self.SADS = result['SADS']
+            self.triggered = self.triggered or bool(self.match_times)
+            return
+
         # to visualize which starting samples aren't covered... easiest way
         # is to first mark all samples as covered, then later (in step())
         # demote those that aren't:
         self.covered = [1]*len(wave)
-        for i in tnrange(len(wave)): # go through the full powertrace
+        for i in trange(len(wave)): # go through the full powertrace
             self.step(wave[i], True)
         # in the case of emode, we need to change the SAD score for uncovered samples to NaN, to highlight that they could not have triggered:
         if self.emode:
             for u in self.uncovered_samples:
-                self.SADS[u] = np.NaN
+                if u < len(self.SADS):
+                    self.SADS[u] = np.nan
+
+    def sweep(self, wave, thresholds, half_thresholds=None):
+        """Runs the model over a power trace for several threshold settings.
+
+        The SAD scores don't depend on the thresholds, so they are only
+        computed once for the trace. The model's own results are left
+        untouched.
+
+        Args:
+            wave (np.ndarray): input waveform.
+            thresholds (list of int): thresholds to try.
+            half_thresholds (list of int): emode halfway-point thresholds to go
+                with each threshold; defaults to self.half_threshold for all.
+
+        Returns:
+            A list with a dict of results for each threshold (threshold,
+            num_triggers, match_times, match_scores, match_counters and, in
+            emode, uncovered_samples).
+        """
+        if half_thresholds is None:
+            half_thresholds = [self.half_threshold]*len(thresholds)
+        scores = self._scores(wave)
+        results = []
+        for threshold, half_threshold in zip(thresholds, half_thresholds):
+            result = self._simulate(scores, len(wave), threshold, half_threshold, details=False)
+            rtn = {}
+            rtn['threshold'] = threshold
+            rtn['num_triggers'] = len(result['match_times'])
+            rtn['match_times'] = result['match_times']
+            rtn['match_scores'] = result['match_scores']
+            rtn['match_counters'] = result['match_counters']
+            if self.emode:
+                rtn['half_threshold'] = half_threshold
+                rtn['uncovered_samples'] = result['uncovered_samples']
+            results.append(rtn)
+        return results
+
+    def _score_lengths(self):
+        """Number of reference samples after which counter scores are looked at"""
+        if self.emode:
+            half = self.reflen // 2
+            return [l for l in (half - 4, half, self.reflen) if l > 0]
+        elif self.triglen is None:
+            return [self.reflen]
+        elif 0 < self.triglen <= self.reflen:
+            return [self.triglen]
+        return []
+
+    def _scores(self, wave):
+        """SAD scores of the windows starting at every sample of wave.
+
+        Returns a dict: for each length from _score_lengths(), an array whose
+        element s is the score of the window starting at wave[s] after that
+        many reference samples, including the counter saturation. Scores of
+        windows that run past the end of wave are incomplete.
+        """
+        wave = np.asarray(wave).astype(np.int32)
+        ref = np.asarray(self.ref).astype(np.int32)
+        lengths = self._score_lengths()
+        if self.interval_matching:
+            cap = 2**self.counter_width - 1
+        else:
+            cap = 2**(self.counter_width - 1)
+
+        # One pass per reference sample over all windows at once:
+        sad = np.zeros(len(wave), dtype=np.int64)
+        scores = {}
+        for i in range(max(lengths, default=0)):
+            m = max(len(wave) - i, 0)
+            if self.refen[i] and m:
+                incr = np.abs(wave[i:] - ref[i])
+                if self.interval_matching:
+                    incr = incr > self.interval_threshold
+                if i == 0:
+                    sad[:m] = incr
+                else:
+                    # a counter stops adding once it has reached its maximum:
+                    sad[:m] += np.where(sad[:m] < cap, incr, 0)
+            if i + 1 in lengths:
+                scores[i + 1] = sad.copy()
+        return scores
+
+    def _simulate(self, scores, length, threshold, half_threshold, details=True):
+        """Replays the counters over a trace, given its window scores from _scores().
+
+        Every counter restarts at a fixed period (reflen, or reflen/2 in emode),
+        so the window starts and the time at which each window's score is
+        logged/checked can be worked out directly, without stepping through the
+        samples. The per-sample SADS and covered lists are only built when
+        details is set.
+        """
+        lat = self.startup_latency
+        reflen = self.reflen
+        num = max(length - lat, 0) # samples seen by running counters
+        empty = np.zeros(0, dtype=np.int64)
+        if self.emode:
+            half = reflen // 2
+            # Counters start one sample apart and each window lasts half or
+            # all of reflen, so there is always exactly one counter at the
+            # start or halfway point of its window. A window starts at p unless
+            # the window that started at p-half was extended:
+            if half > 4:
+                extend = scores[half - 4][lat:] < half_threshold
+            else:
+                extend = np.zeros(num, dtype=bool)
+            rows = -(-num // half)
+            ext = np.zeros(rows*half, dtype=bool)
+            ext[:num] = extend
+            ext = ext.reshape(rows, half)
+            restart = np.ones_like(ext)
+            restart[1:] = ~ext[:-1]
+            block = np.arange(rows)[:, None]
+            last_restart = np.maximum.accumulate(np.where(restart, block, 0), axis=0)
+            start = ((block - last_restart) % 2 == 0).reshape(-1)[:num]
+            starts = np.flatnonzero(start)
+            extended = starts[extend[starts]]
+            short = starts[~extend[starts]]
+
+            # Scores are logged at the halfway point of every window, and at
+            # the end of extended ones, which are the only ones that can match:
+            half_times = starts + half - 1
+            full_times = extended + reflen - 1
+            log_times = np.concatenate([half_times, full_times])
+            log_scores = np.concatenate([scores[half][lat + starts], scores[reflen][lat + extended]])
+            uncovered = extended + half
+            match_starts = extended
+            match_times = full_times
+            match_length = reflen
+            counter_period = half
+        else:
+            if self.triglen is None:
+                match_length = reflen
+                match_starts = np.arange(num)
+                match_times = match_starts + reflen - 1
+                log_scores = scores[reflen][lat + match_starts]
+            elif 0 < self.triglen <= reflen:
+                # nothing triggers until the counter has gone through the
+                # reference once:
+                match_length = self.triglen
+                match_starts = np.arange(reflen, num)
+                match_times = match_starts + self.triglen - 1
+                log_scores = scores[self.triglen][lat + match_starts]
+            else:
+                match_length = None
+                match_starts = empty
+                match_times = empty
+                log_scores = empty
+            log_times = match_times
+            uncovered = empty
+            counter_period = reflen
+
+        # Only what happens before the end of the trace:
+        keep = log_times < num
+        log_times = log_times[keep]
+        log_scores = log_scores[keep]
+        keep = match_times < num
+        match_starts = match_starts[keep]
+        match_times = match_times[keep]
+        if match_length is None:
+            match_scores = empty
+        else:
+            match_scores = scores[match_length][lat + match_starts]
+        matched = match_scores <= threshold
+        match_times = match_times[matched]
+        match_scores = match_scores[matched]
+        match_counters = match_starts[matched] % counter_period
+        uncovered = uncovered[uncovered - 1 < num]
+
+        if len(match_times):
+            order = np.argsort(match_times, kind='stable')
+            match_times = match_times[order]
+            match_scores = match_scores[order]
+            match_counters = match_counters[order]
+            if not self.multiple_triggers:
+                # everything stops after the first trigger:
+                last = match_times[0]
+                log_scores = log_scores[log_times <= last]
+                log_times = log_times[log_times <= last]
+                uncovered = uncovered[uncovered - 1 <= last]
+                match_times = match_times[:1]
+                match_scores = match_scores[:1]
+                match_counters = match_counters[:1]
+
+        uncovered = (np.sort(uncovered) + lat).tolist()
+        rtn = {}
+        rtn['match_times'] = (match_times + lat + 1).tolist()
+        rtn['match_scores'] = match_scores.tolist()
+        rtn['match_counters'] = match_counters.tolist()
+        rtn['uncovered_samples'] = uncovered
+        if not details:
+            return rtn
+
+        SADS = log_scores[np.argsort(log_times, kind='stable')].tolist()
+        covered = [1]*length
+        for u in uncovered:
+            if u < length:
+                covered[u] = 0
+        # uncovered samples can't trigger, show their SAD score as NaN:
+        if self.emode:
+            for u in uncovered:
+                if u < len(SADS):
+                    SADS[u] = np.nan
+
+        rtn['covered'] = covered
+        rtn['SADS'] = SADS
+        return rtn
 
     def activate_next_counter(self):
         for c in self.counters:
@@ -354,6 +582,10 @@ class SADModelWrapper(object):
         sad_model.run(trace.wave)
         print(sad_model) # to get the results
         print(sad_model.SADS) # to get the SAD scores for the given trace.wave
+
+        # number of triggers for a range of thresholds:
+        for result in sad_model.sweep(trace.wave, range(10, 100, 10)):
+            print(result['threshold'], result['num_triggers'])
     """
     _name = 'SAD model'
 
@@ -440,17 +672,38 @@ class SADModelWrapper(object):
         if self.fsad:
             self.fsad.reset()
 
-    def run(self, wave):
+    def _check_wave(self, wave):
+        if type(wave) != np.ndarray or wave.dtype != np.uint8:
+            raise ValueError("wave must be a numpy.ndarray of uint8's; e.g. as obtained from cw.capture_trace(as_int=True) with scope.adc.bits_per_sample=8")
+
+    def run(self, wave, fast=True):
         """Runs the SAD model.
         Args:
             wave (np.ndarray of uint8 elements): input waveform to the SAD model.
+            fast (bool): simulate all counters at once (default), or step
+                through the waveform one sample at a time.
         """
-        if type(wave) != np.ndarray or wave.dtype != np.uint8:
-            raise ValueError("wave must be a numpy.ndarray of uint8's; e.g. as obtained from cw.capture_trace(as_int=True) with scope.adc.bits_per_sample=8")
+        self._check_wave(wave)
         self.reset()
-        self.sad.run(wave)
+        self.sad.run(wave, fast)
         if self.fsad:
-            self.fsad.run(wave)
+            self.fsad.run(wave, fast)
+
+    def sweep(self, wave, thresholds):
+        """Runs the SAD model for several thresholds, as if scope.SAD.threshold
+        was set to each of them in turn. Much faster than calling run() for
+        each threshold since the SAD scores are only computed once.
+        Args:
+            wave (np.ndarray of uint8 elements): input waveform to the SAD model.
+            thresholds (list of int): thresholds to try.
+        Returns:
+            A list with a dict of results for each threshold (threshold,
+            num_triggers, match_times, match_scores, match_counters and, in
+            emode, uncovered_samples). run() results are not affected.
+        """
+        self._check_wave(wave)
+        thresholds = list(thresholds)
+        return self.sad.sweep(wave, thresholds, [t//2 for t in thresholds])
 
     def __repr__(self):
         return util.dict_to_str(self._dict_repr())
@@ -26,6 +26,7 @@
 #=================================================
 import logging
 import uuid
+import numpy as np
 from chipwhisperer.common.utils import util
 from chipwhisperer.common.utils.parameter import Parameterized, setupSetParam
 from typing import Dict
@@ -48,6 +49,14 @@ class TraceSource(object):
         """Return the trace with number n in the current TraceSource object"""
         return None
 
+    def get_traces(self, start, end):
+        """Return traces start..end-1 as a (end-start, points) array.
+
+        Sources that can read a block of traces at once should override this,
+        the default just stacks get_trace() for each trace.
+        """
+        return np.array([self.get_trace(n) for n in range(start, end)])
+
     def numPoints(self):
         return 0
 
@@ -367,6 +367,49 @@ NEWAE_PIDS = {
     0xC610: {'name': "PhyWhisperer-USB",   'fwver': None},
 }
 
+class ReadMemTransfer:
+    """A read from the external memory interface started by cmdReadMemAsync().
+
+    The data goes straight into the buffer given to cmdReadMemAsync(); call wait() to
+    get it. Nothing else should be sent to the device until the read is done.
+    """
+    def __init__(self, backend, buf, dlen : int, transfer=None):
+        self._backend = backend
+        self._buf = buf
+        self._dlen = dlen
+        self._transfer = transfer
+
+    def done(self) -> bool:
+        """True once the data has been received (or the read failed)"""
+        return self._transfer is None or not self._transfer.isSubmitted()
+
+    def wait(self) -> memoryview:
+        """Blocks until the read is done.
+
+        Returns:
+            A memoryview of the received data, in the buffer given to cmdReadMemAsync().
+        """
+        transfer = self._transfer
+        if transfer is None:
+            return memoryview(self._buf)[:self._dlen]
+
+        while transfer.isSubmitted():
+            try:
+                self._backend.usb_ctx.handleEvents()
+            except usb1.USBErrorInterrupted:
+                pass
+
+        status = transfer.getStatus()
+        if status == usb1.TRANSFER_TIMED_OUT:
+            raise usb1.USBErrorTimeout()
+        elif status == usb1.TRANSFER_STALL:
+            raise usb1.USBErrorPipe()
+        elif status == usb1.TRANSFER_NO_DEVICE:
+            raise usb1.USBErrorNoDevice()
+        elif status != usb1.TRANSFER_COMPLETED:
+            raise usb1.USBErrorIO()
+        return memoryview(self._buf)[:transfer.getActualLength()]
+
 class NAEUSB_Backend:
     """
     Backend to talk to the USB device.
@@ -383,6 +426,7 @@ class NAEUSB_Backend:
         self._timeout = 500
         self.device = None
         self.handle = None
+        self._read_transfer = None
 
         try:
             self.usb_ctx = usb1.USBContext()
@@ -488,6 +532,7 @@ class NAEUSB_Backend:
         if self.handle:
             # self._usbdev.close()
             self._usbdev = None
+            self._read_transfer = None
             del self.handle
             self.handle = None
 
@@ -640,6 +685,49 @@ class NAEUSB_Backend:
             .format("yes" if dlen >= NAEUSB_CTRL_IO_THRESHOLD else "no", addr, dlen, data))
         return data
 
+    def cmdReadMemAsync(self, addr : int, dlen : int, buf=None) -> ReadMemTransfer:
+        """
+        Start a read over external memory interface from FPGA without waiting for the data.
+
+        The data is received straight into buf (any writable buffer of at least dlen bytes,
+        e.g. a bytearray or np.uint8 array, a new bytearray if None), with no copy. The bulk
+        transfer object is reused from one read to the next. Reads under the control-transfer
+        threshold are done right away.
+
+        Returns:
+            A ReadMemTransfer, call its wait() to get the data.
+        """
+        dlen = int(dlen)
+        if buf is None:
+            buf = bytearray(dlen)
+        view = memoryview(buf).cast('B')
+        if view.readonly or len(view) < dlen:
+            raise ValueError("buf must be a writable buffer of at least {} bytes".format(dlen))
+
+        if dlen < NAEUSB_CTRL_IO_THRESHOLD:
+            view[:dlen] = self._cmd_readmem_ctrl(addr, dlen)
+            return ReadMemTransfer(self, view, dlen)
+
+        if self._read_transfer is None:
+            self._read_transfer = self.handle.getTransfer()
+        elif self._read_transfer.isSubmitted():
+            raise IOError("Previous cmdReadMemAsync() read hasn't finished")
+        self._read_transfer.setBulk(self.rep, view[:dlen], timeout=self._timeout)
+
+        self._cmd_ctrl_send_header(addr, dlen, self.CMD_READMEM_BULK)
+        self._read_transfer.submit()
+        naeusb_logger.debug("FPGA_READ_ASYNC: addr: {:08X}, dlen: {:08X}".format(addr, dlen))
+        return ReadMemTransfer(self, view, dlen, self._read_transfer)
+
+    def cmdReadMemInto(self, addr : int, dlen : int, buf) -> memoryview:
+        """
+        Read over external memory interface from FPGA into buf, see cmdReadMemAsync().
+
+        Returns:
+            A memoryview of the received data in buf.
+        """
+        return self.cmdReadMemAsync(addr, dlen, buf).wait()
+
     def _cmd_writemem_ctrl(self, addr : int, data):
         """Writes data to the external memory interface via the control-transfer endpoint.
         """
@@ -888,6 +976,21 @@ class NAEUSB:
 
         return self.usbserializer.cmdReadMem(addr, dlen)
 
+    def cmdReadMemAsync(self, addr : int, dlen : int, buf=None) -> ReadMemTransfer:
+        """
+        Start a read over external memory interface from FPGA into buf, without waiting
+        for the data. Call wait() on the returned object to get it.
+        """
+
+        return self.usbserializer.cmdReadMemAsync(addr, dlen, buf)
+
+    def cmdReadMemInto(self, addr : int, dlen : int, buf) -> memoryview:
+        """
+        Read over external memory interface from FPGA into buf, with no copy of the data.
+        """
+
+        return self.usbserializer.cmdReadMemInto(addr, dlen, buf)
+
     def cmdWriteMem(self, addr : int, data : bytearray):
         """
         Send command to write memory over external memory interface to FPGA. Automatically
@@ -1,6 +1,7 @@
 import unittest
+from unittest import mock
 import numpy as np
-import os, sys
+import os, sys, types
 import shutil
 import random
 from zipfile import ZipFile
@@ -14,6 +15,15 @@ from chipwhisperer.common.api.ProjectFormat import ensure_cwp_extension
 import chipwhisperer as cw
 import chipwhisperer.common.utils.util as util
 import chipwhisperer.analyzer as cwa
+from chipwhisperer.analyzer.attacks.models.aes.funcs import sbox
+from chipwhisperer.common.traces.TraceContainerCompressed import ChunkedTraces
+from chipwhisperer.analyzer.utils import fasterdtw
+from chipwhisperer.common.utils.sad_model import SADModel
+from chipwhisperer.capture.scopes._OpenADCInterface import OpenADCInterface, unpack_husky_samples, unpack_openadc_samples, samples_to_float
+from chipwhisperer.hardware.naeusb.naeusb import NAEUSB_Backend, NAEUSB_CTRL_IO_THRESHOLD
+from chipwhisperer.capture.trace.TraceWhisperer import UARTTrigger
+from chipwhisperer.analyzer.attacks.cpa_algorithms.progressive import CPAProgressiveSubkeys
+from chipwhisperer.analyzer.utils.Partition import Partition, PartitionRandvsFixed, PartitionHWIntermediate, PartitionHDLastRound, PartitionEncKey
 
 
 def create_random_traces(num, wave_length):
@@ -196,6 +206,68 @@ class TestProject(unittest.TestCase):
             self.assertEqual((np_waves[i,:] == self.project.waves[i]).all(), True)
 
 
+    def test_array_indexing(self):
+        self.project = cw.create_project(self.project_name)
+        self.project.traces.seg_len = 30
+        self.project.traces.seg_ind_max = 29
+        traces = create_random_traces(100, 50)
+        self.project.traces.extend(traces)
+        waves = np.array([t.wave for t in traces])
+        textins = np.array([t.textin for t in traces])
+
+        # slice within a segment is a view of the stored traces
+        self.assertTrue(np.shares_memory(self.project.waves[5:20], self.project.segments[0].traces))
+        self.assertTrue((self.project.waves[25:65] == waves[25:65]).all())
+        self.assertTrue((self.project.textins[::-3] == textins[::-3]).all())
+
+        index = [95, 3, -1, 40, 3]
+        self.assertTrue((self.project.waves[index] == waves[index]).all())
+        mask = np.arange(100) % 7 == 0
+        self.assertTrue((self.project.textins[mask] == textins[mask]).all())
+        for trace, i in zip(self.project.traces[np.array(index)], index):
+            self.assertTrue((trace.wave == waves[i]).all())
+            self.assertTrue((trace.key == traces[i].key).all())
+
+        self.assertRaises(IndexError, self.project.waves.__getitem__, [100])
+        self.assertRaises(IndexError, self.project.waves.__getitem__, mask[:50])
+
+    def test_compressed_format(self):
+        self.project = cw.create_project(self.project_name, trace_format='compressed')
+        self.project.traces.seg_len = 100
+        self.project.traces.seg_ind_max = 99
+        # 12-bit ADC data in the first segment, arbitrary floats in the second
+        adc = np.random.randint(0, 4096, (100, 300)) / 4096 - 0.5
+        waves = np.concatenate((adc, np.random.rand(50, 300)))
+        traces = create_random_traces(150, 1)
+        for wave, trace in zip(waves, traces):
+            self.project.traces.append(cw.Trace(wave, trace.textin, trace.textout, trace.key))
+        self.project.save()
+
+        self.project = cw.open_project(self.project_name)
+        self.assertTrue(isinstance(self.project.segments[0].traces, ChunkedTraces))
+        self.assertTrue((np.array(self.project.waves) == waves).all())
+        self.assertTrue((self.project.waves[[149, 3, 70]] == waves[[149, 3, 70]]).all())
+        self.assertTrue((self.project.waves[40:60] == waves[40:60]).all())
+        self.assertEqual(list(self.project.textins[120]), traces[120].textin)
+
+    def test_reserve_and_memmap(self):
+        self.project = cw.create_project(self.project_name)
+        self.project.traces.seg_len = 40
+        self.project.traces.seg_ind_max = 39
+        self.project.traces.memmap_dir = self.project.datadirectory
+        self.project.traces.reserve(50)
+
+        traces = create_random_traces(100, 200)
+        self.project.traces.extend(traces)
+        self.assertEqual(self.project.segments[0].traces.shape, (40, 200))
+        self.assertTrue(isinstance(self.project.segments[0].traces, np.memmap))
+        self.project.save()
+
+        self.project = cw.open_project(self.project_name)
+        self.assertEqual(len(self.project.traces), len(traces))
+        for i in range(len(traces)):
+            self.assertTrue((self.project.traces[i].wave == traces[i].wave).all())
+
     def test_project_openable(self):
         self.project = cw.create_project(self.project_name)
         traces = create_random_traces(100, 5000)
@@ -292,6 +364,100 @@ class TestSNR(unittest.TestCase):
         snr = cwa.calculate_snr(self.traces, cwa.leakage_models.sbox_output)
         self.assertEqual(len(snr), 5000)
 
+    def test_snr_accumulator(self):
+        acc = cwa.SNRAccumulator([cwa.leakage_models.sbox_output, cwa.leakage_models.last_round_state_diff])
+        acc.add_project(self.project, batch_size=300)
+        self.assertEqual(acc.num_traces, 1000)
+        waves = np.array([trace.wave for trace in self.traces])
+        for model, leak_model in enumerate(acc.leak_models):
+            for bnum in [0, 7, 15]:
+                # per-class mean and variance, computed directly
+                leakage = np.array([leak_model.leakage(t.textin, t.textout, None, bnum, {'knownkey': t.key}) for t in self.traces])
+                classes, counts = np.unique(leakage, return_counts=True)
+                means = [np.mean(waves[leakage == c], axis=0) for c in classes]
+                noise = np.var(waves[leakage == classes[np.argmax(counts)]], axis=0)
+                snr = np.var(means, axis=0) / noise
+                self.assertTrue(np.allclose(acc.snr(model, bnum, db=False), snr))
+                self.assertTrue(np.allclose(acc.snr(model, bnum), 20*np.log(snr)))
+
+
+class TestCoefficientVsTraces(unittest.TestCase):
+    def setUp(self):
+        # plotting isn't tested, so matplotlib doesn't need to be installed
+        stubs = {}
+        try:
+            import matplotlib.pyplot
+        except ImportError:
+            stubs = {'matplotlib': types.ModuleType('matplotlib'), 'matplotlib.pyplot': types.ModuleType('matplotlib.pyplot')}
+        with mock.patch.dict(sys.modules, stubs):
+            from chipwhisperer.analyzer.attacks.coefficient_vs_trace_number import CoefficientVsTracesNumber
+        self.cls = CoefficientVsTracesNumber
+        self.traces = create_random_traces(60, 10)
+        for trace in self.traces:
+            trace.wave[5] += bin(sbox(trace.textin[1] ^ trace.key[1])).count('1')
+
+    def test_subkey_shapes(self):
+        leak_model = cwa.leakage_models.sbox_output
+        single = self.cls(self.traces, 1, 20, leak_model).get_coefficients()
+        multiple = self.cls(self.traces, range(3), 20, leak_model).get_coefficients()
+        self.assertEqual(single.shape, (256, 3))
+        self.assertEqual(multiple.shape, (3, 256, 3))
+        self.assertTrue(np.allclose(multiple[1], single))
+
+        waves = np.array([t.wave for t in self.traces])
+        for guess in [0, 0x2B, self.traces[0].key[1]]:
+            hyp = [leak_model.leakage(t.textin, t.textout, guess, 1, {'knownkey': t.key}) for t in self.traces]
+            for n in [20, 60]:
+                corr = [abs(np.corrcoef(hyp[:n], waves[:n, p])[0, 1]) for p in range(10)]
+                self.assertAlmostEqual(single[guess, n // 20 - 1], max(corr))
+
+
+class TestPartition(unittest.TestCase):
+
+    def setUp(self):
+        self.project = cw.create_project('test_project')
+        self.project.traces.seg_len = 300
+        self.project.traces.seg_ind_max = 299
+        fixed = list(util.hexStrToByteArray(PartitionRandvsFixed.fixedPlaintexts[16]))
+        for i, trace in enumerate(create_random_traces(1000, 10)):
+            if i % 3 == 0:
+                trace = trace._replace(textin=fixed)
+            self.project.traces.append(trace)
+
+    def tearDown(self):
+        self.project.remove(i_am_sure=True)
+
+    def test_rand_vs_fixed(self):
+        tm = self.project.trace_manager()
+        part = Partition()
+        part.setTraceSource(tm)
+        labels = part.generatePartitionLabels(PartitionRandvsFixed)
+        self.assertTrue(np.array_equal(labels[:, 0], np.arange(1000) % 3 == 0))
+        for tnum in [0, 1, 299, 300, 999]:
+            self.assertEqual(list(labels[tnum]), PartitionRandvsFixed().getPartitionNum(tm, tnum))
+
+    def test_partition_labels(self):
+        tm = self.project.trace_manager()
+        part = Partition()
+        part.setTraceSource(tm)
+        for method in [PartitionHWIntermediate, PartitionHDLastRound, PartitionEncKey]:
+            labels = part.generatePartitionLabels(method)
+            table = part.generatePartitions(method)
+            self.assertEqual(labels.shape, (1000, 16))
+            for tnum in [0, 299, 300, 999]:
+                expected = method().getPartitionNum(tm, tnum)
+                self.assertEqual(list(labels[tnum]), expected)
+                for bnum in range(16):
+                    self.assertIn(tnum, table[bnum][expected[bnum]])
+
+    def test_partition_save_load(self):
+        self.project.save()
+        part = Partition()
+        part.setTraceSource(self.project.trace_manager())
+        labels = part.generatePartitionLabels(PartitionHWIntermediate, saveFile=True)
+        loaded = part.generatePartitionLabels(PartitionHWIntermediate, loadFile=True, tRange=(250, 700))
+        self.assertTrue(np.array_equal(labels[250:700], loaded))
+
 
 class TestPreprocessing(unittest.TestCase):
 
@@ -310,6 +476,90 @@ class TestPreprocessing(unittest.TestCase):
         resync_traces.max_shift = 1000
         new_project = resync_traces.preprocess()
 
+    def test_get_traces(self):
+        trace_manager = self.project.trace_manager()
+        block = trace_manager.get_traces(10, 30)
+        self.assertEqual(block.shape, (20, 3000))
+        for i in range(20):
+            self.assertTrue((block[i] == trace_manager.get_trace(10 + i)).all())
+
+        resync_traces = cwa.preprocessing.ResyncSAD(self.project)
+        resync_traces.ref_trace = 0
+        resync_traces.target_window = (1000, 1400)
+        resync_traces.max_shift = 500
+        block = resync_traces.get_traces(10, 30)
+        self.assertEqual(block.shape, (20, 3000))
+        for i in range(20):
+            trace = resync_traces.get_trace(10 + i)
+            if trace is None:
+                self.assertTrue(np.isnan(block[i]).all())
+            else:
+                self.assertTrue(np.allclose(block[i], trace))
+
+    def test_get_traces_blocked(self):
+        project = cw.create_project('test_sad_blocks', overwrite=True)
+        base = np.sin(np.arange(400) / 5.0)
+        for i in range(12):
+            if i % 4 == 3:
+                wave = np.random.normal(0, 100, 400)
+            else:
+                wave = np.roll(base, random.randrange(-40, 40)) + np.random.normal(0, 0.01, 400)
+            project.traces.append(cw.Trace(wave, [0]*16, [0]*16, [0]*16))
+
+        resync_traces = cwa.preprocessing.ResyncSAD(project)
+        resync_traces.ref_trace = 0
+        resync_traces.target_window = (150, 250)
+        resync_traces.max_shift = 50
+        ref = project.traces[0].wave[150:250]
+        expected = np.array([[np.abs(project.traces[i].wave[150+s:250+s] - ref).sum() for s in range(-50, 50)]
+                             for i in range(12)])
+
+        # 100 shifts x 100 points per trace: several traces per block, then several blocks per trace
+        for block_elements in [25000, 3000]:
+            resync_traces._sad_block_elements = block_elements
+            resync_traces.setOutputSad(True)
+            self.assertTrue(np.allclose(resync_traces.get_traces(0, 12), expected))
+            for i in range(12):
+                self.assertTrue(np.allclose(resync_traces.get_trace(i), expected[i]))
+
+            resync_traces.setOutputSad(False)
+            block = resync_traces.get_traces(0, 12)
+            self.assertEqual(block.shape, (12, 400))
+            for i in range(12):
+                trace = resync_traces.get_trace(i)
+                if i % 4 == 3:
+                    self.assertIsNone(trace)
+                if trace is None:
+                    self.assertTrue(np.isnan(block[i]).all())
+                else:
+                    self.assertTrue(np.allclose(block[i], trace))
+        project.remove(i_am_sure=True)
+
+    def test_dtw(self):
+        project = cw.create_project('test_dtw', overwrite=True)
+        base = np.sin(np.arange(300) / 7.0)
+        for i in range(10):
+            project.traces.append(cw.Trace(np.roll(base, random.randrange(-10, 10)), [0]*16, [0]*16, [0]*16))
+
+        resync_traces = cwa.preprocessing.ResyncDTW(project)
+        resync_traces.ref_trace = 0
+        block = resync_traces.get_traces(0, 10)
+        self.assertEqual(block.shape, (10, 300))
+        for i in range(10):
+            self.assertTrue(np.allclose(block[i], resync_traces.get_trace(i)))
+        self.assertTrue(np.allclose(block[0], project.traces[0].wave))
+        project.remove(i_am_sure=True)
+
+    def test_dtw_banded(self):
+        for radius in [1, 2, 3]:
+            for i in range(20):
+                x = np.random.normal(0, 50, random.randrange(20, 120))
+                y = np.random.normal(0, 50, random.randrange(20, 120))
+                dist, path = fasterdtw.fastdtw(x, y, radius=radius)
+                bdist, px, py = fasterdtw.fastdtw_banded(fasterdtw.reduce_pyramid(x, radius), y, radius=radius)
+                self.assertEqual(bdist, dist)
+                self.assertEqual(list(zip(px.tolist(), py.tolist())), path)
+
 
 class TestUtils(unittest.TestCase):
     _OBJ_HW_DICT = {
@@ -531,6 +781,346 @@ class TestSegment(unittest.TestCase):
         for i in range(0, len(arr)):
             self.assertEqual(self.project.textins[10000][i], arr[i])
 
+    def test_many_segments(self):
+        self.project = cw.create_project('test_seg', overwrite=True)
+        self.project.traces.seg_len = 3
+        self.project.traces.seg_ind_max = 2
+        for i in range(100):
+            self.project.traces.append(cw.Trace(np.array([i]), [i % 256]*16, [0]*16, [0]*16))
+        self.project.save()
+
+        tm = self.project.trace_manager()
+        for i in [0, 99, 50, 2, 3, 51, 98, 0] + list(range(100)):
+            self.assertEqual(tm.get_trace(i)[0], i)
+            self.assertEqual(tm.get_textin(i)[0], i)
+        self.assertRaises(ValueError, tm.get_segment, 100)
+
+        # saved segments that aren't being used get unloaded
+        loaded = [seg for seg in self.project.segments if seg.isLoaded()]
+        self.assertTrue(len(loaded) <= tm.max_loaded_segments)
+
+class TestSADModel(unittest.TestCase):
+
+    def setUp(self):
+        self.ref = np.array([random.randrange(256) for i in range(32)], dtype=np.uint8)
+        self.wave = np.array([random.randrange(256) for i in range(3000)], dtype=np.uint8)
+        for start in [100, 700, 716, 2000]:
+            self.wave[start:start+32] = np.clip(self.ref + np.random.randint(-2, 3, 32), 0, 255)
+
+    def check_same(self, **kwargs):
+        args = dict(counter_width=10, ref=self.ref, refen=[True]*32, triglen=None, half_threshold=40, threshold=80,
+                    interval_threshold=0, startup_latency=0, multiple_triggers=True)
+        args.update(kwargs)
+        slow = SADModel(**args)
+        fast = SADModel(**args)
+        slow.reset()
+        fast.reset()
+        slow.run(self.wave, fast=False)
+        fast.run(self.wave)
+        self.assertTrue(len(fast.match_times) > 0)
+        self.assertEqual(slow.match_times, fast.match_times)
+        self.assertEqual(slow.match_scores, fast.match_scores)
+        self.assertEqual(slow.match_counters, fast.match_counters)
+        self.assertEqual(slow.uncovered_samples, fast.uncovered_samples)
+        self.assertTrue(np.array_equal(np.array(slow.SADS, dtype=float), np.array(fast.SADS, dtype=float), equal_nan=True))
+
+        result = fast.sweep(self.wave, [-1, args['threshold']], [-1, args['half_threshold']])
+        self.assertEqual(result[1]['match_times'], fast.match_times)
+        self.assertEqual(result[0]['num_triggers'], 0)
+
+    def test_sad(self):
+        self.check_same()
+        self.check_same(multiple_triggers=False, startup_latency=2)
+        self.check_same(triglen=20, threshold=60)
+        self.check_same(interval_matching=True, interval_threshold=3, threshold=2)
+
+    def test_esad(self):
+        self.check_same(emode=True)
+        self.check_same(emode=True, interval_matching=True, interval_threshold=3, threshold=2, half_threshold=1)
+
+
+class TestSampleDecoding(unittest.TestCase):
+    def test_husky_12bit(self):
+        samples = np.random.randint(0, 4096, 1000)
+        packed = bytearray()
+        for fst, snd in zip(samples[0::2], samples[1::2]):
+            packed += bytes([fst >> 4, ((fst & 0xF) << 4) | (snd >> 8), snd & 0xFF])
+        self.assertTrue(np.array_equal(unpack_husky_samples(packed, 12), samples))
+        out = np.zeros(1000, dtype=np.int16)
+        self.assertTrue(np.array_equal(unpack_husky_samples(packed, 12, 999, out), samples[:999]))
+        self.assertTrue(np.array_equal(out[:999], samples[:999]))
+        self.assertTrue(np.array_equal(unpack_husky_samples(packed, 8, 10), np.frombuffer(packed, dtype=np.uint8)[:10]))
+
+    def test_openadc_10bit(self):
+        samples = np.random.randint(0, 1024, 300)
+        trig = [3]*40 + [2] + [random.randrange(4) for i in range(59)]
+        packed = bytearray([0xAC])
+        for i in range(100):
+            word = (trig[i] << 30) | (samples[3*i+2] << 20) | (samples[3*i+1] << 10) | samples[3*i]
+            packed += int(word).to_bytes(4, 'big')
+        out, trigsamp = unpack_openadc_samples(packed + b'\x00')
+        self.assertTrue(np.array_equal(out, samples))
+        self.assertEqual(trigsamp, 3*40 + 2)
+        self.assertIsNone(unpack_openadc_samples(packed[:4*40+1])[1])
+
+        fp = samples_to_float(out, 10, 0.5, np.zeros(300, dtype=np.float32))
+        self.assertEqual(fp.dtype, np.float32)
+        self.assertTrue(np.allclose(fp, samples / 1024 - 0.5))
+
+
+class FakeTransfer:
+    """Bulk transfer that completes with payload on the next handleEvents()"""
+    def __init__(self):
+        self.submitted = False
+        self.payload = b''
+        self.status = None
+
+    def setBulk(self, endpoint, buf, timeout):
+        self.buf = buf
+
+    def submit(self):
+        self.submitted = True
+
+    def isSubmitted(self):
+        return self.submitted
+
+    def complete(self):
+        self.buf[:len(self.payload)] = self.payload
+        self.submitted = False
+
+    def getStatus(self):
+        return self.status
+
+    def getActualLength(self):
+        return len(self.payload)
+
+
+class TestAsyncRead(unittest.TestCase):
+    def setUp(self):
+        # no hardware: a backend with a mocked device handle
+        import usb1
+        self.usb1 = usb1
+        self.backend = NAEUSB_Backend.__new__(NAEUSB_Backend)
+        self.backend._timeout = 500
+        self.backend.device = None
+        self.backend._read_transfer = None
+        self.backend.rep = 0x81
+        self.transfer = FakeTransfer()
+        self.backend.handle = mock.Mock()
+        self.backend.handle.getTransfer.return_value = self.transfer
+        self.backend.usb_ctx = mock.Mock()
+        self.backend.usb_ctx.handleEvents.side_effect = self.transfer.complete
+        self.backend.sendCtrl = mock.Mock()
+        self.backend.readCtrl = mock.Mock()
+
+    def test_ctrl_read(self):
+        data = bytes(range(NAEUSB_CTRL_IO_THRESHOLD - 1))
+        self.backend.readCtrl.return_value = data
+        buf = bytearray(100)
+        read = self.backend.cmdReadMemAsync(0x10, len(data), buf)
+        self.assertTrue(read.done())
+        self.assertEqual(bytes(read.wait()), data)
+        self.assertEqual(bytes(buf[:len(data)]), data)
+        self.backend.handle.getTransfer.assert_not_called()
+
+    def test_bulk_read(self):
+        buf = np.zeros(256, dtype=np.uint8)
+        for i in range(2):
+            self.transfer.payload = bytes([i + 1]) * 200
+            self.transfer.status = self.usb1.TRANSFER_COMPLETED
+            read = self.backend.cmdReadMemAsync(0x10, 200, buf)
+            self.assertFalse(read.done())
+            self.assertEqual(bytes(read.wait()), self.transfer.payload)
+            self.assertTrue((buf[:200] == i + 1).all())
+        # the transfer object is reused
+        self.assertEqual(self.backend.handle.getTransfer.call_count, 1)
+        with self.assertRaises(ValueError):
+            self.backend.cmdReadMemAsync(0x10, 300, buf)
+
+    def test_bulk_errors(self):
+        errors = [(self.usb1.TRANSFER_TIMED_OUT, self.usb1.USBErrorTimeout),
+                  (self.usb1.TRANSFER_STALL, self.usb1.USBErrorPipe),
+                  (self.usb1.TRANSFER_NO_DEVICE, self.usb1.USBErrorNoDevice),
+                  (self.usb1.TRANSFER_ERROR, self.usb1.USBErrorIO)]
+        for status, error in errors:
+            self.transfer.status = status
+            read = self.backend.cmdReadMemAsync(0x10, 200)
+            with self.assertRaises(error):
+                read.wait()
+
+    def test_previous_read_unfinished(self):
+        self.backend.cmdReadMemAsync(0x10, 200)
+        with self.assertRaises(IOError):
+            self.backend.cmdReadMemAsync(0x10, 200)
+        self.transfer.complete()
+        self.backend.cmdReadMemAsync(0x10, 200)
+
+    def test_read_fifo_buffer_reuse(self):
+        adc = OpenADCInterface.__new__(OpenADCInterface)
+        adc._read_buf = None
+        adc._bits_per_sample = 8
+        adc.registers = {"ADCREAD_ADDR": 3}
+        adc.serial = mock.Mock(stream=False)
+        def read_into(addr, dlen, buf):
+            buf[:dlen] = np.arange(dlen) + adc.serial.cmdReadMemInto.call_count
+            return memoryview(buf)[:dlen]
+        adc.serial.cmdReadMemInto.side_effect = read_into
+
+        first = adc.processHuskyData(100, adc.read_fifo(100), as_int=True)
+        buf = adc._read_buf
+        second = adc.processHuskyData(100, adc.read_fifo(100), as_int=True)
+        # the read buffer is reused, but the samples kept from the first capture aren't overwritten
+        self.assertIs(adc._read_buf, buf)
+        self.assertTrue(np.array_equal(first, np.arange(100) + 1))
+        self.assertTrue(np.array_equal(second, np.arange(100) + 2))
+
+    def test_decode_into_out(self):
+        adc = OpenADCInterface.__new__(OpenADCInterface)
+        adc.offset = 0.5
+        adc._bits_per_sample = 12
+        data = np.random.randint(0, 256, 150, dtype=np.uint8)
+        ints = unpack_husky_samples(data, 12, 90)
+        floats = samples_to_float(ints, 12, 0.5)
+
+        out = np.zeros((2, 100), dtype=np.int16)
+        trace = adc.processHuskyData(90, data, as_int=True, out=out[1])
+        self.assertTrue(np.shares_memory(trace, out))
+        self.assertTrue(np.array_equal(out[1, :90], ints))
+        self.assertTrue(np.array_equal(adc.get_fp_data(), floats))
+
+        out = np.zeros(100, dtype=np.float32)
+        trace = adc.processHuskyData(90, data, out=out)
+        self.assertTrue(np.shares_memory(trace, out))
+        self.assertTrue(np.allclose(out[:90], floats))
+        # out isn't kept as the floats of the capture
+        out[:] = 0
+        self.assertTrue(np.array_equal(adc.get_fp_data(), floats))
+
+        adc._fp_format = (12, 2, 0.0)
+        out = np.ones(100)
+        trace = adc._trim_data(50, out=out)
+        self.assertTrue(np.shares_memory(trace, out))
+        self.assertTrue(np.array_equal(out[:50], np.concatenate(([0.0, 0.0], floats[2:50]))))
+
+
+class TestTraceDecoding(unittest.TestCase):
+    def setUp(self):
+        # no hardware: only set what the decoders need
+        self.tw = UARTTrigger.__new__(UARTTrigger)
+        for i, name in enumerate(['DATA', 'STAT', 'TIME', 'STRM']):
+            setattr(self.tw, 'FE_FIFO_CMD_' + name, i)
+        self.tw.FE_FIFO_STAT_EMPTY = 2
+        self.tw.FE_FIFO_STAT_UNDERFLOW = 3
+        for i, name in enumerate(['REG_STAT', 'REG_SNIFF_FIFO_STAT', 'REG_SNIFF_FIFO_RD', 'REG_CLEAR_ERRORS', 'REG_MATCHED_DATA']):
+            setattr(self.tw, name, i)
+        self.tw.swo_mode = False
+        self.tw._trace_port_width = 4
+        self.tw.rule_length = [2, 1, 3, 0, 0, 0, 0, 0]
+
+    def fake_fifo(self, entries, fifo_stat=0):
+        fifo = list(entries)
+        writes = []
+        stat = [fifo_stat]
+        def fpga_read(addr, size):
+            if addr == self.tw.REG_SNIFF_FIFO_STAT:
+                return [stat[0] | (0 if fifo else 1)]
+            if addr == self.tw.REG_MATCHED_DATA:
+                return list(b'ABCDEFGH')
+            if addr == self.tw.REG_SNIFF_FIFO_RD:
+                words = []
+                for i in range(size//4):
+                    if not fifo:
+                        stat[0] |= 2 # underflow
+                    words += [0] + list(fifo.pop(0) if fifo else [0, 0, 0x3 | 0x4])
+                return words
+            return [0]
+        def fpga_write(addr, data):
+            writes.append(addr)
+            if addr == self.tw.REG_CLEAR_ERRORS:
+                stat[0] = 0
+        self.tw.fpga_read = fpga_read
+        self.tw.fpga_write = fpga_write
+        return writes
+
+    def test_rule_match_times(self):
+        raw = [[5, 0b1, 0], [0x10, 0x01, 2], [3, 0b100, 0], [0, 0, 3], [7, 0b10, 0x10]]
+        self.assertEqual(self.tw.get_rule_match_times(raw), [[1, 0], [274, 2], [285, 1]])
+        self.assertEqual(self.tw.get_rule_match_times(np.array(raw), rawtimes=True), [[5, 0], [280, 2], [287, 1]])
+
+    def test_raw_trace_packets(self):
+        data = [0x11, 0x22, 255, 127, 0x33, 255, 255, 255, 127, 0x44]
+        raw = [[2, b, 1] for b in data]
+        raw.insert(4, [0, 1, 2])
+        raw.insert(2, [0, 0, 3])
+        self.assertEqual(self.tw.get_raw_trace_packets(raw), [[2, [0x11, 0x22]], [266, [0x33]]])
+        self.assertEqual(self.tw.get_raw_trace_packets(raw, removesyncs=False), [[2, data]])
+        with self.assertRaises(ValueError):
+            self.tw.get_raw_trace_packets(raw + [[1, 1, 0]])
+
+    def test_uart_data(self):
+        raw = [[0, ord('h'), 1], [0, 0, 3], [4, 0, 2], [0, ord('i'), 1]]
+        self.fake_fifo([])
+        self.assertEqual(self.tw.uart_data(raw, prepend_matched_pattern=False), ['h', 'i'])
+        self.assertEqual(self.tw.uart_data(raw, prepend_matched_pattern=False, return_ascii=False), [104, 105])
+        self.assertEqual(self.tw.uart_data(raw), list('ABCDEFGHhi'))
+
+    def test_read_capture_data(self):
+        entries = [[i, i, i % 4] for i in range(11)]
+        self.fake_fifo(entries)
+        slow = self.tw.read_capture_data(check_empty=True)
+        writes = self.fake_fifo(entries)
+        fast = self.tw.read_capture_data(burst_size=4)
+        self.assertTrue(np.array_equal(slow, entries))
+        self.assertTrue(np.array_equal(fast, entries))
+        self.assertEqual(writes, [self.tw.REG_CLEAR_ERRORS])
+        self.assertFalse(self.tw.errors)
+
+        # an overflow from the capture itself must still be reported afterwards
+        writes = self.fake_fifo(entries, fifo_stat=16)
+        fast = self.tw.read_capture_data(burst_size=4)
+        self.assertTrue(np.array_equal(fast, entries))
+        self.assertEqual(writes, [])
+        self.assertEqual(self.tw.errors, "FIFO underflow, FIFO overflow, ")
+
+
+class TestLeakageBatch(unittest.TestCase):
+    def test_batch_matches_scalar(self):
+        pts = np.random.randint(0, 256, (20, 16))
+        cts = np.random.randint(0, 256, (20, 16))
+        keys = np.random.randint(0, 256, (20, 16))
+        guesses = np.arange(256)
+        for name in ['sbox_output', 'last_round_state_diff', 'sbox_in_out_diff', 'mix_columns_output', 't_table', 't_table_dec']:
+            model = getattr(cwa.leakage_models, name)
+            batch = model.leakage_batch(pts, cts, guesses, 3, keys)
+            self.assertEqual(batch.shape, (20, 256))
+            for t in range(20):
+                for g in [0, 0x2B, 0xFF]:
+                    self.assertEqual(batch[t, g], model.leakage(pts[t], cts[t], g, 3, {'knownkey': keys[t]}))
+
+        prev_pts = np.roll(pts, 1, axis=0)
+        prev_cts = np.roll(cts, 1, axis=0)
+        for name in ['pipeline_diff', 'half_pipeline_diff']:
+            model = getattr(cwa.leakage_models, name)
+            batch = model.leakage_batch(pts, cts, guesses, 3, keys, prev_pts=prev_pts, prev_cts=prev_cts)
+            self.assertEqual(batch.shape, (20, 256))
+            for t in range(20):
+                for g in [0, 0x2B, 0xFF]:
+                    self.assertEqual(batch[t, g], model.leakage(pts[t], cts[t], prev_pts[t], prev_cts[t], g, 3, {'knownkey': keys[t]}))
+
+    def test_scalar_override_falls_back(self):
+        # overriding only leakage() must not inherit the parent's batch version
+        from chipwhisperer.analyzer.attacks.models.AES128_8bit import AES128_ttable
+        class Inverted(AES128_ttable):
+            def leakage(self, pt, ct, guess, bnum, state):
+                return 32 - super().leakage(pt, ct, guess, bnum, state)
+        model = Inverted(cwa.leakage_models.t_table.modelobj.__class__)
+        pts = np.random.randint(0, 256, (5, 16))
+        batch = model.leakage_batch(pts, pts, np.arange(256), 3)
+        for t in range(5):
+            for g in [0, 0x2B, 0xFF]:
+                self.assertEqual(batch[t, g], model.leakage(pts[t], pts[t], g, 3, {'knownkey': None}))
+
+
 class TestCPA(unittest.TestCase):
     def test_CPA(self):
         project = cw.open_project('projects/Tutorial_B5')
@@ -543,6 +1133,62 @@ class TestCPA(unittest.TestCase):
 
         project.close(save=False)
 
+    def test_CPA_synthetic_leak(self):
+        project = cw.create_project('test_cpa_synth', overwrite=True)
+        key = [random.randrange(256) for i in range(16)]
+        hw = [bin(x).count('1') for x in range(256)]
+        for i in range(200):
+            textin = [random.randrange(256) for i in range(16)]
+            wave = np.random.normal(0, 0.5, 40)
+            for bnum in range(16):
+                wave[2 * bnum] += hw[sbox(textin[bnum] ^ key[bnum])]
+            project.traces.append(cw.Trace(wave, textin, textin, key))
+
+        attack = cwa.cpa(project, cwa.leakage_models.sbox_output)
+        results = attack.run()
+        keys = results.find_key()
+        for i in range(16):
+            self.assertEqual(key[i], keys[i])
+        project.remove(i_am_sure=True)
+
+    def test_CPA_batch_hypotheses(self):
+        class ScalarModel(object):
+            # no leakage_batch(), so hypotheses() falls back to leakage()
+            def __init__(self, model):
+                self.model = model
+                self._has_prev = model._has_prev
+            def getPermPerSubkey(self):
+                return self.model.getPermPerSubkey()
+            def leakage(self, *args):
+                return self.model.leakage(*args)
+
+        traces = create_random_traces(60, 12)
+        waves = np.array([t.wave for t in traces])
+        textins = np.array([t.textin for t in traces])
+        textouts = np.array([t.textout for t in traces])
+        keys = [t.key for t in traces]
+        for name in ['sbox_output', 'pipeline_diff']:
+            model = getattr(cwa.leakage_models, name)
+            batch = CPAProgressiveSubkeys(model, range(16))
+            scalar = CPAProgressiveSubkeys(ScalarModel(model), range(16))
+            for start in [0, 30]:
+                s = slice(start, start + 30)
+                active = [True]*8 + [False, True]*4
+                diffs = batch.add_traces(waves[s], textins[s], textouts[s], keys[s], active)
+                expected = scalar.add_traces(waves[s], textins[s], textouts[s], keys[s], active)
+                self.assertEqual(len(diffs), 12)
+                for d, e in zip(diffs, expected):
+                    self.assertTrue(np.allclose(d, e))
+            self.assertEqual(list(batch.totalTraces), [60]*8 + [0, 60]*4)
+
+        model = cwa.leakage_models.sbox_output
+        hyp = [model.leakage(t.textin, t.textout, 0x2B, 2, {'knownkey': t.key}) for t in traces]
+        corr = [np.corrcoef(hyp, waves[:, p])[0, 1] for p in range(12)]
+        cpa = CPAProgressiveSubkeys(model, [2])
+        cpa.add_traces(waves[:30], textins[:30], textouts[:30], keys[:30])
+        diffs = cpa.add_traces(waves[30:], textins[30:], textouts[30:], keys[30:])
+        self.assertTrue(np.allclose(np.asarray(diffs[0][0x2B], dtype=np.float64), corr))
+
     def test_jitter(self):
         project = cw.open_project('projects/jittertime')
         resync_traces = cwa.preprocessing.ResyncSAD(project)